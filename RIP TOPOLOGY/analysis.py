@@ -0,0 +1,249 @@
+from typing import Dict, List, Optional, Set, Tuple
+from datetime import datetime
+import threading
+import time
+import records
+import route_index
+
+RIP_INFINITY = 16
+# Routes at or above this metric are reported as nearing infinity
+NEAR_INFINITY = 13
+
+Route = Tuple[int, Tuple[str, ...]]
+
+
+def mask(length: int) -> int:
+    return route_index.MASKS[length]
+
+
+def index_table(snapshot: Dict) -> Dict[str, Route]:
+    """Network -> (lowest metric, next hops at that metric) for one router"""
+    table: Dict[str, Route] = {}
+    for route in snapshot.get("routes", []):
+        if isinstance(route, records.RipRoute):
+            metric, network, next_hop = route.metric, route.network(), records.next_hop_to_ip(route.next_hop)
+        else:
+            try:
+                metric = int(route.get("metric", RIP_INFINITY))
+            except ValueError:
+                continue
+            network, next_hop = route.get("network", ""), route.get("next_hop", "")
+        best = table.get(network)
+        if best is None or metric < best[0]:
+            table[network] = (metric, (next_hop,))
+        elif metric == best[0]:
+            table[network] = (metric, best[1] + (next_hop,))
+    return table
+
+
+def interface_values(snapshot: Dict) -> List[int]:
+    """Interface addresses of one router as ints, records already carry them"""
+    values = []
+    for interface in snapshot.get("interfaces", []):
+        if isinstance(interface, records.InterfaceStatus):
+            if interface.ip_address is not None:
+                values.append(interface.ip_address)
+            continue
+        try:
+            values.append(records.ip_to_int(interface.get("ip_address") or ""))
+        except ValueError:
+            pass
+    return values
+
+
+def index_addresses(snapshots: Dict[str, Dict]) -> Dict[str, str]:
+    """Interface address -> router owning it, so next hops resolve to routers"""
+    owners = {}
+    for router_ip, snapshot in snapshots.items():
+        owners[router_ip] = router_ip
+        for interface in snapshot.get("interfaces", []):
+            address = interface.get("ip_address")
+            if address and address != "unassigned":
+                owners[address] = router_ip
+    return owners
+
+
+def analyze(snapshots: Dict[str, Dict], threshold: int = NEAR_INFINITY,
+            tables: Optional[Dict[str, Dict[str, Route]]] = None) -> Dict:
+    """Hop-count consistency, near-infinity routes, loops and black holes across routers.
+
+    Every table is indexed once, then each prefix is checked on its own next-hop graph,
+    so the work grows with routes rather than with routers times routes squared."""
+    started = time.monotonic()
+    if tables is None:
+        tables = {router_ip: index_table(snapshot) for router_ip, snapshot in snapshots.items()}
+    owners = index_addresses(snapshots)
+
+    prefixes: Dict[str, Tuple[int, int]] = {}
+    holders: Dict[str, List[str]] = {}
+    for router_ip, table in tables.items():
+        router_prefixes = None
+        for network in table:
+            if network not in prefixes:
+                if router_prefixes is None:
+                    router_prefixes = route_index.route_prefixes(snapshots.get(router_ip, {}).get("routes", []))
+                if network not in router_prefixes:
+                    continue
+                prefixes[network] = router_prefixes[network]
+                holders[network] = []
+            holders[network].append(router_ip)
+
+    # (router, length, network) for every interface subnet at the lengths in use
+    lengths = {length for _, length in prefixes.values()}
+    connected: Set[Tuple[str, int, int]] = set()
+    for router_ip, snapshot in snapshots.items():
+        values = interface_values(snapshot)
+        try:
+            # Routers are often registered by one of their interface addresses
+            values.append(records.ip_to_int(router_ip))
+        except ValueError:
+            pass
+        for value in values:
+            for length in lengths:
+                connected.add((router_ip, length, value & mask(length)))
+
+    near_infinity = []
+    hop_count = []
+    loops = []
+    black_holes = []
+    unresolved = 0
+    for network, routers in holders.items():
+        value, length = prefixes[network]
+        value &= mask(length)
+        graph: Dict[str, List[str]] = {}
+        for router_ip in routers:
+            metric, next_hops = tables[router_ip][network]
+            if metric >= threshold:
+                near_infinity.append({"router": router_ip, "network": network, "metric": metric,
+                                      "next_hops": list(next_hops), "unreachable": metric >= RIP_INFINITY})
+            if metric >= RIP_INFINITY:
+                continue
+            peers = []
+            for next_hop in next_hops:
+                peer = owners.get(next_hop)
+                if peer is None or peer == router_ip:
+                    unresolved += 1
+                    continue
+                peers.append(peer)
+                peer_route = tables.get(peer, {}).get(network)
+                if peer_route is not None and peer_route[0] < RIP_INFINITY:
+                    expected = peer_route[0] + 1
+                elif (peer, length, value) in connected:
+                    expected = 1
+                else:
+                    continue
+                if metric != expected:
+                    hop_count.append({"router": router_ip, "network": network, "metric": metric,
+                                      "next_hop": next_hop, "neighbor": peer, "expected": expected})
+            graph[router_ip] = peers
+
+        dead_ends: Dict[str, List[str]] = {}
+        for router_ip, peers in graph.items():
+            for peer in peers:
+                if peer not in graph and (peer, length, value) not in connected:
+                    dead_ends.setdefault(peer, []).append(router_ip)
+        for peer, sources in sorted(dead_ends.items()):
+            black_holes.append({"network": network, "router": peer, "from": sorted(sources)})
+        for cycle in find_cycles(graph):
+            loops.append({"network": network, "path": cycle + [cycle[0]]})
+
+    return {
+        "generated": datetime.now().isoformat(),
+        "routers": len(snapshots),
+        "prefixes": len(prefixes),
+        "threshold": threshold,
+        "near_infinity": near_infinity,
+        "hop_count": hop_count,
+        "loops": loops,
+        "black_holes": black_holes,
+        "summary": {
+            "near_infinity": len(near_infinity),
+            "hop_count": len(hop_count),
+            "loops": len(loops),
+            "black_holes": len(black_holes),
+            "unresolved_next_hops": unresolved
+        },
+        "elapsed": round(time.monotonic() - started, 3)
+    }
+
+
+def find_cycles(graph: Dict[str, List[str]]) -> List[List[str]]:
+    """Cycles of a next-hop graph by iterative depth-first search, each reported once"""
+    if all(len(peers) <= 1 for peers in graph.values()):
+        return _follow_cycles(graph)
+    cycles = []
+    seen = set()
+    done = set()
+    for start in graph:
+        if start in done:
+            continue
+        path = [start]
+        on_path = {start: 0}
+        stack = [iter(graph[start])]
+        while stack:
+            peer = next(stack[-1], None)
+            if peer is None:
+                finished = path.pop()
+                del on_path[finished]
+                done.add(finished)
+                stack.pop()
+                continue
+            if peer not in graph or peer in done:
+                continue
+            if peer in on_path:
+                cycle = path[on_path[peer]:]
+                key = frozenset(cycle)
+                if key not in seen:
+                    seen.add(key)
+                    cycles.append(cycle)
+                continue
+            on_path[peer] = len(path)
+            path.append(peer)
+            stack.append(iter(graph[peer]))
+    return cycles
+
+
+def _follow_cycles(graph: Dict[str, List[str]]) -> List[List[str]]:
+    """Without ECMP every router has one next hop, following pointers finds each cycle"""
+    cycles = []
+    walked: Dict[str, str] = {}
+    for start in graph:
+        node = start
+        trail = []
+        while node in graph and node not in walked:
+            walked[node] = start
+            trail.append(node)
+            peers = graph[node]
+            node = peers[0] if peers else None
+        if node in walked and walked[node] == start:
+            cycles.append(trail[trail.index(node):])
+    return cycles
+
+
+class RipAnalyzer:
+    """Caches the last report until one of the analysed snapshots is replaced, and
+    re-indexes only the routers whose snapshot did"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last: Optional[Tuple[Dict[str, Dict], int, Dict]] = None
+        self._tables: Dict[str, Tuple[Dict, Dict[str, Route]]] = {}
+
+    def analyze(self, snapshots: Dict[str, Dict], threshold: int = NEAR_INFINITY) -> Dict:
+        with self._lock:
+            # Snapshots are replaced rather than mutated, identity tells if anything changed
+            if self._last is not None:
+                last_snapshots, last_threshold, report = self._last
+                if (last_threshold == threshold and last_snapshots.keys() == snapshots.keys()
+                        and all(last_snapshots[ip] is snapshot for ip, snapshot in snapshots.items())):
+                    return report
+            tables = {}
+            for router_ip, snapshot in snapshots.items():
+                cached = self._tables.get(router_ip)
+                if cached is None or cached[0] is not snapshot:
+                    cached = (snapshot, index_table(snapshot))
+                tables[router_ip] = cached[1]
+            self._tables = {router_ip: (snapshots[router_ip], tables[router_ip]) for router_ip in snapshots}
+            report = analyze(snapshots, threshold, tables)
+            self._last = (dict(snapshots), threshold, report)
+            return report
@@ -0,0 +1,158 @@
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional
+import threading
+import hashlib
+import hmac
+import time
+import jwt
+import os
+
+SECRET_KEY = os.environ.get("RIP_SECRET_KEY", "your_secret_key")
+TOKEN_EXPIRY = timedelta(hours=24)
+# EventSource cannot send headers, so /events takes a ticket in the URL, short-lived because URLs get logged
+TICKET_EXPIRY = timedelta(seconds=60)
+EVENTS_SCOPE = "events"
+MAX_CACHED_TOKENS = 4096
+# name:key pairs separated by commas, e.g. RIP_API_KEYS="grafana:9f2c...,backup:41d0..."
+API_KEYS = os.environ.get("RIP_API_KEYS", "")
+
+
+class AuthError(Exception):
+    """Rejected credentials, the message is safe to return to the client"""
+
+
+def generate_token(username):
+    expiry = datetime.utcnow() + TOKEN_EXPIRY
+    return jwt.encode(
+        {"username": username, "exp": expiry},
+        SECRET_KEY,
+        algorithm="HS256"
+    )
+
+
+def generate_ticket(username):
+    """Token that only opens the event stream and expires within a minute"""
+    expiry = datetime.utcnow() + TICKET_EXPIRY
+    return jwt.encode(
+        {"username": username, "scope": EVENTS_SCOPE, "exp": expiry},
+        SECRET_KEY,
+        algorithm="HS256"
+    )
+
+
+def digest(secret: str) -> bytes:
+    return hashlib.sha256(secret.encode()).digest()
+
+
+def parse_api_keys(value: str) -> Dict[str, str]:
+    keys = {}
+    for entry in filter(None, (part.strip() for part in value.split(","))):
+        name, sep, key = entry.partition(":")
+        if not sep or not name or not key:
+            raise ValueError("RIP_API_KEYS entries must look like name:key")
+        keys[name] = key
+    return keys
+
+
+class Authenticator:
+    """Verifies bearer JWTs and pre-shared API keys.
+
+    A verified token is remembered by its SHA-256 digest until it expires, so repeat
+    requests skip the signature check. Only digests are kept, never the raw tokens or keys."""
+
+    def __init__(self, secret: str = SECRET_KEY, api_keys: Optional[Dict[str, str]] = None,
+                 max_entries: int = MAX_CACHED_TOKENS):
+        self.secret = secret
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # digest -> (claims, exp)
+        self._verified = OrderedDict()
+        # digest -> exp, dropped once the token would have expired anyway
+        self._revoked: Dict[bytes, float] = {}
+        self._api_keys = {digest(key): name for name, key in (api_keys or {}).items()}
+        # Called with (digest, exp) for every revoke(), to tell other server processes
+        self.on_revoke: Optional[Callable[[bytes, float], None]] = None
+
+    def verify_token(self, token: str, now: Optional[float] = None, scope: Optional[str] = None) -> Dict:
+        """Claims of a valid token, AuthError otherwise.
+
+        Tokens carrying a scope, such as event stream tickets, are only accepted for that scope."""
+        claims = self._verify_token(token, now)
+        if claims.get("scope") != scope:
+            raise AuthError("Ticket only opens the event stream" if scope is None else "Not an event stream ticket")
+        return claims
+
+    def _verify_token(self, token: str, now: Optional[float] = None) -> Dict:
+        now = time.time() if now is None else now
+        key = digest(token)
+        with self._lock:
+            cached = self._verified.get(key)
+            if cached is not None:
+                claims, exp = cached
+                if exp > now:
+                    self._verified.move_to_end(key)
+                    return claims
+                del self._verified[key]
+                raise AuthError("Token has expired")
+            if key in self._revoked:
+                raise AuthError("Token has been revoked")
+
+        try:
+            claims = jwt.decode(token, self.secret, algorithms=["HS256"])
+        except jwt.ExpiredSignatureError:
+            raise AuthError("Token has expired")
+        except jwt.InvalidTokenError:
+            raise AuthError("Invalid token format or signature")
+        exp = float(claims.get("exp", float("inf")))
+        # PyJWT checks exp against the wall clock, an explicit now can still be later
+        if exp <= now:
+            raise AuthError("Token has expired")
+
+        with self._lock:
+            # A revoke() that ran while the signature was being checked wins
+            if key not in self._revoked:
+                self._verified[key] = (claims, exp)
+                if len(self._verified) > self.max_entries:
+                    self._verified.popitem(last=False)
+        return claims
+
+    def verify_api_key(self, api_key: str) -> Dict:
+        """Claims for a pre-shared API key, AuthError otherwise"""
+        # Compare digests against every key without stopping early, timing says nothing about a near miss
+        key = digest(api_key)
+        name = None
+        for known, known_name in self._api_keys.items():
+            if hmac.compare_digest(key, known):
+                name = known_name
+        if name is None:
+            raise AuthError("Invalid API key")
+        return {"username": name, "api_key": True}
+
+    def revoke(self, token: str, now: Optional[float] = None):
+        """Reject a token from now on, e.g. on logout"""
+        key = digest(token)
+        try:
+            exp = float(jwt.decode(token, options={"verify_signature": False}).get("exp", float("inf")))
+        except jwt.InvalidTokenError:
+            exp = float("inf")
+        self.revoke_digest(key, exp, now)
+        if self.on_revoke is not None:
+            self.on_revoke(key, exp)
+
+    def revoke_digest(self, key: bytes, exp: float, now: Optional[float] = None):
+        now = time.time() if now is None else now
+        with self._lock:
+            self._verified.pop(key, None)
+            self._revoked[key] = exp
+            for revoked, revoked_exp in list(self._revoked.items()):
+                if revoked_exp <= now:
+                    del self._revoked[revoked]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"cached": len(self._verified), "revoked": len(self._revoked), "api_keys": len(self._api_keys)}
+
+
+# Shared by the Flask and aiohttp apps
+AUTH = Authenticator(SECRET_KEY, parse_api_keys(API_KEYS))
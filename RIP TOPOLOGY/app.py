@@ -1,16 +1,40 @@
 import sys
 import os
-from flask import Flask, request
+from flask import Flask, request, Response, g, make_response, send_from_directory, stream_with_context
 from flask_restx import Api, Resource, fields
+from werkzeug.exceptions import RequestEntityTooLarge
 import json
-import jwt
 from functools import wraps
 import router_utils as ru
-from datetime import datetime, timedelta
+import fleet
+import poller
+import inventory
+import jobs
+import route_diff
+import events
+import topology
+import gns3
+import analysis
+import route_index
+import history
+import registration
+import shared_state
+import session_logging
+import api_auth
+from api_auth import TOKEN_EXPIRY, generate_token
+import metrics
+import scheduler
+import records
+import threading
+import time
+from datetime import datetime
 
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 app = Flask(__name__)
+# Largest request body read, GNS3 projects are the biggest uploads and stay well under this
+MAX_UPLOAD = int(os.environ.get("RIP_MAX_UPLOAD", str(16 * 1024 * 1024)))
+app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD
 
 # Configure Swagger UI with Authorization button
 authorizations = {
@@ -18,6 +42,11 @@ authorizations = {
         'type': 'apiKey',
         'in': 'header',
         'name': 'Authorization'
+    },
+    'presharedkey': {
+        'type': 'apiKey',
+        'in': 'header',
+        'name': 'X-API-Key'
     }
 }
 
@@ -26,59 +55,226 @@ api = Api(app,
           version="1.0", 
           description="Manage RIP Routers. Authorize using the button above with your JWT token.",
           authorizations=authorizations,
-          security='apikey')
+          security=['apikey', 'presharedkey'])
 
-DB_FILE = "routers_db.json"
-SECRET_KEY = "your_secret_key"
-TOKEN_EXPIRY = timedelta(hours=24)
+DB_FILE = os.environ.get("RIP_INVENTORY", "routers_db.json")
+POLL_INTERVAL = float(os.environ.get("RIP_POLL_INTERVAL", "30"))
+# Empty disables the history store
+HISTORY_DB = os.environ.get("RIP_HISTORY", "rip_history.db")
+# SQLite file shared by the worker processes of a multi-worker server, empty for a single process
+SHARED_STATE = os.environ.get("RIP_SHARED_STATE", "")
+METRICS_PUBLIC = os.environ.get("RIP_METRICS_PUBLIC", "").lower() in ("1", "true", "yes")
+# Routers a config push job works on at once, on its own pool so pushes leave fan-out reads their threads
+JOB_WORKERS = max(1, int(os.environ.get("RIP_JOB_WORKERS", "20")))
+# With several workers an idle session holds a VTY line another worker may be waiting for
+SHARED_IDLE_TIMEOUT = float(os.environ.get("RIP_SHARED_IDLE_TIMEOUT", "5"))
+GNS3_PROJECT = os.environ.get(
+    "RIP_GNS3_PROJECT",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "Rip-to-Rest-main1", "RIP TOPOLOGY.json")
+)
 
-def generate_token(username):
-    expiry = datetime.utcnow() + TOKEN_EXPIRY
-    return jwt.encode(
-        {"username": username, "exp": expiry},
-        SECRET_KEY,
-        algorithm="HS256"
-    )
+def bearer_token(header):
+    return header[len("Bearer "):] if header.startswith("Bearer ") else header
 
 def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
+        api_key = request.headers.get("X-API-Key")
         token = request.headers.get("Authorization")
-        if not token:
+        if not token and not api_key:
             return {"msg": "Token is missing"}, 401
-            
-        if token.startswith("Bearer "):
-            token = token.replace("Bearer ", "")
-            
+
         try:
-            jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
-        except jwt.ExpiredSignatureError:
-            return {"msg": "Token has expired"}, 401
-        except jwt.InvalidTokenError:
-            return {"msg": "Invalid token format or signature"}, 401
-        except Exception as e:
-            return {"msg": f"Authentication error: {str(e)}"}, 401
-            
+            if api_key:
+                payload = api_auth.AUTH.verify_api_key(api_key)
+            else:
+                payload = api_auth.AUTH.verify_token(bearer_token(token))
+        except api_auth.AuthError as e:
+            return {"msg": str(e)}, 401
+
+        g.username = payload.get('username')
+        # Router queues take turns between clients, reset with the request in clear_request_id
+        scheduler.CLIENT.set(f"{payload.get('username')}@{request.remote_addr}")
+        return f(*args, **kwargs)
+    return decorated
+
+def ticket_accepted(f):
+    """token_required that also takes a ?ticket= from /events/ticket, for EventSource which cannot set headers"""
+    guarded = token_required(f)
+
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        ticket = request.args.get("ticket")
+        if ticket is None or request.headers.get("Authorization") or request.headers.get("X-API-Key"):
+            return guarded(*args, **kwargs)
+        try:
+            payload = api_auth.AUTH.verify_token(ticket, scope=api_auth.EVENTS_SCOPE)
+        except api_auth.AuthError as e:
+            return {"msg": str(e)}, 401
+        g.username = payload.get('username')
         return f(*args, **kwargs)
     return decorated
 
+INVENTORY = inventory.open_inventory(DB_FILE)
+
 def load_routers():
-    try:
-        with open(DB_FILE, 'r') as f:
-            routers = json.load(f)
-            print("Loaded routers:", routers)
-            return routers
-    except:
-        return []
+    with metrics.INVENTORY_SECONDS.time():
+        return INVENTORY.all()
+
+def find_router(ip):
+    return INVENTORY.get(ip)
 
 def save_routers(routers):
     try:
-        with open(DB_FILE, 'w') as f:
-            json.dump(routers, f, indent=2)
+        INVENTORY.replace_all(routers)
     except Exception as e:
         print(f"Error saving routers: {e}")
         raise RuntimeError(f"Failed to save routers: {e}")
 
+def router_busy(e):
+    """503 with Retry-After for a request turned away by the router's session queue"""
+    return {'error': str(e)}, 503, {'Retry-After': str(scheduler.RETRY_AFTER)}
+
+def router_error(e):
+    """Response for a failed live read, 503 when the router is busy, 504 when it did not answer in time, else 502"""
+    if isinstance(e, scheduler.RouterBusy):
+        return router_busy(e)
+    return {'error': str(e) or type(e).__name__}, 504 if ru.is_timeout(e) else 502
+
+def interface_changes_error(interfaces):
+    """Why a list of interface changes is malformed, None when every entry names an interface and an action"""
+    if not isinstance(interfaces, list) or not all(
+            isinstance(i, dict) and isinstance(i.get('interface'), str) and i.get('action') in ['enable', 'disable']
+            for i in interfaces):
+        return 'Each interface change needs an interface and an enable/disable action'
+    return None
+
+def wants_fresh():
+    """True when the client asked to bypass the snapshot cache with ?fresh=true"""
+    return request.args.get('fresh', '').lower() in ('1', 'true', 'yes')
+
+JOBS = jobs.JobManager(max_workers=JOB_WORKERS)
+ROUTES = route_diff.RouteTracker()
+WATCHER = events.ConvergenceWatcher(events.BUS, ROUTES)
+poller.CACHE.add_listener(WATCHER.on_snapshot)
+# Dropped snapshots, from deregistration or a config change, take the router's derived state with them
+poller.CACHE.add_remove_listener(ROUTES.remove)
+TOPOLOGY = topology.TopologyGraph()
+poller.CACHE.add_listener(TOPOLOGY.on_snapshot)
+poller.CACHE.add_remove_listener(TOPOLOGY.remove)
+if os.path.exists(GNS3_PROJECT):
+    TOPOLOGY.load_gns3(gns3.load_project(GNS3_PROJECT))
+ANALYZER = analysis.RipAnalyzer()
+ROUTE_INDEX = route_index.RouteIndex()
+poller.CACHE.add_listener(ROUTE_INDEX.on_snapshot)
+poller.CACHE.add_remove_listener(ROUTE_INDEX.remove)
+# Created on first use, importing the app must not leave a database in the working directory
+HISTORY = None
+HISTORY_LOCK = threading.Lock()
+REGISTRATION = registration.RegistrationValidator(INVENTORY)
+# Registered last, the route version it writes through must already be bumped by WATCHER
+SHARED = shared_state.SharedState(SHARED_STATE, poller.CACHE, ROUTES, api_auth.AUTH,
+                                  poll_error_listener=WATCHER.on_poll_error) if SHARED_STATE else None
+
+def on_poll_error(router_ip, error):
+    """Publish a failed poll here and, through SHARED, on the workers that do not poll"""
+    WATCHER.on_poll_error(router_ip, error)
+    if SHARED is not None:
+        SHARED.on_poll_error(router_ip, error)
+
+POLLER = poller.RipPoller(load_routers, POLL_INTERVAL, on_error=on_poll_error)
+JOBS.store = SHARED
+if SHARED is not None:
+    # Every worker has its own pool, the gate keeps their logins together within RIP_MAX_SESSIONS
+    ru.POOL.gate = shared_state.SessionGate(SHARED_STATE + ".sessions", scheduler.MAX_SESSIONS)
+    ru.POOL.idle_timeout = min(ru.POOL.idle_timeout, SHARED_IDLE_TIMEOUT)
+
+def history_store():
+    """The history store, None when RIP_HISTORY is empty"""
+    global HISTORY
+    with HISTORY_LOCK:
+        if HISTORY is None and HISTORY_DB:
+            HISTORY = history.HistoryStore(HISTORY_DB, bus=events.BUS)
+    return HISTORY
+
+def start_leader_tasks():
+    """Start the RIP poller, the history writer and unfinished router validations, once per server"""
+    REGISTRATION.resume()
+    if POLL_INTERVAL > 0:
+        POLLER.start()
+    store = history_store()
+    if store is not None:
+        # Only the leader records history, it sees every worker's snapshots through SHARED
+        poller.CACHE.add_listener(store.on_snapshot)
+        store.start()
+
+def start_background_tasks():
+    """Start background work in the serving process, with shared state only the elected worker polls"""
+    # Idle Telnet sessions hold VTY lines whether or not other workers want them
+    ru.POOL.start_reaper()
+    if SHARED is not None:
+        SHARED.start(on_leader=start_leader_tasks)
+    else:
+        start_leader_tasks()
+
+def parse_time(value, default):
+    """Epoch seconds or ISO 8601 from a query string"""
+    if not value:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+metrics.CallbackMetric(
+    "rip_read_cache_requests_total", "Read-through cache lookups by result", "counter",
+    lambda: {(result,): ru.READ_CACHE.stats()[key] for result, key in (("hit", "hits"), ("miss", "misses"))},
+    ["result"])
+metrics.CallbackMetric("rip_read_cache_entries", "Cached command outputs", "gauge",
+                       lambda: {(): ru.READ_CACHE.stats()["entries"]})
+metrics.CallbackMetric("rip_pool_sessions", "Pooled Telnet sessions by state", "gauge",
+                       lambda: {(state,): count for state, count in ru.POOL.stats().items() if state != "routers"},
+                       ["state"])
+metrics.CallbackMetric(
+    "rip_router_sessions", "Router session slots in use and requests waiting for one", "gauge",
+    lambda: {(state,): sum(router[state] for router in scheduler.SCHEDULER.stats().values())
+             for state in ("active", "queued")}, ["state"])
+
+@api.representation('application/json')
+def timed_json(data, code, headers=None):
+    # Snapshots hold slotted route, neighbor and interface records, written from their cached JSON text
+    with metrics.JSON_SECONDS.time():
+        resp = make_response(records.dumps(data) + "\n", code)
+        resp.headers.extend(headers or {})
+        return resp
+
+@app.before_request
+def assign_request_id():
+    """Tag router session logs with the caller's X-Request-ID or a fresh one"""
+    request_id = request.headers.get('X-Request-ID') or session_logging.new_request_id()
+    g.request_id = request_id
+    g.request_id_token = session_logging.REQUEST_ID.set(request_id)
+    g.client_token = scheduler.CLIENT.set(request.remote_addr)
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def return_request_id(response):
+    if 'request_id' in g:
+        response.headers['X-Request-ID'] = g.request_id
+    if 'request_started' in g:
+        # The URL rule rather than the path keeps router IPs out of the label set
+        route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        metrics.REQUEST_SECONDS.observe(time.perf_counter() - g.request_started,
+                                        request.method, route, str(response.status_code))
+    return response
+
+@app.teardown_request
+def clear_request_id(exc):
+    if 'request_id_token' in g:
+        session_logging.REQUEST_ID.reset(g.pop('request_id_token'))
+    if 'client_token' in g:
+        scheduler.CLIENT.reset(g.pop('client_token'))
+
 ### MODELS ###
 login_model = api.model('Login', {
     'username': fields.String(required=True),
@@ -86,7 +282,7 @@ login_model = api.model('Login', {
 })
 
 router_model = api.model('Router', {
-    'ip': fields.String(required=True),
+    'ip': fields.String(required=True, description='Router IP, or host:port of a console such as GNS3'),
     'username': fields.String(required=True),
     'password': fields.String(required=True)
 })
@@ -95,11 +291,28 @@ rip_config_model = api.model('RIPConfig', {
     'version': fields.String(required=True, enum=['1', '2'])
 })
 
+batch_model = api.model('CommandBatch', {
+    'commands': fields.List(fields.String, required=True, description='Show commands run in order over one session')
+})
+
 interface_config_model = api.model('InterfaceConfig', {
     'interface': fields.String(required=True),
     'action': fields.String(required=True, enum=['enable', 'disable'])
 })
 
+rip_transaction_model = api.model('RIPTransaction', {
+    'version': fields.String(enum=['1', '2']),
+    'interfaces': fields.List(fields.Nested(interface_config_model))
+})
+
+fleet_config_model = api.model('FleetRIPConfig', {
+    'routers': fields.List(fields.String, description='Router IPs to change, all registered routers if omitted'),
+    'selector': fields.String(description="Glob over router IPs, e.g. '192.168.1.*'"),
+    'version': fields.String(enum=['1', '2']),
+    'interfaces': fields.List(fields.Nested(interface_config_model)),
+    'concurrency': fields.Integer(description='Routers configured at the same time')
+})
+
 ### ROUTES ###
 @api.route('/login')
 class Login(Resource):
@@ -114,6 +327,16 @@ class Login(Resource):
             }, 200
         return {'msg': 'Invalid credentials'}, 401
 
+@api.route('/logout')
+class Logout(Resource):
+    @token_required
+    def post(self):
+        token = request.headers.get("Authorization")
+        if not token:
+            return {'error': 'API keys cannot be revoked by logging out'}, 400
+        api_auth.AUTH.revoke(bearer_token(token))
+        return {'msg': 'Token revoked'}, 200
+
 @api.route('/routers')
 class Routers(Resource):
     @api.expect(router_model)
@@ -121,19 +344,21 @@ class Routers(Resource):
     def post(self):
         try:
             data = request.json
-            if not data or not all(key in data for key in ['ip', 'username', 'password']):
+            # One router or a list of them, validated in the background either way
+            routers = data if isinstance(data, list) else [data]
+            required = ['ip', 'username', 'password']
+            if not data or not all(isinstance(router, dict) and all(key in router for key in required)
+                                   for router in routers):
                 return {'error': 'Invalid data'}, 400
-            
-            # Validate router connection
-            try:
-                ru.get_rip_routes(data['ip'], data['username'], data['password'])
-            except Exception as e:
-                return {'error': f'Failed to connect to router: {str(e)}'}, 400
-            
-            routers = load_routers()
-            routers.append(data)
-            save_routers(routers)
-            return {'msg': 'Router added successfully'}, 200
+
+            registered = [
+                dict(registration.status_of(record), status_url=f"/routers/{record['ip']}/status")
+                for record in REGISTRATION.register(routers)
+            ]
+            if isinstance(data, list):
+                return {'msg': 'Router registration accepted', 'routers': registered}, 202
+            return ({'msg': 'Router registration accepted', 'router': registered[0]}, 202,
+                    {'Location': registered[0]['status_url']})
         except Exception as e:
             return {'error': str(e)}, 500
 
@@ -142,31 +367,125 @@ class Routers(Resource):
         routers = load_routers()
         return {'routers': routers}, 200
 
+@api.route('/routers/<string:ip>/status')
+class RouterRegistrationStatus(Resource):
+    @api.doc(description='Registration status: pending until the background login check finishes, '
+                         'then reachable with login latency and RIP version, auth_failed when the router '
+                         'rejects the credentials, or unreachable with the error')
+    @token_required
+    def get(self, ip):
+        router = find_router(ip)
+        if not router:
+            return {'msg': 'Router not found'}, 404
+        return registration.status_of(router), 200
+
+@api.route('/routers/import')
+class RouterImport(Resource):
+    @api.doc(description='Register every router of a GNS3 project by its console host:port. '
+                         'Send the .gns3 file as the JSON body or as the multipart field project.',
+             params={
+                 'username': 'Login username for the imported routers',
+                 'password': 'Login password for the imported routers',
+                 'host': 'Address of the GNS3 server, replaces the console host in the project',
+                 'validate': 'Set to false to register without logging in to each router first',
+                 'timeout': 'Seconds to wait for the slowest router when validating'
+             })
+    @token_required
+    def post(self):
+        try:
+            upload = request.files.get('project')
+            project = json.load(upload.stream) if upload else json.loads(request.get_data())
+        except RequestEntityTooLarge:
+            return {'error': f'GNS3 project is larger than {MAX_UPLOAD} bytes'}, 413
+        except ValueError as e:
+            return {'error': f'Invalid GNS3 project: {str(e)}'}, 400
+        if not isinstance(project, dict) or 'topology' not in project:
+            return {'error': 'Invalid GNS3 project: no topology'}, 400
+        username = request.values.get('username', '')
+        password = request.values.get('password')
+        if password is None:
+            return {'error': 'password is required'}, 400
+        validate = request.values.get('validate', 'true').lower() not in ('0', 'false', 'no')
+        timeout = request.values.get('timeout', fleet.DEFAULT_TIMEOUT, type=float)
+
+        routers = [dict(router, username=username, password=password)
+                   for router in gns3.parse_routers(project, request.values.get('host'))]
+        if not routers:
+            return {'error': 'The project has no router with a Telnet console'}, 400
+
+        if validate:
+            checked_at = datetime.now().isoformat()
+            result = fleet.fan_out(routers, ru.probe, 'probe', timeout)
+            # Routers that could not be logged in to are reported, not registered
+            imported = [router for router in routers if result['routers'][router['ip']]['status'] == 'ok']
+            REGISTRATION.register_checked(
+                imported, {router['ip']: result['routers'][router['ip']]['probe'] for router in imported}, checked_at)
+        else:
+            result = {'routers': {router['ip']: {'status': 'ok'} for router in routers},
+                      'summary': {'ok': len(routers), 'error': 0, 'timeout': 0}}
+            imported = routers
+            # Pending like any other registration, checked in the background
+            REGISTRATION.register(imported)
+        TOPOLOGY.load_gns3(project)
+        for router in routers:
+            result['routers'][router['ip']]['name'] = router['name']
+        return dict(result, imported=len(imported)), 200
+
 @api.route('/routers/<string:ip>/rip/routes')
 class RIPRoutes(Resource):
+    @api.doc(params={
+        'fresh': 'Set to true to bypass the snapshot cache and read the router live',
+        'since': 'Route table version from an earlier response, only the changes after it are returned'
+    })
     @token_required
     def get(self, ip):
-        router = next((r for r in load_routers() if r['ip'] == ip), None)
+        router = find_router(ip)
         if not router:
             return {'msg': 'Router not found'}, 404
-        try:
-            result = ru.get_rip_routes(ip, router['username'], router['password'])
-            return {'routes': result}, 200
-        except Exception as e:
-            return {'error': str(e)}, 500
+        since = request.args.get('since')
+        if since is not None and not since.isdigit():
+            return {'error': 'since must be a route table version'}, 400
+        snapshot = None if wants_fresh() else poller.CACHE.get(ip)
+        if snapshot is None or 'routes' not in snapshot:
+            try:
+                result = ru.get_rip_routes(ip, router['username'], router['password'], fresh=wants_fresh())
+            except Exception as e:
+                # Only a successful read may replace the snapshot the tracker, index and history follow
+                return router_error(e)
+            poller.CACHE.update(ip, routes=result)
+            snapshot = poller.CACHE.get(ip)
+
+        etag = ROUTES.etag(ip)
+        headers = {'ETag': f'"{etag}"'} if etag else {}
+        if etag and request.if_none_match.contains(etag):
+            return '', 304, headers
+        body = {'version': ROUTES.version(ip), 'last_updated': snapshot['last_updated']}
+        if since is not None:
+            changes = ROUTES.since(ip, int(since))
+            body['full'] = changes is None
+            if changes is not None:
+                body['changes'] = changes
+                return body, 200, headers
+        body['routes'] = snapshot['routes']
+        return body, 200, headers
 
 @api.route('/routers/<string:ip>/rip/neighbors')
 class RIPNeighbors(Resource):
+    @api.doc(params={'fresh': 'Set to true to bypass the snapshot cache and read the router live'})
     @token_required
     def get(self, ip):
-        router = next((r for r in load_routers() if r['ip'] == ip), None)
+        router = find_router(ip)
         if not router:
             return {'msg': 'Router not found'}, 404
+        snapshot = None if wants_fresh() else poller.CACHE.get(ip)
+        if snapshot is not None and 'neighbors' in snapshot:
+            return {'neighbors': snapshot['neighbors'], 'last_updated': snapshot['last_updated']}, 200
         try:
-            result = ru.get_rip_neighbors(ip, router['username'], router['password'])
-            return {'neighbors': result}, 200
+            result = ru.get_rip_neighbors(ip, router['username'], router['password'], fresh=wants_fresh())
         except Exception as e:
-            return {'error': str(e)}, 500
+            return router_error(e)
+        poller.CACHE.update(ip, neighbors=result)
+        return {'neighbors': result}, 200
 
 @api.route('/routers/<string:ip>/rip/config')
 class RIPConfig(Resource):
@@ -174,12 +493,15 @@ class RIPConfig(Resource):
     @token_required
     def post(self, ip):
         data = request.json
-        router = next((r for r in load_routers() if r['ip'] == ip), None)
+        router = find_router(ip)
         if not router:
             return {'msg': 'Router not found'}, 404
         try:
             result = ru.set_rip_version(ip, router['username'], router['password'], data['version'])
+            poller.CACHE.remove(ip)
             return result, 200 if result['status'] == 'success' else 400
+        except scheduler.RouterBusy as e:
+            return router_busy(e)
         except Exception as e:
             return {'error': str(e)}, 500
 
@@ -189,7 +511,7 @@ class RIPInterfaces(Resource):
     @token_required
     def post(self, ip):
         data = request.json
-        router = next((r for r in load_routers() if r['ip'] == ip), None)
+        router = find_router(ip)
         if not router:
             return {'msg': 'Router not found'}, 404
         try:
@@ -200,24 +522,265 @@ class RIPInterfaces(Resource):
                 data['interface'],
                 data['action']
             )
+            poller.CACHE.remove(ip)
+            return result, 200 if result['status'] == 'success' else 400
+        except scheduler.RouterBusy as e:
+            return router_busy(e)
+        except Exception as e:
+            return {'error': str(e)}, 500
+
+@api.route('/routers/<string:ip>/rip/transaction')
+class RIPTransaction(Resource):
+    @api.expect(rip_transaction_model)
+    @token_required
+    def post(self, ip):
+        data = request.json or {}
+        router = find_router(ip)
+        if not router:
+            return {'msg': 'Router not found'}, 404
+        if not isinstance(data, dict):
+            return {'error': 'Invalid data'}, 400
+        error = interface_changes_error(data.get('interfaces') or [])
+        if error:
+            return {'error': error}, 400
+        try:
+            result = ru.apply_rip_changes(
+                ip,
+                router['username'],
+                router['password'],
+                data.get('version'),
+                data.get('interfaces') or []
+            )
+            poller.CACHE.remove(ip)
             return result, 200 if result['status'] == 'success' else 400
+        except scheduler.RouterBusy as e:
+            return router_busy(e)
+        except Exception as e:
+            return {'error': str(e)}, 500
+
+@api.route('/routers/<string:ip>/exec/batch')
+class CommandBatch(Resource):
+    @api.expect(batch_model)
+    @token_required
+    def post(self, ip):
+        data = request.json
+        commands = data.get('commands') if data else None
+        if not isinstance(commands, list) or not commands or not all(isinstance(c, str) for c in commands):
+            return {'error': 'commands must be a non-empty list of strings'}, 400
+        if len(commands) > ru.MAX_BATCH_COMMANDS:
+            return {'error': f'At most {ru.MAX_BATCH_COMMANDS} commands per batch'}, 400
+        router = find_router(ip)
+        if not router:
+            return {'msg': 'Router not found'}, 404
+        try:
+            results = ru.run_batch(ip, router['username'], router['password'], commands)
+            return {'results': results}, 200
+        except ValueError as e:
+            return {'error': str(e)}, 400
+        except scheduler.RouterBusy as e:
+            return router_busy(e)
         except Exception as e:
             return {'error': str(e)}, 500
 
 @api.route('/routers/<string:ip>/state')
 class RouterState(Resource):
+    @api.doc(params={'fresh': 'Set to true to bypass the snapshot cache and read the router live'})
     @token_required
     def get(self, ip):
-        router = next((r for r in load_routers() if r['ip'] == ip), None)
+        router = find_router(ip)
         if not router:
             return {'msg': 'Router not found'}, 404
+        snapshot = None if wants_fresh() else poller.CACHE.get(ip)
+        if poller.is_complete(snapshot):
+            return snapshot, 200
         try:
-            result = ru.get_router_state(ip, router['username'], router['password'])
+            # Nothing cached yet, or only what a live routes or neighbors read merged in
+            result = poller.collect(router)
             return result, 200
         except Exception as e:
-            return {'error': str(e)}, 500
+            return router_error(e)
+
+@api.route('/fleet/rip/routes')
+class FleetRIPRoutes(Resource):
+    @api.doc(params={'timeout': 'Seconds to wait for the slowest router'})
+    @token_required
+    def get(self):
+        timeout = request.args.get('timeout', fleet.DEFAULT_TIMEOUT, type=float)
+        result = fleet.fan_out(load_routers(), ru.get_rip_routes, 'routes', timeout)
+        return result, 200
+
+@api.route('/fleet/rip/neighbors')
+class FleetRIPNeighbors(Resource):
+    @api.doc(params={'timeout': 'Seconds to wait for the slowest router'})
+    @token_required
+    def get(self):
+        timeout = request.args.get('timeout', fleet.DEFAULT_TIMEOUT, type=float)
+        result = fleet.fan_out(load_routers(), ru.get_rip_neighbors, 'neighbors', timeout)
+        return result, 200
+
+@api.route('/fleet/rip/config')
+class FleetRIPConfig(Resource):
+    @api.expect(fleet_config_model)
+    @token_required
+    def post(self):
+        data = request.json or {}
+        version = data.get('version')
+        interfaces = data.get('interfaces') or []
+        if version is None and not interfaces:
+            return {'error': 'Nothing to configure, give a version and/or interfaces'}, 400
+        if version is not None and version not in ['1', '2']:
+            return {'error': 'Invalid RIP version. Must be 1 or 2.'}, 400
+        error = interface_changes_error(interfaces)
+        if error:
+            return {'error': error}, 400
+
+        routers = fleet.select_routers(load_routers(), data.get('routers'), data.get('selector'))
+        if not routers:
+            return {'msg': 'No routers matched'}, 404
+
+        def task(router):
+            result = fleet.push_rip_config(router, version, interfaces)
+            poller.CACHE.remove(router['ip'])
+            return result
+
+        job = JOBS.submit('rip_config', routers, task, data.get('concurrency'))
+        return {'job_id': job.id, 'routers': len(routers), 'status_url': f'/jobs/{job.id}'}, 202
+
+@api.route('/jobs/<string:job_id>')
+class JobStatus(Resource):
+    @token_required
+    def get(self, job_id):
+        job = JOBS.status(job_id)
+        if not job:
+            return {'msg': 'Job not found'}, 404
+        return job, 200
+
+@api.route('/events')
+class Events(Resource):
+    @api.doc(description='Server-Sent Events stream of route changes, neighbor up/down and poll errors. '
+                         'Browsers pass a ticket from POST /events/ticket, other clients the usual headers.',
+             params={'ticket': 'Stream ticket, valid for a minute',
+                     'last_event_id': 'Resume after this event id when a new stream replaces a dropped one'})
+    @ticket_accepted
+    def get(self):
+        last_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+        after_id = int(last_id) if last_id and last_id.isdigit() else None
+        # A stream holds its thread until the client leaves, past the limit it would take one from REST requests
+        if not events.STREAMS.acquire(blocking=False):
+            return {'error': f'This worker already serves {events.MAX_STREAMS} event streams'}, 503, \
+                {'Retry-After': str(scheduler.RETRY_AFTER)}
+        response = Response(
+            stream_with_context(events.sse_stream(events.BUS, after_id)),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+        # Runs when the server closes the response, also if the stream never started
+        response.call_on_close(events.STREAMS.release)
+        return response
+
+@api.route('/topology')
+class Topology(Resource):
+    @api.doc(description='Nodes, edges and per-link state from the GNS3 project and live RIP neighbors. '
+                         'Edges are arrays in edge_fields order indexing the node list.')
+    @token_required
+    def get(self):
+        version, body = TOPOLOGY.render(load_routers())
+        headers = {'ETag': f'"topology-{version}"'}
+        if request.if_none_match.contains(f'topology-{version}'):
+            return '', 304, headers
+        return Response(body, mimetype='application/json', headers=headers)
+
+@api.route('/analysis/rip')
+class RIPAnalysis(Resource):
+    @api.doc(params={'threshold': f'Metric at which routes count as nearing infinity, default {analysis.NEAR_INFINITY}'})
+    @token_required
+    def get(self):
+        threshold = request.args.get('threshold', analysis.NEAR_INFINITY, type=int)
+        routers = load_routers()
+        snapshots = {}
+        for router in routers:
+            snapshot = poller.CACHE.get(router['ip'])
+            if snapshot is not None and 'routes' in snapshot:
+                snapshots[router['ip']] = snapshot
+        report = ANALYZER.analyze(snapshots, threshold)
+        return dict(report, unpolled=sorted(r['ip'] for r in routers if r['ip'] not in snapshots)), 200
+
+@api.route('/lookup')
+class Lookup(Resource):
+    @api.doc(params={
+        'dst': 'Destination IPv4 address',
+        'router': 'Only this router, or where a trace starts',
+        'trace': 'Set to true to follow next hops router by router from router'
+    })
+    @token_required
+    def get(self):
+        dst = request.args.get('dst', '')
+        router_ip = request.args.get('router')
+        trace = request.args.get('trace', '').lower() in ('1', 'true', 'yes')
+        try:
+            records.ip_to_int(dst)
+        except ValueError as e:
+            return {'error': str(e)}, 400
+        if trace and not router_ip:
+            return {'error': 'A trace needs the router to start from'}, 400
+        if router_ip and not find_router(router_ip):
+            return {'msg': 'Router not found'}, 404
+        if trace:
+            return ROUTE_INDEX.trace(router_ip, dst), 200
+        if router_ip:
+            return {'dst': dst, 'routers': {router_ip: ROUTE_INDEX.lookup(router_ip, dst)}}, 200
+        return {'dst': dst, 'routers': ROUTE_INDEX.lookup_all(dst)}, 200
+
+@api.route('/routers/<string:ip>/history')
+class RouterHistory(Resource):
+    @api.doc(params={
+        'from': 'Start as epoch seconds or ISO 8601, default one day ago',
+        'to': 'End as epoch seconds or ISO 8601, default now',
+        'limit': 'Most samples and events returned, default 1000',
+        'routes': 'Set to false to leave route tables out of the samples'
+    })
+    @token_required
+    def get(self, ip):
+        store = history_store()
+        if store is None:
+            return {'msg': 'History is disabled'}, 404
+        if not find_router(ip):
+            return {'msg': 'Router not found'}, 404
+        now = datetime.now().timestamp()
+        try:
+            start = parse_time(request.args.get('from'), now - history.DAY)
+            end = parse_time(request.args.get('to'), now)
+        except ValueError as e:
+            return {'error': f'Invalid time: {str(e)}'}, 400
+        limit = request.args.get('limit', 1000, type=int)
+        include_routes = request.args.get('routes', 'true').lower() not in ('0', 'false', 'no')
+        return store.query(ip, start, end, limit, include_routes), 200
+
+@api.route('/events/ticket')
+class EventsTicket(Resource):
+    @api.doc(description='Short-lived ticket for GET /events?ticket=, keeps the bearer token out of URLs and logs')
+    @token_required
+    def post(self):
+        return {'ticket': api_auth.generate_ticket(g.username),
+                'expires_in': api_auth.TICKET_EXPIRY.total_seconds()}, 200
+
+def prometheus_metrics():
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+# Scrapers send an API key in X-API-Key, set RIP_METRICS_PUBLIC=1 to serve metrics without one
+app.add_url_rule('/metrics', 'prometheus_metrics',
+                 prometheus_metrics if METRICS_PUBLIC else token_required(prometheus_metrics))
+
+# Public on purpose, the page is static and every call it makes needs the token typed into it
+@app.route('/dashboard')
+def dashboard():
+    return send_from_directory(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rip_dashboard'),
+                               'frontend.html')
 
 if __name__ == '__main__':
+    # The debug reloader imports this module twice, only poll from the serving child
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_background_tasks()
     app.run(debug=True)
 
 
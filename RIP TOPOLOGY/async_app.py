@@ -0,0 +1,180 @@
+from aiohttp import web
+from typing import Optional
+import asyncio
+import json
+import os
+import async_router as ar
+import inventory
+import records
+from api_auth import AUTH, AuthError, TOKEN_EXPIRY, generate_token
+
+ASYNC_PORT = int(os.environ.get("RIP_ASYNC_PORT", "8080"))
+FLEET_TIMEOUT = 30.0
+# Longest ?timeout= a fleet read accepts, a request open longer would outlive most clients and proxies
+MAX_FLEET_TIMEOUT = 300.0
+# The same inventory the Flask app serves, without importing the Flask app and its background state
+INVENTORY = inventory.open_inventory(os.environ.get("RIP_INVENTORY", "routers_db.json"))
+
+routes = web.RouteTableDef()
+
+
+def json_response(body, status=200):
+    return web.json_response(body, status=status, dumps=records.dumps)
+
+
+@web.middleware
+async def token_required(request, handler):
+    if request.path == '/login':
+        return await handler(request)
+    api_key = request.headers.get("X-API-Key")
+    token = request.headers.get("Authorization")
+    if not token and not api_key:
+        return json_response({"msg": "Token is missing"}, 401)
+    if token and token.startswith("Bearer "):
+        token = token.replace("Bearer ", "")
+    try:
+        if api_key:
+            AUTH.verify_api_key(api_key)
+        else:
+            AUTH.verify_token(token)
+    except AuthError as e:
+        return json_response({"msg": str(e)}, 401)
+    return await handler(request)
+
+
+async def read_json(request):
+    try:
+        return await request.json()
+    except json.JSONDecodeError:
+        return None
+
+
+async def in_executor(fn, *args):
+    """Run blocking file or SQLite I/O on a worker thread so it never stalls the event loop"""
+    return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+
+def fleet_timeout(request) -> Optional[float]:
+    """?timeout= in seconds, None when it is not a number above 0 and up to MAX_FLEET_TIMEOUT"""
+    try:
+        timeout = float(request.query.get('timeout', FLEET_TIMEOUT))
+    except ValueError:
+        return None
+    # Also turns away nan, which compares false either way
+    return timeout if 0 < timeout <= MAX_FLEET_TIMEOUT else None
+
+
+def bad_timeout():
+    return json_response({'error': f'timeout must be a number of seconds above 0 and up to {MAX_FLEET_TIMEOUT:g}'}, 400)
+
+
+async def find_router(request):
+    return await in_executor(INVENTORY.get, request.match_info['ip'])
+
+
+@routes.post('/login')
+async def login(request):
+    data = await read_json(request) or {}
+    if data.get('username') == 'admin' and data.get('password') == 'admin':
+        return json_response({
+            'token': generate_token(data['username']),
+            'expires_in': TOKEN_EXPIRY.total_seconds()
+        })
+    return json_response({'msg': 'Invalid credentials'}, 401)
+
+
+@routes.get('/routers')
+async def list_routers(request):
+    return json_response({'routers': await in_executor(INVENTORY.all)})
+
+
+@routes.get('/routers/{ip}/rip/routes')
+async def rip_routes(request):
+    router = await find_router(request)
+    if not router:
+        return json_response({'msg': 'Router not found'}, 404)
+    try:
+        result = await ar.get_rip_routes(router['ip'], router['username'], router['password'])
+        return json_response({'routes': result})
+    except Exception as e:
+        return json_response({'error': str(e)}, 500)
+
+
+@routes.get('/routers/{ip}/rip/neighbors')
+async def rip_neighbors(request):
+    router = await find_router(request)
+    if not router:
+        return json_response({'msg': 'Router not found'}, 404)
+    try:
+        result = await ar.get_rip_neighbors(router['ip'], router['username'], router['password'])
+        return json_response({'neighbors': result})
+    except Exception as e:
+        return json_response({'error': str(e)}, 500)
+
+
+@routes.get('/routers/{ip}/state')
+async def router_state(request):
+    router = await find_router(request)
+    if not router:
+        return json_response({'msg': 'Router not found'}, 404)
+    try:
+        result = await ar.collect_state(router['ip'], router['username'], router['password'])
+        return json_response(result)
+    except Exception as e:
+        return json_response({'error': str(e)}, 500)
+
+
+@routes.post('/routers/{ip}/rip/config')
+async def rip_config(request):
+    data = await read_json(request) or {}
+    router = await find_router(request)
+    if not router:
+        return json_response({'msg': 'Router not found'}, 404)
+    result = await ar.set_rip_version(router['ip'], router['username'], router['password'], data.get('version'))
+    return json_response(result, 200 if result['status'] == 'success' else 400)
+
+
+@routes.post('/routers/{ip}/rip/interfaces')
+async def rip_interfaces(request):
+    data = await read_json(request) or {}
+    router = await find_router(request)
+    if not router:
+        return json_response({'msg': 'Router not found'}, 404)
+    if 'interface' not in data or data.get('action') not in ['enable', 'disable']:
+        return json_response({'error': 'Invalid data'}, 400)
+    result = await ar.configure_rip_interface(
+        router['ip'],
+        router['username'],
+        router['password'],
+        data['interface'],
+        data['action']
+    )
+    return json_response(result, 200 if result['status'] == 'success' else 400)
+
+
+@routes.get('/fleet/rip/routes')
+async def fleet_routes(request):
+    timeout = fleet_timeout(request)
+    if timeout is None:
+        return bad_timeout()
+    result = await ar.fan_out(await in_executor(INVENTORY.all), ar.get_rip_routes, 'routes', timeout)
+    return json_response(result)
+
+
+@routes.get('/fleet/rip/neighbors')
+async def fleet_neighbors(request):
+    timeout = fleet_timeout(request)
+    if timeout is None:
+        return bad_timeout()
+    result = await ar.fan_out(await in_executor(INVENTORY.all), ar.get_rip_neighbors, 'neighbors', timeout)
+    return json_response(result)
+
+
+def create_app() -> web.Application:
+    app = web.Application(middlewares=[token_required])
+    app.add_routes(routes)
+    return app
+
+
+if __name__ == '__main__':
+    web.run_app(create_app(), port=ASYNC_PORT)
@@ -0,0 +1,287 @@
+from netmiko.exceptions import NetmikoAuthenticationException
+from netmiko.utilities import get_structured_data
+from typing import Dict, List, Optional
+from datetime import datetime
+import asyncio
+import time
+import re
+import router_utils as ru
+import parsers
+
+# Telnet protocol bytes (RFC 854)
+IAC, DONT, DO, WONT, WILL, SB, SE = 255, 254, 253, 252, 251, 250, 240
+
+USERNAME_PATTERN = re.compile(r"(?:user|username|login|user name):?\s*$", re.I)
+PASSWORD_PATTERN = re.compile(r"assword:?\s*$", re.I)
+PROMPT_PATTERN = re.compile(r"^([^\r\n]+?)[>#]\s*$", re.M)
+# What IOS prints when it turns the credentials down, before prompting again or hanging up
+LOGIN_FAILED_PATTERN = re.compile(r"% ?(?:Login invalid|Authentication failed|Bad passwords?)|Login incorrect",
+                                  re.I)
+
+
+class AsyncRouterConnection:
+    """Telnet session to a Cisco IOS router driven by asyncio instead of a thread"""
+
+    def __init__(self, router_ip: str, username: str = "", password: str = "cisco",
+                 port: Optional[int] = None, timeout: float = 20):
+        self.host, endpoint_port = ru.split_endpoint(router_ip)
+        self.port = port or endpoint_port
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+        self.base_prompt: Optional[str] = None
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._buffer = ""
+        # Start of a Telnet command cut off at the end of the last read
+        self._partial = b""
+
+    async def __aenter__(self) -> "AsyncRouterConnection":
+        await self.connect()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def connect(self):
+        """Open the Telnet session, log in and turn off paging"""
+        self._reader, self._writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port), self.timeout)
+        await self._login()
+        await self.send_command("terminal length 0", parse=False)
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+            self._writer = None
+
+    async def _login(self):
+        deadline = time.monotonic() + self.timeout
+        sent_username = sent_password = False
+        while True:
+            try:
+                await self._read_some(deadline)
+            except ConnectionError:
+                if sent_password:
+                    # IOS hangs up after the last failed attempt
+                    raise NetmikoAuthenticationException(f"Login failed on router {self.host}") from None
+                raise
+            tail = self._buffer.rstrip("\r\n ").rsplit("\n", 1)[-1]
+            if sent_password and (LOGIN_FAILED_PATTERN.search(self._buffer) or USERNAME_PATTERN.search(tail)
+                                  or PASSWORD_PATTERN.search(tail)):
+                # Asked again instead of getting a prompt, retrying cannot help
+                raise NetmikoAuthenticationException(f"Login failed on router {self.host}")
+            if not sent_username and USERNAME_PATTERN.search(tail):
+                self._write(self.username + "\r")
+                sent_username = True
+                self._buffer = ""
+            elif not sent_password and PASSWORD_PATTERN.search(tail):
+                self._write(self.password + "\r")
+                sent_password = True
+                self._buffer = ""
+            elif PROMPT_PATTERN.search(tail):
+                self.base_prompt = PROMPT_PATTERN.search(tail).group(1)
+                self._buffer = ""
+                return
+
+    def _prompt_regex(self) -> re.Pattern:
+        # Matches R1>, R1# and R1(config-router)#
+        return re.compile(r"^" + re.escape(self.base_prompt) + r"[^\r\n]*[>#]\s*$", re.M)
+
+    async def send_command(self, command: str, parse: bool = True):
+        """Send one command and return its output, parsed when a parser or TextFSM template exists"""
+        prompt = self._prompt_regex()
+        deadline = time.monotonic() + self.timeout
+        self._buffer = ""
+        self._write(command + "\n")
+        while True:
+            match = prompt.search(self._buffer)
+            if match:
+                break
+            await self._read_some(deadline)
+        output = self._buffer[:match.start()]
+        self._buffer = self._buffer[match.end():]
+        # Drop the echoed command line
+        lines = output.replace("\r", "").split("\n")
+        if lines and command.strip() in lines[0]:
+            lines = lines[1:]
+        output = "\n".join(lines).strip("\n")
+        if not parse:
+            return output
+        parser = parsers.get_parser(command)
+        if parser is None:
+            return get_structured_data(output, platform="cisco_ios", command=command)
+        return parser(output)
+
+    def _write(self, text: str):
+        self._writer.write(text.encode())
+
+    async def _read_some(self, deadline: float):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError(f"Timed out reading from router {self.host}")
+        data = await asyncio.wait_for(self._reader.read(4096), remaining)
+        if not data:
+            raise ConnectionError(f"Router {self.host} closed the connection")
+        self._buffer += self._negotiate(data).decode(errors="ignore")
+
+    def _negotiate(self, data: bytes) -> bytes:
+        """Strip Telnet commands from the stream and refuse every option.
+
+        A command split across reads is kept and finished with the next read."""
+        data = self._partial + data
+        self._partial = b""
+        out = bytearray()
+        i = 0
+        while i < len(data):
+            byte = data[i]
+            if byte != IAC:
+                out.append(byte)
+                i += 1
+                continue
+            if i + 1 >= len(data):
+                self._partial = data[i:]
+                break
+            cmd = data[i + 1]
+            if cmd in (DO, DONT, WILL, WONT):
+                if i + 2 >= len(data):
+                    self._partial = data[i:]
+                    break
+                option = data[i + 2]
+                if cmd == DO:
+                    self._writer.write(bytes([IAC, WONT, option]))
+                elif cmd == WILL:
+                    self._writer.write(bytes([IAC, DONT, option]))
+                i += 3
+            elif cmd == SB:
+                end = data.find(bytes([IAC, SE]), i + 2)
+                if end < 0:
+                    self._partial = data[i:]
+                    break
+                i = end + 2
+            elif cmd == IAC:
+                out.append(IAC)
+                i += 2
+            else:
+                i += 2
+        return bytes(out)
+
+    async def run_batch(self, commands: List[str], parse: bool = True) -> List[Dict]:
+        """Run show commands in order on this session"""
+        results = []
+        for command in commands:
+            if not command.strip().lower().startswith("show "):
+                raise ValueError(f"Only show commands can be batched: {command!r}")
+        for command in commands:
+            started = time.monotonic()
+            output = await self.send_command(command, parse=parse)
+            results.append({
+                "command": command,
+                "status": "success",
+                "output": output,
+                "elapsed": round(time.monotonic() - started, 3)
+            })
+        return results
+
+    async def apply_config(self, commands: List[str], save: bool = True) -> str:
+        """Apply config commands and optionally write memory"""
+        output = [await self.send_command("configure terminal", parse=False)]
+        for command in commands:
+            output.append(await self.send_command(command, parse=False))
+        output.append(await self.send_command("end", parse=False))
+        if save:
+            output.append(await self.send_command("write memory", parse=False))
+        return "\n".join(output)
+
+
+async def probe(router_ip: str, username: str, password: str, timeout: float = 20) -> Dict:
+    """Check that a router answers and accepts the credentials, raising when it does not"""
+    started = time.monotonic()
+    async with AsyncRouterConnection(router_ip, username, password, timeout=timeout) as conn:
+        login_seconds = time.monotonic() - started
+        protocols = await conn.send_command(ru.NEIGHBORS_COMMAND, parse=False)
+    return {"login_seconds": round(login_seconds, 3), "rip_version": parsers.parse_rip_version(protocols)}
+
+
+async def get_rip_routes(router_ip: str, username: str, password: str) -> List[Dict]:
+    """Get RIP routes from a router"""
+    async with AsyncRouterConnection(router_ip, username, password) as conn:
+        return ru.process_routes(await conn.send_command(ru.ROUTES_COMMAND))
+
+
+async def get_rip_neighbors(router_ip: str, username: str, password: str) -> List[Dict]:
+    """Get RIP neighbors from a router"""
+    async with AsyncRouterConnection(router_ip, username, password) as conn:
+        return ru.process_neighbors(await conn.send_command(ru.NEIGHBORS_COMMAND))
+
+
+async def collect_state(router_ip: str, username: str, password: str) -> Dict:
+    """Collect routes, neighbors, RIP version and interfaces with one login"""
+    async with AsyncRouterConnection(router_ip, username, password) as conn:
+        routes = await conn.send_command(ru.ROUTES_COMMAND, parse=False)
+        protocols = await conn.send_command(ru.NEIGHBORS_COMMAND, parse=False)
+        interfaces = await conn.send_command(ru.INTERFACES_COMMAND, parse=False)
+    last_updated = datetime.now().isoformat()
+    return {
+        "last_updated": last_updated,
+        "rip_version": parsers.parse_rip_version(protocols),
+        "routes": ru.process_routes(parsers.parse_rip_routes(routes), last_updated),
+        "neighbors": ru.process_neighbors(parsers.parse_rip_neighbors(protocols), last_updated),
+        "interfaces": ru.process_interfaces(parsers.parse_interfaces_brief(interfaces))
+    }
+
+
+async def set_rip_version(router_ip: str, username: str, password: str, version: str) -> Dict:
+    """Configure RIP version on a router"""
+    if version not in ["1", "2"]:
+        return {"status": "error", "message": "Invalid RIP version. Must be 1 or 2."}
+    try:
+        async with AsyncRouterConnection(router_ip, username, password) as conn:
+            output = await conn.apply_config(ru.rip_version_commands(version))
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
+    finally:
+        ru.READ_CACHE.invalidate(router_ip)
+    return {"status": "success", "message": f"RIP version {version} configured successfully", "config": output}
+
+
+async def configure_rip_interface(router_ip: str, username: str, password: str,
+                                  interface: str, action: str = "enable") -> Dict:
+    """Configure RIP on a specific interface"""
+    try:
+        async with AsyncRouterConnection(router_ip, username, password) as conn:
+            output = await conn.apply_config(ru.rip_interface_commands(interface, action))
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
+    finally:
+        ru.READ_CACHE.invalidate(router_ip)
+    return {"status": "success", "message": f"RIP {action}d on interface {interface}", "config": output}
+
+
+async def fan_out(routers: List[Dict], fn, key: str, timeout: float = 30.0, limit: int = 500) -> Dict:
+    """Run an async router call against every router concurrently with per-router timeouts"""
+    started = time.monotonic()
+    slots = asyncio.Semaphore(limit)
+
+    async def one(router: Dict) -> Dict:
+        async with slots:
+            begun = time.monotonic()
+            try:
+                value = await asyncio.wait_for(
+                    fn(router['ip'], router['username'], router['password']), timeout)
+            except asyncio.TimeoutError:
+                return {"status": "timeout", "message": f"No response within {timeout}s"}
+            except Exception as e:
+                return {"status": "error", "message": str(e)}
+            return {"status": "ok", key: value, "elapsed": round(time.monotonic() - begun, 3)}
+
+    outcomes = await asyncio.gather(*(one(router) for router in routers))
+    results = {router['ip']: outcome for router, outcome in zip(routers, outcomes)}
+    summary = {"ok": 0, "error": 0, "timeout": 0}
+    for outcome in outcomes:
+        summary[outcome["status"]] += 1
+    return {"routers": results, "summary": summary, "elapsed": round(time.monotonic() - started, 3)}
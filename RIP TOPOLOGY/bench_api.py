@@ -0,0 +1,122 @@
+"""Drive the REST API against simulated routers and report throughput and latency percentiles"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+import urllib.request
+import threading
+import argparse
+import logging
+import tempfile
+import json
+import math
+import time
+import os
+
+ENDPOINTS = {
+    "routes": "/routers/{ip}/rip/routes",
+    "routes_fresh": "/routers/{ip}/rip/routes?fresh=true",
+    "neighbors": "/routers/{ip}/rip/neighbors",
+    "state": "/routers/{ip}/state",
+    "fleet_routes": "/fleet/rip/routes",
+}
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    rank = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[rank]
+
+
+def call(base: str, path: str, token: str = None, body: Dict = None):
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(base + path, data=data, method="POST" if data else "GET")
+    req.add_header("Content-Type", "application/json")
+    if token:
+        req.add_header("Authorization", f"Bearer {token}")
+    with urllib.request.urlopen(req, timeout=120) as resp:
+        return resp.status, json.loads(resp.read())
+
+
+def run_case(base: str, token: str, path: str, ips: List[str], concurrency: int, requests: int) -> Dict:
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def one(i: int):
+        nonlocal errors
+        started = time.perf_counter()
+        failed = False
+        try:
+            call(base, path.format(ip=ips[i % len(ips)]), token)
+        except Exception:
+            failed = True
+        with lock:
+            errors += failed
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(requests)))
+    elapsed = time.perf_counter() - started
+    return {
+        "throughput": requests / elapsed,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--fleet-sizes", default="1,10", help="Comma separated router counts")
+    parser.add_argument("--concurrency", default="1,8", help="Comma separated client counts")
+    parser.add_argument("--requests", type=int, default=50, help="Requests per endpoint and case")
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS))
+    parser.add_argument("--login-delay", type=float, default=0.0)
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated per-command latency")
+    parser.add_argument("--routes", type=int, default=50, help="RIP routes per simulated router")
+    parser.add_argument("--port", type=int, default=2323, help="Telnet port of the simulated routers")
+    args = parser.parse_args()
+
+    fleet_sizes = [int(n) for n in args.fleet_sizes.split(",")]
+    workdir = tempfile.mkdtemp(prefix="rip_bench_")
+    # The app reads these at import time, everything it writes goes to the workdir
+    os.environ["RIP_TELNET_PORT"] = str(args.port)
+    os.environ["RIP_POLL_INTERVAL"] = "0"
+    os.environ["RIP_INVENTORY"] = os.path.join(workdir, "routers_db.json")
+    os.environ["RIP_HISTORY"] = os.path.join(workdir, "rip_history.db")
+    os.environ["RIP_SESSION_LOG_DIR"] = os.path.join(workdir, "logs")
+
+    import fake_router
+    import app as rest_app
+    from werkzeug.serving import make_server
+
+    simulator, routers = fake_router.start_fleet(
+        max(fleet_sizes), args.port, route_count=args.routes,
+        login_delay=args.login_delay, command_latency=args.latency)
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = make_server("127.0.0.1", 0, rest_app.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+    _, login = call(base, "/login", body={"username": "admin", "password": "admin"})
+    token = login["token"]
+
+    hosts = list(routers)
+    print(f"{'endpoint':<14} {'fleet':>5} {'conc':>4} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'err':>4}")
+    try:
+        for size in fleet_sizes:
+            ips = hosts[:size]
+            rest_app.INVENTORY.replace_all([{"ip": ip, "username": "admin", "password": "admin"} for ip in ips])
+            for name in args.endpoints.split(","):
+                for concurrency in [int(c) for c in args.concurrency.split(",")]:
+                    result = run_case(base, token, ENDPOINTS[name], ips, concurrency, args.requests)
+                    print(f"{name:<14} {size:>5} {concurrency:>4} {result['throughput']:>9.1f} "
+                          f"{result['p50'] * 1000:>9.1f} {result['p95'] * 1000:>9.1f} "
+                          f"{result['p99'] * 1000:>9.1f} {result['errors']:>4}")
+    finally:
+        server.shutdown()
+        simulator.close()
+
+
+if __name__ == "__main__":
+    main()
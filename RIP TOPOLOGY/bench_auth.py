@@ -0,0 +1,44 @@
+"""Time per-request token verification with and without the verified-token cache"""
+from unittest import mock
+import argparse
+import timeit
+import jwt
+import api_auth
+
+SECRET = "bench_secret"
+
+
+def bench(name: str, fn, number: int, repeat: int, baseline: float = None) -> float:
+    per_call = min(timeit.repeat(fn, number=number, repeat=repeat)) / number
+    speedup = f"  speedup={baseline / per_call:6.1f}x" if baseline else ""
+    print(f"{name:<32} {per_call * 1e6:9.2f} us/request{speedup}")
+    return per_call
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--number", type=int, default=20000)
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    args = arg_parser.parse_args()
+
+    with mock.patch.object(api_auth, "SECRET_KEY", SECRET):
+        token = api_auth.generate_token("admin")
+    authenticator = api_auth.Authenticator(SECRET, {"bench": "bench-api-key"})
+
+    def uncached():
+        # What token_required did before: a full decode and signature check per request
+        try:
+            jwt.decode(token, SECRET, algorithms=["HS256"])
+        except jwt.InvalidTokenError:
+            pass
+
+    def cache_miss():
+        authenticator._verified.clear()
+        authenticator.verify_token(token)
+
+    baseline = bench("pyjwt decode (before)", uncached, args.number, args.repeat)
+    bench("authenticator, cache miss", cache_miss, args.number, args.repeat, baseline)
+    bench("authenticator, cached token", lambda: authenticator.verify_token(token), args.number, args.repeat,
+          baseline)
+    bench("authenticator, api key", lambda: authenticator.verify_api_key("bench-api-key"), args.number,
+          args.repeat, baseline)
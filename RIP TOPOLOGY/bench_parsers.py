@@ -0,0 +1,49 @@
+"""Time the compiled parsers against per-call TextFSM parsing on synthetic RIP tables"""
+from netmiko.utilities import get_structured_data
+import argparse
+import timeit
+import parsers
+
+ROUTE_HEADER = """Codes: L - local, C - connected, S - static, R - RIP, M - mobile, B - BGP
+
+Gateway of last resort is not set
+
+      10.0.0.0/8 is variably subnetted, {count} subnets, 1 masks
+"""
+
+
+def routes_output(count: int) -> str:
+    lines = [ROUTE_HEADER.format(count=count)]
+    for i in range(count):
+        lines.append(f"R        10.{i // 256 % 256}.{i % 256}.0/24 [120/{i % 15 + 1}] "
+                     f"via 20.0.0.{i % 4 + 2}, 00:00:{i % 60:02d}, Ethernet0/{i % 4}")
+    return "\n".join(lines)
+
+
+def interfaces_output(count: int) -> str:
+    lines = ["Interface              IP-Address      OK? Method Status                Protocol"]
+    for i in range(count):
+        lines.append(f"Ethernet{i // 4}/{i % 4:<14} 10.{i // 256}.{i % 256}.1     YES NVRAM  up                    up")
+    return "\n".join(lines)
+
+
+def bench(name: str, command: str, output: str, parser, repeat: int):
+    compiled = min(timeit.repeat(lambda: parser(output), number=1, repeat=repeat))
+    textfsm = min(timeit.repeat(
+        lambda: get_structured_data(output, platform="cisco_ios", command=command), number=1, repeat=repeat))
+    rows = len(parser(output))
+    print(f"{name:<24} rows={rows:<7} compiled={compiled * 1000:9.3f} ms  "
+          f"textfsm={textfsm * 1000:9.3f} ms  speedup={textfsm / compiled:6.1f}x")
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--sizes", default="10,100,1000,10000", help="Comma separated row counts")
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    args = arg_parser.parse_args()
+
+    for size in [int(s) for s in args.sizes.split(",")]:
+        bench("show ip route rip", "show ip route rip", routes_output(size),
+              parsers.parse_rip_routes, args.repeat)
+        bench("show ip interface brief", "show ip interface brief", interfaces_output(size),
+              parsers.parse_interfaces_brief, args.repeat)
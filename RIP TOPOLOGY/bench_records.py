@@ -0,0 +1,53 @@
+"""Compare memory and serialisation of route records with the per-route dicts they replaced"""
+from datetime import datetime
+import argparse
+import json
+import timeit
+import tracemalloc
+import bench_parsers
+import parsers
+import records
+import route_diff
+
+
+def route_dicts(parsed):
+    # What process_routes built before, a dict and a timestamp string per route
+    return [dict(route, last_updated=datetime.now().isoformat()) for route in parsed]
+
+
+def route_records(parsed):
+    return records.routes(parsed, datetime.now().isoformat())
+
+
+def measure(build, output: str):
+    # Parsed in the measurement, the dicts keep the parser's strings alive and the records do not
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    built = build(parsers.parse_rip_routes(output))
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return built, size
+
+
+def bench(name: str, build, output: str, repeat: int):
+    built, size = measure(build, output)
+    parsed = parsers.parse_rip_routes(output)
+    create = min(timeit.repeat(lambda: build(parsed), number=1, repeat=repeat))
+    dump = min(timeit.repeat(lambda: records.dumps(built), number=1, repeat=repeat))
+    index = min(timeit.repeat(lambda: route_diff.index_routes(built), number=1, repeat=repeat))
+    print(f"{name:<8} rows={len(built):<7} memory={size / len(built):7.1f} B/route  "
+          f"build={create * 1000:8.2f} ms  json={dump * 1000:8.2f} ms  diff index={index * 1000:8.2f} ms")
+    return built
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--sizes", default="1000,10000,100000", help="Comma separated route counts")
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    args = arg_parser.parse_args()
+
+    for size in [int(s) for s in args.sizes.split(",")]:
+        output = bench_parsers.routes_output(size)
+        old = bench("dicts", route_dicts, output, args.repeat)
+        new = bench("records", route_records, output, args.repeat)
+        assert json.loads(records.dumps(new))[0].keys() == old[0].keys()
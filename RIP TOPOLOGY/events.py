@@ -0,0 +1,116 @@
+from collections import deque
+from typing import Dict, Iterator, List, Optional
+from datetime import datetime
+import itertools
+import threading
+import json
+import time
+import os
+import route_diff
+
+MAX_EVENTS = 1000
+# Comment lines keep proxies from closing idle streams
+HEARTBEAT = 15.0
+# Streams one worker serves at once. Each holds a server thread for as long as the client stays,
+# gunicorn.conf.py adds this many threads on top of RIP_THREADS so REST requests keep theirs
+MAX_STREAMS = int(os.environ.get("RIP_EVENT_STREAMS", "16"))
+
+
+class EventBus:
+    """Recent events in one ring buffer that every subscriber reads by id, so publishing
+    costs the same with one dashboard open or a hundred"""
+
+    def __init__(self, max_events: int = MAX_EVENTS):
+        self._events = deque(maxlen=max_events)
+        self._cond = threading.Condition()
+        # Ids start at the wall clock in ms so a Last-Event-ID from before a restart reads as too old
+        self._last_id = time.time_ns() // 1_000_000
+
+    def publish(self, event_type: str, **data) -> Dict:
+        with self._cond:
+            self._last_id += 1
+            event = {"id": self._last_id, "type": event_type, "time": datetime.now().isoformat()}
+            event.update(data)
+            self._events.append(event)
+            self._cond.notify_all()
+        return event
+
+    def last_id(self) -> int:
+        return self._last_id
+
+    def read(self, after_id: int, timeout: Optional[float] = None) -> Optional[List[Dict]]:
+        """Events after after_id, waiting up to timeout for the next one. None when some of
+        them were already dropped from the buffer and the reader has to resync"""
+        with self._cond:
+            self._cond.wait_for(lambda: self._last_id != after_id, timeout)
+            first = self._events[0]["id"] if self._events else self._last_id + 1
+            if after_id > self._last_id or after_id < first - 1:
+                return None
+            return list(itertools.islice(self._events, after_id - first + 1, None))
+
+
+def format_sse(event: Dict) -> str:
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+
+def sse_stream(bus: EventBus, after_id: Optional[int] = None, heartbeat: float = HEARTBEAT) -> Iterator[str]:
+    """Server-Sent Events text for everything published after after_id, until the client goes away"""
+    last_id = bus.last_id() if after_id is None else after_id
+    yield "retry: 3000\n\n"
+    while True:
+        events = bus.read(last_id, heartbeat)
+        if events is None:
+            # Missed events cannot be replayed, tell the client to refetch full state
+            last_id = bus.last_id()
+            yield format_sse({"id": last_id, "type": "resync"})
+            continue
+        if not events:
+            yield ": keepalive\n\n"
+            continue
+        for event in events:
+            yield format_sse(event)
+        last_id = events[-1]["id"]
+
+
+class ConvergenceWatcher:
+    """Turns stored snapshots and poll failures into route, neighbor and poll events"""
+
+    def __init__(self, bus: EventBus, routes: route_diff.RouteTracker):
+        self.bus = bus
+        self.routes = routes
+        self._lock = threading.Lock()
+        self._neighbors: Dict[str, set] = {}
+        self._failing: set = set()
+
+    def on_snapshot(self, router_ip: str, snapshot: Dict):
+        """SnapshotCache listener, also keeps the route tracker up to date"""
+        if "routes" in snapshot:
+            changes = self.routes.observe(router_ip, snapshot["routes"])
+            if changes:
+                self.bus.publish("route_change", router=router_ip,
+                                 version=self.routes.version(router_ip), changes=changes)
+        if "neighbors" in snapshot:
+            current = {neighbor["neighbor"] for neighbor in snapshot["neighbors"]}
+            with self._lock:
+                previous = self._neighbors.get(router_ip)
+                self._neighbors[router_ip] = current
+            # The first snapshot of a router is its starting state, not a change
+            if previous is not None:
+                for neighbor in sorted(current - previous):
+                    self.bus.publish("neighbor_up", router=router_ip, neighbor=neighbor)
+                for neighbor in sorted(previous - current):
+                    self.bus.publish("neighbor_down", router=router_ip, neighbor=neighbor)
+        with self._lock:
+            recovered = router_ip in self._failing
+            self._failing.discard(router_ip)
+        if recovered:
+            self.bus.publish("poll_recovered", router=router_ip)
+
+    def on_poll_error(self, router_ip: str, error: Exception):
+        with self._lock:
+            self._failing.add(router_ip)
+        self.bus.publish("poll_error", router=router_ip, message=str(error))
+
+
+BUS = EventBus()
+STREAMS = threading.BoundedSemaphore(MAX_STREAMS)
@@ -0,0 +1,287 @@
+"""Simulated Cisco IOS routers speaking Telnet, for tests and benchmarks without real devices"""
+from typing import Dict, List, Optional, Tuple
+import argparse
+import asyncio
+import threading
+import time
+
+IAC, DONT, DO, WONT, WILL, SB, SE, ECHO, SGA = 255, 254, 253, 252, 251, 250, 240, 1, 3
+
+INVALID_INPUT = "% Invalid input detected at '^' marker."
+
+
+class FakeRouter:
+    """State and canned CLI output of one simulated router"""
+
+    def __init__(self, hostname: str = "R1", username: str = "admin", password: str = "admin",
+                 routes: Optional[List[Tuple[str, int, str, str]]] = None, route_count: int = 10,
+                 login_delay: float = 0.0, command_latency: float = 0.0, rip_version: str = "2"):
+        self.hostname = hostname
+        self.username = username
+        self.password = password
+        self.login_delay = login_delay
+        self.command_latency = command_latency
+        self.rip_version = rip_version
+        self.interfaces = {f"Ethernet0/{i}": f"20.0.{i}.1" for i in range(4)}
+        self.rip_disabled = set()
+        if routes is None:
+            routes = [
+                (f"10.{i // 256 % 256}.{i % 256}.0/24", i % 15 + 1, f"20.0.{i % 4}.2", f"Ethernet0/{i % 4}")
+                for i in range(route_count)
+            ]
+        self.routes = routes
+        self.sessions = 0
+        self.commands = 0
+        self.saves = 0
+
+    def show_ip_route_rip(self) -> str:
+        lines = [
+            "Codes: L - local, C - connected, S - static, R - RIP, M - mobile, B - BGP",
+            "",
+            "Gateway of last resort is not set",
+            "",
+        ]
+        for network, metric, next_hop, interface in self.routes:
+            if interface in self.rip_disabled:
+                continue
+            lines.append(f"R        {network} [120/{metric}] via {next_hop}, 00:00:{metric % 30:02d}, {interface}")
+        return "\n".join(lines)
+
+    def show_ip_protocols(self) -> str:
+        lines = [
+            'Routing Protocol is "rip"',
+            "  Outgoing update filter list for all interfaces is not set",
+            "  Sending updates every 30 seconds, next due in 13 seconds",
+            f"  Default version control: send version {self.rip_version}, receive version {self.rip_version}",
+            "  Routing Information Sources:",
+            "    Gateway         Distance      Last Update",
+        ]
+        for next_hop in sorted({route[2] for route in self.routes}):
+            lines.append(f"    {next_hop:<15}      120      00:00:12")
+        lines.append("  Distance: (default is 120)")
+        return "\n".join(lines)
+
+    def show_ip_interface_brief(self) -> str:
+        lines = ["Interface              IP-Address      OK? Method Status                Protocol"]
+        for name, address in self.interfaces.items():
+            lines.append(f"{name:<22} {address:<15} YES NVRAM  up                    up")
+        return "\n".join(lines)
+
+    def execute(self, session: "FakeSession", line: str) -> str:
+        """Run one CLI line and return its output without the trailing prompt"""
+        self.commands += 1
+        command = " ".join(line.split()).lower()
+        if session.mode == "exec":
+            if command == "show ip route rip":
+                return self.show_ip_route_rip()
+            if command == "show ip protocols":
+                return self.show_ip_protocols()
+            if command == "show ip interface brief":
+                return self.show_ip_interface_brief()
+            if command.startswith("terminal "):
+                return ""
+            if command in ("configure terminal", "conf t"):
+                session.mode = "config"
+                return "Enter configuration commands, one per line.  End with CNTL/Z."
+            if command in ("write mem", "write memory", "copy running-config startup-config"):
+                self.saves += 1
+                return "Building configuration...\n[OK]"
+            return INVALID_INPUT
+        if command in ("end", "\x1a"):
+            session.mode = "exec"
+            return ""
+        if command == "exit":
+            session.mode = "exec" if session.mode == "config" else "config"
+            return ""
+        if command == "router rip":
+            session.mode = "config-router"
+            return ""
+        if command.startswith("interface "):
+            session.mode = "config-if"
+            session.interface = line.split(None, 1)[1].strip()
+            return ""
+        if session.mode == "config-router" and command.startswith("version "):
+            self.rip_version = command.split()[1]
+            return ""
+        if session.mode == "config-router" and command in ("no auto-summary", "auto-summary"):
+            return ""
+        if session.mode == "config-if" and command == "ip rip enable":
+            self.rip_disabled.discard(session.interface)
+            return ""
+        if session.mode == "config-if" and command == "no ip rip enable":
+            self.rip_disabled.add(session.interface)
+            return ""
+        return INVALID_INPUT
+
+
+class FakeSession:
+    """One Telnet conversation with a FakeRouter"""
+
+    PROMPTS = {"exec": "#", "config": "(config)#", "config-router": "(config-router)#", "config-if": "(config-if)#"}
+
+    def __init__(self, router: FakeRouter, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.router = router
+        self.reader = reader
+        self.writer = writer
+        self.mode = "exec"
+        self.interface = ""
+        self._pending = bytearray()
+
+    def prompt(self) -> str:
+        return self.router.hostname + self.PROMPTS[self.mode]
+
+    def write(self, text: str):
+        self.writer.write(text.replace("\n", "\r\n").encode())
+
+    async def read_line(self) -> Optional[str]:
+        """Read one line, dropping Telnet negotiation bytes"""
+        while True:
+            for i, byte in enumerate(self._pending):
+                if byte in (10, 13):
+                    line = bytes(self._pending[:i]).decode(errors="ignore")
+                    rest = self._pending[i + 1:]
+                    # Treat \r\n and \r\0 as a single line ending
+                    if byte == 13 and rest[:1] in (b"\n", b"\x00"):
+                        rest = rest[1:]
+                    self._pending = bytearray(rest)
+                    return line
+            data = await self.reader.read(4096)
+            if not data:
+                return None
+            self._pending.extend(self._strip_telnet(data))
+
+    @staticmethod
+    def _strip_telnet(data: bytes) -> bytes:
+        out = bytearray()
+        i = 0
+        while i < len(data):
+            if data[i] != IAC:
+                out.append(data[i])
+                i += 1
+            elif i + 1 < len(data) and data[i + 1] in (DO, DONT, WILL, WONT):
+                i += 3
+            elif i + 1 < len(data) and data[i + 1] == SB:
+                end = data.find(bytes([IAC, SE]), i)
+                i = len(data) if end < 0 else end + 2
+            else:
+                i += 2
+        return bytes(out)
+
+    async def run(self):
+        router = self.router
+        router.sessions += 1
+        self.writer.write(bytes([IAC, WILL, ECHO, IAC, WILL, SGA]))
+        await asyncio.sleep(router.login_delay)
+        for _ in range(3):
+            self.write("\nUser Access Verification\n\nUsername: ")
+            username = await self.read_line()
+            self.write("\nPassword: ")
+            password = await self.read_line()
+            if username is None or password is None:
+                return
+            if username == router.username and password == router.password:
+                break
+            self.write("\n% Login invalid\n")
+        else:
+            return
+        self.write("\n" + self.prompt())
+        while True:
+            line = await self.read_line()
+            if line is None:
+                return
+            # IOS echoes what was typed before the output
+            self.write(line + "\n")
+            if line.strip():
+                if self.mode == "exec" and line.strip() in ("exit", "logout", "quit"):
+                    return
+                if router.command_latency:
+                    await asyncio.sleep(router.command_latency)
+                output = router.execute(self, line)
+                if output:
+                    self.write(output + "\n")
+            self.write(self.prompt())
+            await self.writer.drain()
+
+
+class Simulator:
+    """Runs fake routers on one asyncio loop in a background thread"""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._servers = []
+        self._sessions = set()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="fake-routers", daemon=True)
+        self._thread.start()
+
+    def add(self, router: FakeRouter, host: str = "127.0.0.1", port: int = 0) -> Tuple[str, int]:
+        """Serve a router and return the address it listens on"""
+        async def handle(reader, writer):
+            task = asyncio.current_task()
+            self._sessions.add(task)
+            try:
+                await FakeSession(router, reader, writer).run()
+            except (ConnectionError, OSError, asyncio.CancelledError):
+                pass
+            finally:
+                writer.close()
+                self._sessions.discard(task)
+
+        async def start():
+            return await asyncio.start_server(handle, host, port)
+
+        server = asyncio.run_coroutine_threadsafe(start(), self.loop).result()
+        self._servers.append(server)
+        return server.sockets[0].getsockname()[:2]
+
+    def close(self):
+        async def stop():
+            for server in self._servers:
+                server.close()
+            # Clients such as the session pool may still hold connections open
+            for task in list(self._sessions):
+                task.cancel()
+            await asyncio.gather(*self._sessions, return_exceptions=True)
+            for server in self._servers:
+                await server.wait_closed()
+
+        asyncio.run_coroutine_threadsafe(stop(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+
+    def __enter__(self) -> "Simulator":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def start_fleet(count: int, port: int = 2323, **options) -> Tuple[Simulator, Dict[str, FakeRouter]]:
+    """Start count routers on 127.0.0.2, 127.0.0.3, ... all listening on the same port"""
+    simulator = Simulator()
+    routers = {}
+    for i in range(count):
+        host = f"127.0.{(i + 2) // 256}.{(i + 2) % 256}"
+        router = FakeRouter(hostname=f"R{i + 1}", **options)
+        simulator.add(router, host, port)
+        routers[host] = router
+    return simulator, routers
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=1)
+    parser.add_argument("--port", type=int, default=2323)
+    parser.add_argument("--routes", type=int, default=10, help="RIP routes per router")
+    parser.add_argument("--login-delay", type=float, default=0.0)
+    parser.add_argument("--latency", type=float, default=0.0, help="Per-command latency in seconds")
+    args = parser.parse_args()
+
+    simulator, routers = start_fleet(args.count, args.port, route_count=args.routes,
+                                     login_delay=args.login_delay, command_latency=args.latency)
+    for host, router in routers.items():
+        print(f"{router.hostname} listening on {host}:{args.port} (admin/admin)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        simulator.close()
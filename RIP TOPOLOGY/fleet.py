@@ -0,0 +1,67 @@
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional
+from fnmatch import fnmatch
+import time
+import os
+import router_utils as ru
+import session_logging
+
+# Routers read at once by a REST fan-out, the calls wait on Telnet so this can sit well above the CPU count
+FLEET_WORKERS = max(1, int(os.environ.get("RIP_FLEET_WORKERS", "32")))
+DEFAULT_TIMEOUT = 30.0
+
+# Bounded so a large fleet cannot spawn one thread per router. Only REST fan-out reads use it. The poller
+# has its own, so calls still running after a fan-out timed out cannot hold up background polling, and
+# config pushes run as jobs on the JobManager's pool (RIP_JOB_WORKERS), so a push cannot starve reads.
+EXECUTOR = ThreadPoolExecutor(max_workers=FLEET_WORKERS, thread_name_prefix="fleet")
+
+
+def _timed(fn: Callable, router: Dict):
+    started = time.monotonic()
+    result = fn(router['ip'], router['username'], router['password'])
+    return result, time.monotonic() - started
+
+
+def fan_out(routers: List[Dict], fn: Callable, key: str, timeout: float = DEFAULT_TIMEOUT) -> Dict:
+    """Run a router_utils call against every router in parallel and collect partial results"""
+    started = time.monotonic()
+    futures = {EXECUTOR.submit(session_logging.bind(_timed), fn, router): router['ip'] for router in routers}
+    done, _ = wait(futures, timeout=timeout)
+
+    results = {}
+    summary = {"ok": 0, "error": 0, "timeout": 0}
+    for future, ip in futures.items():
+        if future not in done:
+            # Only drops calls still queued, a running one ends within the Telnet connect and read
+            # timeouts and its result is dropped
+            future.cancel()
+            results[ip] = {"status": "timeout", "message": f"No response within {timeout}s"}
+        elif future.exception() is not None:
+            results[ip] = {"status": "error", "message": str(future.exception())}
+        else:
+            value, elapsed = future.result()
+            results[ip] = {"status": "ok", key: value, "elapsed": round(elapsed, 3)}
+        summary[results[ip]["status"]] += 1
+
+    return {
+        "routers": results,
+        "summary": summary,
+        "elapsed": round(time.monotonic() - started, 3)
+    }
+
+
+def select_routers(routers: List[Dict], ips: Optional[List[str]] = None,
+                   selector: Optional[str] = None) -> List[Dict]:
+    """Pick routers by explicit IP list and/or a glob such as '192.168.1.*'"""
+    selected = routers
+    if ips is not None:
+        wanted = set(ips)
+        selected = [router for router in selected if router['ip'] in wanted]
+    if selector:
+        selected = [router for router in selected if fnmatch(router['ip'], selector)]
+    return selected
+
+
+def push_rip_config(router: Dict, version: Optional[str] = None, interfaces: List[Dict] = ()) -> Dict:
+    """Apply a RIP version and interface changes to one router in a single transaction"""
+    return ru.apply_rip_changes(router['ip'], router['username'], router['password'], version, interfaces)
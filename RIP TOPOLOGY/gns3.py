@@ -0,0 +1,71 @@
+from typing import Dict, Iterator, List, Optional
+import json
+
+
+def load_project(path: str) -> Dict:
+    """Read a GNS3 project file (.gns3 or its JSON export)"""
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def parse_nodes(project: Dict) -> List[Dict]:
+    """Every node with its type and Telnet console endpoint"""
+    nodes = []
+    for node in project.get("topology", {}).get("nodes", []):
+        nodes.append({
+            "node_id": node["node_id"],
+            "name": node.get("name", node["node_id"]),
+            "node_type": node.get("node_type", ""),
+            "console_host": node.get("console_host") or "localhost",
+            "console": node.get("console"),
+            "console_type": node.get("console_type", "")
+        })
+    return nodes
+
+
+# Emulated routers, VPCS and Docker nodes are hosts or appliances
+ROUTER_NODE_TYPES = ("dynamips", "iou", "qemu")
+# Console hosts that only say the GNS3 server listens everywhere
+WILDCARD_HOSTS = ("0.0.0.0", "::", "localhost")
+
+
+def console_endpoint(node: Dict, host: Optional[str] = None) -> str:
+    """host:port of a node's console, host replaces the one in the project when given"""
+    console_host = host or node["console_host"]
+    if console_host in WILDCARD_HOSTS:
+        console_host = "127.0.0.1"
+    if ":" in console_host:
+        console_host = f"[{console_host}]"
+    return f"{console_host}:{node['console']}"
+
+
+def parse_routers(project: Dict, host: Optional[str] = None) -> Iterator[Dict]:
+    """Router nodes with a Telnet console, keyed by console endpoint"""
+    for node in parse_nodes(project):
+        if node["node_type"] in ROUTER_NODE_TYPES and node["console_type"] == "telnet" and node["console"]:
+            yield {"ip": console_endpoint(node, host), "name": node["name"], "node_id": node["node_id"]}
+
+
+def port_name(end: Dict) -> str:
+    label = end.get("label", {}).get("text")
+    return label or f"{end.get('adapter_number', 0)}/{end.get('port_number', 0)}"
+
+
+def parse_links(project: Dict) -> List[Dict]:
+    """Point-to-point links between node names with the port used at each end"""
+    names = {node["node_id"]: node.get("name", node["node_id"])
+             for node in project.get("topology", {}).get("nodes", [])}
+    links = []
+    for link in project.get("topology", {}).get("links", []):
+        ends = link.get("nodes", [])
+        if len(ends) != 2 or ends[0]["node_id"] not in names or ends[1]["node_id"] not in names:
+            continue
+        links.append({
+            "link_id": link.get("link_id", ""),
+            "a": names[ends[0]["node_id"]],
+            "a_port": port_name(ends[0]),
+            "b": names[ends[1]["node_id"]],
+            "b_port": port_name(ends[1]),
+            "suspended": bool(link.get("suspend"))
+        })
+    return links
@@ -0,0 +1,25 @@
+# Production server: gunicorn -c gunicorn.conf.py wsgi:app
+import multiprocessing
+import os
+
+bind = os.environ.get("RIP_BIND", "0.0.0.0:5000")
+workers = int(os.environ.get("RIP_WORKERS", str(min(4, multiprocessing.cpu_count()))))
+# Threads per worker for REST requests, which mostly wait on Telnet
+rest_threads = int(os.environ.get("RIP_THREADS", "8"))
+# Each open /events stream holds a thread for as long as the dashboard stays. A worker serves at most
+# RIP_EVENT_STREAMS of them and answers 503 past that, so the fleet takes workers * RIP_EVENT_STREAMS
+# dashboards and the REST threads above are never used up by streams
+event_streams = int(os.environ.get("RIP_EVENT_STREAMS", "16"))
+threads = rest_threads + event_streams
+worker_class = "gthread"
+# Long enough for a batch of slow logins on one request
+timeout = int(os.environ.get("RIP_WORKER_TIMEOUT", "120"))
+graceful_timeout = 30
+
+# Workers share snapshots, route versions, jobs and token revocations through this file
+os.environ.setdefault("RIP_SHARED_STATE", "rip_shared.db")
+
+
+def post_worker_init(worker):
+    import app
+    app.start_background_tasks()
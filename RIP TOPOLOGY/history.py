@@ -0,0 +1,213 @@
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime
+import threading
+import hashlib
+import sqlite3
+import json
+import zlib
+import time
+import records
+import route_diff
+
+DAY = 86400.0
+RETENTION = 30 * DAY
+# Samples younger than this are kept at poll resolution, older ones one per bucket per router
+FULL_RESOLUTION = DAY
+BUCKET = 3600.0
+FLUSH_INTERVAL = 1.0
+MAINTENANCE_INTERVAL = 3600.0
+MAX_PENDING = 100000
+# Events worth keeping for flap analysis, route_change carries the changed networks
+RECORDED_EVENTS = ("route_change", "neighbor_up", "neighbor_down", "poll_error", "poll_recovered")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tables (hash TEXT PRIMARY KEY, data BLOB NOT NULL);
+CREATE TABLE IF NOT EXISTS samples (
+    router TEXT NOT NULL, ts REAL NOT NULL, routes TEXT NOT NULL, neighbors TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS samples_router_ts ON samples (router, ts);
+CREATE TABLE IF NOT EXISTS events (
+    router TEXT NOT NULL, ts REAL NOT NULL, type TEXT NOT NULL, data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_router_ts ON events (router, ts);
+"""
+
+
+def encode_table(routes: List[Dict]) -> Tuple[str, bytes]:
+    """Canonical compressed route table and its hash, identical tables share one row"""
+    rows = sorted(
+        [route.network(), *route.path()] if isinstance(route, records.RipRoute)
+        else [route.get(field, "") for field in route_diff.ROUTE_FIELDS] for route in routes
+    )
+    text = json.dumps(rows, separators=(",", ":"))
+    return hashlib.sha1(text.encode()).hexdigest(), zlib.compress(text.encode())
+
+
+class HistoryStore:
+    """Append-only SQLite history of polled routes, neighbors and convergence events.
+
+    Listeners only queue, a writer thread batches the queue into one transaction per
+    flush and enforces retention and downsampling once an hour."""
+
+    def __init__(self, path: str, retention: float = RETENTION, full_resolution: float = FULL_RESOLUTION,
+                 bucket: float = BUCKET, flush_interval: float = FLUSH_INTERVAL, bus=None):
+        self.path = path
+        self.retention = retention
+        self.full_resolution = full_resolution
+        self.bucket = bucket
+        self.flush_interval = flush_interval
+        self.bus = bus
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._samples = deque(maxlen=MAX_PENDING)
+        self._events = deque(maxlen=MAX_PENDING)
+        self._known_tables = set()
+        self._decoded: "OrderedDict[str, List[Dict]]" = OrderedDict()
+        self._decoded_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        with self._connect() as db:
+            db.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        # sqlite3 connections cannot be shared between threads
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30)
+            db.execute("PRAGMA journal_mode=WAL")
+            self._local.db = db
+        return db
+
+    def on_snapshot(self, router_ip: str, snapshot: Dict):
+        """SnapshotCache listener, only queues the sample"""
+        if "routes" in snapshot:
+            self._samples.append((router_ip, snapshot.get("polled_at", time.time()),
+                                  snapshot["routes"], snapshot.get("neighbors", [])))
+
+    def record_event(self, event: Dict):
+        if event.get("type") in RECORDED_EVENTS and event.get("router"):
+            self._events.append((event["router"], time.time(), event["type"], event))
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="rip-history", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+
+    def _run(self):
+        last_event = self.bus.last_id() if self.bus is not None else 0
+        last_maintenance = 0.0
+        while not self._stop.is_set():
+            if self.bus is not None:
+                events = self.bus.read(last_event, self.flush_interval)
+                if events is None:
+                    last_event = self.bus.last_id()
+                else:
+                    for event in events:
+                        self.record_event(event)
+                    if events:
+                        last_event = events[-1]["id"]
+            else:
+                self._stop.wait(self.flush_interval)
+            try:
+                self.flush()
+                if time.time() - last_maintenance >= MAINTENANCE_INTERVAL:
+                    self.compact()
+                    last_maintenance = time.time()
+            except sqlite3.Error as e:
+                print(f"Error writing RIP history: {str(e)}")
+
+    def flush(self):
+        """Write everything queued in one transaction"""
+        with self._lock:
+            samples = [self._samples.popleft() for _ in range(len(self._samples))]
+            events = [self._events.popleft() for _ in range(len(self._events))]
+            if not samples and not events:
+                return
+            tables = {}
+            rows = []
+            for router_ip, ts, routes, neighbors in samples:
+                digest, blob = encode_table(routes)
+                if digest not in self._known_tables:
+                    tables[digest] = blob
+                uptimes = [[neighbor.get("neighbor", ""), neighbor.get("uptime", "")] for neighbor in neighbors]
+                rows.append((router_ip, ts, digest, json.dumps(uptimes, separators=(",", ":"))))
+            with self._connect() as db:
+                db.executemany("INSERT OR IGNORE INTO tables (hash, data) VALUES (?, ?)", tables.items())
+                db.executemany("INSERT INTO samples (router, ts, routes, neighbors) VALUES (?, ?, ?, ?)", rows)
+                db.executemany(
+                    "INSERT INTO events (router, ts, type, data) VALUES (?, ?, ?, ?)",
+                    [(router_ip, ts, event_type, json.dumps(event, separators=(",", ":")))
+                     for router_ip, ts, event_type, event in events]
+                )
+            self._known_tables.update(tables)
+
+    def compact(self, now: Optional[float] = None):
+        """Drop data past retention and thin old samples to one per bucket"""
+        now = time.time() if now is None else now
+        expired = now - self.retention
+        cutoff = now - self.full_resolution
+        with self._lock, self._connect() as db:
+            db.execute("DELETE FROM samples WHERE ts < ?", (expired,))
+            db.execute("DELETE FROM events WHERE ts < ?", (expired,))
+            db.execute(
+                "DELETE FROM samples WHERE ts < :cutoff AND rowid NOT IN ("
+                " SELECT MIN(rowid) FROM samples WHERE ts < :cutoff"
+                " GROUP BY router, CAST(ts / :bucket AS INTEGER))",
+                {"cutoff": cutoff, "bucket": self.bucket}
+            )
+            db.execute("DELETE FROM tables WHERE hash NOT IN (SELECT DISTINCT routes FROM samples)")
+            self._known_tables = {row[0] for row in db.execute("SELECT hash FROM tables")}
+
+    def _table(self, db: sqlite3.Connection, digest: str) -> List[Dict]:
+        with self._decoded_lock:
+            routes = self._decoded.get(digest)
+            if routes is not None:
+                self._decoded.move_to_end(digest)
+                return routes
+        row = db.execute("SELECT data FROM tables WHERE hash = ?", (digest,)).fetchone()
+        rows = json.loads(zlib.decompress(row[0])) if row else []
+        routes = [dict(zip(route_diff.ROUTE_FIELDS, values)) for values in rows]
+        with self._decoded_lock:
+            self._decoded[digest] = routes
+            if len(self._decoded) > 256:
+                self._decoded.popitem(last=False)
+        return routes
+
+    def query(self, router_ip: str, start: float, end: float, limit: int = 1000,
+              include_routes: bool = True) -> Dict:
+        """Samples and events of one router between start and end, oldest first"""
+        db = self._connect()
+        samples = []
+        previous = None
+        for ts, digest, neighbors in db.execute(
+                "SELECT ts, routes, neighbors FROM samples WHERE router = ? AND ts >= ? AND ts <= ?"
+                " ORDER BY ts LIMIT ?", (router_ip, start, end, limit)):
+            sample = {
+                "time": datetime.fromtimestamp(ts).isoformat(),
+                "table": digest[:12],
+                "neighbors": [{"neighbor": neighbor, "uptime": uptime} for neighbor, uptime in json.loads(neighbors)]
+            }
+            routes = self._table(db, digest)
+            sample["route_count"] = len(routes)
+            # Unchanged tables are only spelled out once
+            if include_routes and digest != previous:
+                sample["routes"] = routes
+            previous = digest
+            samples.append(sample)
+        events = [
+            dict(json.loads(data), time=datetime.fromtimestamp(ts).isoformat())
+            for ts, data in db.execute(
+                "SELECT ts, data FROM events WHERE router = ? AND ts >= ? AND ts <= ? ORDER BY ts LIMIT ?",
+                (router_ip, start, end, limit))
+        ]
+        return {"router": router_ip, "from": datetime.fromtimestamp(start).isoformat(),
+                "to": datetime.fromtimestamp(end).isoformat(), "samples": samples, "events": events}
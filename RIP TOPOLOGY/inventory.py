@@ -0,0 +1,198 @@
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+import threading
+import tempfile
+import sqlite3
+import json
+import os
+
+try:
+    import fcntl
+except ImportError:
+    # Windows, only ever one server process there
+    fcntl = None
+
+
+class JsonInventory:
+    """Router inventory backed by routers_db.json with an in-memory index by IP"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.RLock()
+        self._routers: Dict[str, Dict] = {}
+        self._signature = None
+
+    def _file_signature(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _refresh(self):
+        """Reload the index only when the file changed on disk"""
+        signature = self._file_signature()
+        if signature == self._signature:
+            return
+        routers = {}
+        if signature is not None:
+            try:
+                with open(self.path, 'r') as f:
+                    for router in json.load(f):
+                        routers[router['ip']] = router
+            except (ValueError, KeyError, TypeError) as e:
+                print(f"Error loading routers from {self.path}: {e}")
+        self._routers = routers
+        self._signature = signature
+
+    def _write(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(prefix=".routers_", suffix=".json", dir=directory)
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(list(self._routers.values()), f, indent=2)
+            # Readers see either the old file or the new one, never a partial write
+            os.replace(tmp_path, self.path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+        self._signature = self._file_signature()
+
+    @contextmanager
+    def _updating(self):
+        """Hold the file lock across read-modify-write, other server processes write the same file"""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.path + ".lock", "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def all(self) -> List[Dict]:
+        with self._lock:
+            self._refresh()
+            return list(self._routers.values())
+
+    def get(self, ip: str) -> Optional[Dict]:
+        with self._lock:
+            self._refresh()
+            return self._routers.get(ip)
+
+    def put(self, router: Dict):
+        """Add a router, or replace the one registered with the same IP"""
+        with self._updating():
+            self._refresh()
+            self._routers[router['ip']] = router
+            self._write()
+
+    def put_many(self, routers: List[Dict]):
+        """Add or replace several routers with a single write"""
+        with self._updating():
+            self._refresh()
+            for router in routers:
+                self._routers[router['ip']] = router
+            self._write()
+
+    def update(self, ip: str, change: Callable[[Optional[Dict]], Optional[Dict]]) -> Optional[Dict]:
+        """Store change(current router or None) under the write lock, a None result leaves it as it is"""
+        with self._updating():
+            self._refresh()
+            router = change(self._routers.get(ip))
+            if router is not None:
+                self._routers[ip] = router
+                self._write()
+            return router
+
+    def remove(self, ip: str) -> bool:
+        with self._updating():
+            self._refresh()
+            if self._routers.pop(ip, None) is None:
+                return False
+            self._write()
+            return True
+
+    def replace_all(self, routers: List[Dict]):
+        with self._updating():
+            self._routers = {router['ip']: router for router in routers}
+            self._write()
+
+
+class SqliteInventory:
+    """Router inventory stored in SQLite, one row per router keyed by IP"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as db:
+            db.execute("CREATE TABLE IF NOT EXISTS routers (ip TEXT PRIMARY KEY, data TEXT NOT NULL)")
+
+    def _connect(self) -> sqlite3.Connection:
+        # sqlite3 connections cannot be shared between threads
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30)
+            db.execute("PRAGMA journal_mode=WAL")
+            self._local.db = db
+        return db
+
+    def all(self) -> List[Dict]:
+        rows = self._connect().execute("SELECT data FROM routers ORDER BY rowid").fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def get(self, ip: str) -> Optional[Dict]:
+        row = self._connect().execute("SELECT data FROM routers WHERE ip = ?", (ip,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, router: Dict):
+        with self._connect() as db:
+            db.execute(
+                "INSERT INTO routers (ip, data) VALUES (?, ?) "
+                "ON CONFLICT(ip) DO UPDATE SET data = excluded.data",
+                (router['ip'], json.dumps(router))
+            )
+
+    def put_many(self, routers: List[Dict]):
+        with self._connect() as db:
+            db.executemany(
+                "INSERT INTO routers (ip, data) VALUES (?, ?) "
+                "ON CONFLICT(ip) DO UPDATE SET data = excluded.data",
+                [(router['ip'], json.dumps(router)) for router in routers]
+            )
+
+    def update(self, ip: str, change: Callable[[Optional[Dict]], Optional[Dict]]) -> Optional[Dict]:
+        """Store change(current router or None) in one transaction, a None result leaves it as it is"""
+        with self._connect() as db:
+            # Take the write lock before reading, so no other process writes between the read and the write
+            db.execute("BEGIN IMMEDIATE")
+            row = db.execute("SELECT data FROM routers WHERE ip = ?", (ip,)).fetchone()
+            router = change(json.loads(row[0]) if row else None)
+            if router is not None:
+                db.execute(
+                    "INSERT INTO routers (ip, data) VALUES (?, ?) "
+                    "ON CONFLICT(ip) DO UPDATE SET data = excluded.data",
+                    (ip, json.dumps(router))
+                )
+            return router
+
+    def remove(self, ip: str) -> bool:
+        with self._connect() as db:
+            return db.execute("DELETE FROM routers WHERE ip = ?", (ip,)).rowcount > 0
+
+    def replace_all(self, routers: List[Dict]):
+        with self._connect() as db:
+            db.execute("DELETE FROM routers")
+            db.executemany(
+                "INSERT INTO routers (ip, data) VALUES (?, ?)",
+                [(router['ip'], json.dumps(router)) for router in routers]
+            )
+
+
+def open_inventory(path: str):
+    """Pick the backend from the file extension: .db/.sqlite use SQLite, anything else JSON"""
+    if path.endswith(('.db', '.sqlite', '.sqlite3')):
+        return SqliteInventory(path)
+    return JsonInventory(path)
@@ -0,0 +1,111 @@
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+from datetime import datetime
+import threading
+import uuid
+import session_logging
+
+
+class Job:
+    """A fleet operation tracked per router so clients can poll its progress"""
+
+    def __init__(self, kind: str, routers: List[Dict], concurrency: int):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.concurrency = concurrency
+        self.created = datetime.now().isoformat()
+        self.finished: Optional[str] = None
+        self.status = "pending"
+        self.routers = OrderedDict(
+            (router['ip'], {"status": "pending"}) for router in routers
+        )
+
+    def to_dict(self) -> Dict:
+        counts: Dict[str, int] = {}
+        for result in self.routers.values():
+            counts[result["status"]] = counts.get(result["status"], 0) + 1
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "created": self.created,
+            "finished": self.finished,
+            "concurrency": self.concurrency,
+            "summary": counts,
+            "routers": dict(self.routers)
+        }
+
+
+class JobManager:
+    """Runs per-router tasks for a job with a concurrency limit and keeps recent jobs"""
+
+    def __init__(self, max_workers: int = 20, max_jobs: int = 100, store=None):
+        self.max_workers = max_workers
+        self.max_jobs = max_jobs
+        # Where job status is also saved so other server processes can answer for it
+        self.store = store
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._lock = threading.Lock()
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+
+    def submit(self, kind: str, routers: List[Dict], task: Callable[[Dict], Dict],
+               concurrency: Optional[int] = None) -> Job:
+        """Start a job that runs task(router) for every router"""
+        concurrency = max(1, min(concurrency or self.max_workers, self.max_workers))
+        job = Job(kind, routers, concurrency)
+        with self._lock:
+            self._jobs[job.id] = job
+            while len(self._jobs) > self.max_jobs:
+                self._jobs.popitem(last=False)
+        # Session logs of the job's routers carry the ID of the request that started it
+        task = session_logging.bind(task)
+        self._save(job)
+        threading.Thread(target=self._dispatch, args=(job, routers, task),
+                         name=f"job-{job.id[:8]}", daemon=True).start()
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def status(self, job_id: str) -> Optional[Dict]:
+        """Progress of a job started by this process or, with a store, by any other"""
+        job = self.get(job_id)
+        if job is not None:
+            return job.to_dict()
+        return self.store.load_job(job_id) if self.store is not None else None
+
+    def _save(self, job: Job):
+        if self.store is None:
+            return
+        try:
+            self.store.save_job(job.to_dict())
+        except Exception as e:
+            print(f"Error saving job {job.id}: {str(e)}")
+
+    def _dispatch(self, job: Job, routers: List[Dict], task: Callable[[Dict], Dict]):
+        job.status = "running"
+        self._save(job)
+        slots = threading.Semaphore(job.concurrency)
+        futures = []
+        for router in routers:
+            # Hold back submission so one job cannot take every worker
+            slots.acquire()
+            future = self._executor.submit(self._run_one, job, router, task)
+            future.add_done_callback(lambda _: slots.release())
+            futures.append(future)
+        for future in futures:
+            future.result()
+        job.finished = datetime.now().isoformat()
+        job.status = "done"
+        self._save(job)
+
+    def _run_one(self, job: Job, router: Dict, task: Callable[[Dict], Dict]):
+        job.routers[router['ip']] = {"status": "running"}
+        try:
+            result = task(router)
+        except Exception as e:
+            result = {"status": "error", "message": str(e)}
+        job.routers[router['ip']] = result
+        self._save(job)
@@ -0,0 +1,149 @@
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Sequence, Tuple
+from bisect import bisect_left
+import threading
+import time
+import parsers
+
+# Seconds, Telnet logins take seconds while parsing takes microseconds
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+REGISTRY: List["Metric"] = []
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if value == int(value) else repr(value)
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"] + self.samples()
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_labels(self.label_names, labels)} {_number(value)}" for labels, value in items]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+        # labels -> [count per bucket plus +Inf, sum]
+        self._values: Dict[Tuple, list] = {}
+
+    def observe(self, value: float, *labels: str):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    @contextmanager
+    def time(self, *labels: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = [(labels, list(counts), total) for labels, (counts, total) in self._values.items()]
+        lines = []
+        for labels, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {repr(total)}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {cumulative}")
+        return lines
+
+
+class CallbackMetric(Metric):
+    """Reads its values when scraped, for state other modules already count"""
+
+    def __init__(self, name: str, help: str, kind: str, read: Callable[[], Dict[Tuple, float]],
+                 labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        self.kind = kind
+        self.read = read
+
+    def samples(self) -> List[str]:
+        try:
+            values = self.read()
+        except Exception as e:
+            print(f"Error reading metric {self.name}: {str(e)}")
+            return []
+        return [f"{self.name}{_labels(self.label_names, labels)} {_number(value)}" for labels, value in values.items()]
+
+
+def command_label(command: str) -> str:
+    """Commands with a registered parser keep their name, anything else a client sends is 'other'"""
+    normalized = " ".join(command.split()).lower()
+    return normalized if normalized in parsers.PARSERS else "other"
+
+
+def render() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+CONNECT_SECONDS = Histogram("rip_connect_seconds", "Telnet connect and login time", ["router"])
+CONNECT_FAILURES = Counter("rip_connect_failures_total", "Failed connects or logins", ["router"])
+POOL_CHECKOUTS = Counter("rip_pool_checkouts_total", "Session leases by whether an idle session was reused", ["result"])
+COMMAND_SECONDS = Histogram("rip_command_seconds", "Time from sending a command to its prompt", ["router", "command"])
+PARSE_SECONDS = Histogram("rip_parse_seconds", "Time to parse command output", ["command", "parser"])
+REQUEST_SECONDS = Histogram("rip_http_request_seconds", "REST request latency", ["method", "route", "status"])
+JSON_SECONDS = Histogram("rip_json_serialize_seconds", "Time to serialise REST responses")
+INVENTORY_SECONDS = Histogram("rip_inventory_load_seconds", "Time to load the router inventory")
+POLL_SECONDS = Histogram("rip_poll_seconds", "Time to poll every registered router once")
+POLL_ERRORS = Counter("rip_poll_errors_total", "Failed background polls", ["router"])
+QUEUE_SECONDS = Histogram("rip_queue_wait_seconds", "Time spent waiting for a router session slot", ["kind"])
+QUEUE_REJECTED = Counter("rip_queue_rejected_total", "Requests turned away by a full router queue or a queue timeout",
+                         ["kind"])
@@ -0,0 +1,177 @@
+from typing import Callable, Dict, List, Optional
+import re
+
+# Compiled once at import, parsing a table is a single pass over its lines
+IP = r"\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}"
+
+ROUTE_RE = re.compile(
+    r"^R\S*\s+(?P<network>" + IP + r")(?:/(?P<length>\d+))?\s+"
+    r"\[(?P<distance>\d+)/(?P<metric>\d+)\]\s+via\s+(?P<next_hop>" + IP + r")"
+    r"(?:,\s+(?P<age>[\w:.]+))?(?:,\s+(?P<interface>\S+))?"
+)
+# Extra equal-cost paths are printed on the following lines without the network
+ROUTE_CONTINUATION_RE = re.compile(
+    r"^\s+\[(?P<distance>\d+)/(?P<metric>\d+)\]\s+via\s+(?P<next_hop>" + IP + r")"
+    r"(?:,\s+(?P<age>[\w:.]+))?(?:,\s+(?P<interface>\S+))?"
+)
+# Routes held down after their metric reached 16
+POSSIBLY_DOWN_RE = re.compile(
+    r"^R\S*\s+(?P<network>" + IP + r")(?:/(?P<length>\d+))?\s+is possibly down,\s+"
+    r"routing via (?P<next_hop>" + IP + r")(?:,\s+(?P<interface>\S+))?"
+)
+SUBNETTED_RE = re.compile(r"^\s*(?P<network>" + IP + r")/(?P<length>\d+) is (?:variably )?subnetted")
+
+INTERFACE_RE = re.compile(
+    r"^(?P<interface>\S+)\s+(?P<ip_address>\S+)\s+(?:YES|NO)\s+\S+\s+"
+    r"(?P<status>up|down|administratively down|deleted)\s+(?P<proto>up|down)\s*$"
+)
+
+PROTOCOL_RE = re.compile(r'^\s*Routing Protocol is "(?P<protocol>[^"]+)"')
+VERSION_RE = re.compile(r"^\s*Default version control: send version (?P<send>[\d ]+?), receive version")
+SOURCE_RE = re.compile(r"^\s+(?P<neighbor>" + IP + r")\s+(?P<distance>\d+)\s+(?P<last_update>\S+)")
+RIP_NEIGHBOR_RE = re.compile(r"^\s*(?P<neighbor>" + IP + r")\s+(?P<interface>\S+)?\s*(?P<uptime>\d[\w:]*)?")
+
+
+def classful_length(network: str) -> int:
+    first = int(network.split(".", 1)[0])
+    if first < 128:
+        return 8
+    if first < 192:
+        return 16
+    return 24
+
+
+def classful_network(network: str) -> str:
+    octets = network.split(".")
+    keep = classful_length(network) // 8
+    return ".".join(octets[:keep] + ["0"] * (4 - keep))
+
+
+def _network(match, subnetted: Dict[str, str]) -> str:
+    prefix = match.group("network")
+    # Older IOS omits the length on subnets and prints it on the major network's "is subnetted" header
+    length = match.group("length") or subnetted.get(classful_network(prefix)) or str(classful_length(prefix))
+    return f"{prefix}/{length}"
+
+
+def parse_rip_routes(output: str) -> List[Dict]:
+    """Parse 'show ip route rip' into one dict per path"""
+    routes = []
+    network = None
+    subnetted: Dict[str, str] = {}
+    for line in output.splitlines():
+        match = SUBNETTED_RE.match(line)
+        if match:
+            subnetted[match.group("network")] = match.group("length")
+            continue
+        match = ROUTE_RE.match(line)
+        if match:
+            network = _network(match, subnetted)
+        elif network and ROUTE_CONTINUATION_RE.match(line):
+            match = ROUTE_CONTINUATION_RE.match(line)
+        else:
+            network = None
+            down = POSSIBLY_DOWN_RE.match(line)
+            if down:
+                routes.append({
+                    "network": _network(down, subnetted),
+                    "distance": "120",
+                    "metric": "16",
+                    "next_hop": down.group("next_hop"),
+                    "interface": down.group("interface") or ""
+                })
+            continue
+        routes.append({
+            "network": network,
+            "distance": match.group("distance"),
+            "metric": match.group("metric"),
+            "next_hop": match.group("next_hop"),
+            "interface": match.group("interface") or ""
+        })
+    return routes
+
+
+def parse_rip_sources(output: str) -> List[Dict]:
+    """Parse the RIP 'Routing Information Sources' of 'show ip protocols' as neighbors"""
+    neighbors = []
+    in_rip = in_sources = False
+    for line in output.splitlines():
+        match = PROTOCOL_RE.match(line)
+        if match:
+            in_rip = match.group("protocol").split()[0] == "rip"
+            in_sources = False
+            continue
+        if not in_rip:
+            continue
+        if "Routing Information Sources" in line:
+            in_sources = True
+            continue
+        if in_sources:
+            match = SOURCE_RE.match(line)
+            if match:
+                # IOS only reports time since the last update from each source
+                neighbors.append({
+                    "neighbor": match.group("neighbor"),
+                    "interface": "",
+                    "uptime": match.group("last_update")
+                })
+            elif line.strip() and not line.strip().startswith("Gateway"):
+                in_sources = False
+    return neighbors
+
+
+def parse_rip_neighbors(output: str) -> List[Dict]:
+    """Parse neighbor listings, accepting both 'show ip protocols' and per-neighbor tables"""
+    if "Routing Protocol is" in output:
+        return parse_rip_sources(output)
+    neighbors = []
+    for line in output.splitlines():
+        match = RIP_NEIGHBOR_RE.match(line)
+        if match:
+            neighbors.append({
+                "neighbor": match.group("neighbor"),
+                "interface": match.group("interface") or "",
+                "uptime": match.group("uptime") or ""
+            })
+    return neighbors
+
+
+def parse_rip_version(output: str) -> Optional[str]:
+    """Get the RIP send version from 'show ip protocols', None when RIP is not running"""
+    in_rip = False
+    for line in output.splitlines():
+        match = PROTOCOL_RE.match(line)
+        if match:
+            in_rip = match.group("protocol").split()[0] == "rip"
+            continue
+        match = VERSION_RE.match(line) if in_rip else None
+        if match:
+            return match.group("send").split()[-1]
+    return None
+
+
+def parse_interfaces_brief(output: str) -> List[Dict]:
+    """Parse 'show ip interface brief'"""
+    interfaces = []
+    for line in output.splitlines():
+        match = INTERFACE_RE.match(line)
+        if match:
+            interfaces.append(match.groupdict())
+    return interfaces
+
+
+PARSERS: Dict[str, Callable[[str], List[Dict]]] = {
+    "show ip route rip": parse_rip_routes,
+    "show ip rip neighbors": parse_rip_neighbors,
+    "show ip protocols": parse_rip_sources,
+    "show ip interface brief": parse_interfaces_brief,
+}
+
+
+def get_parser(command: str) -> Optional[Callable[[str], List[Dict]]]:
+    return PARSERS.get(" ".join(command.split()).lower())
+
+
+def register(command: str, parser: Callable[[str], List[Dict]]):
+    """Add or replace the parser used for a show command"""
+    PARSERS[" ".join(command.split()).lower()] = parser
@@ -0,0 +1,139 @@
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional
+from datetime import datetime
+import threading
+import time
+import router_utils as ru
+import metrics
+
+POLL_WORKERS = 32
+# Not shared with fleet fan-outs, whose timed-out calls keep running and would starve the poller
+EXECUTOR = ThreadPoolExecutor(max_workers=POLL_WORKERS, thread_name_prefix="poll")
+
+
+class SnapshotCache:
+    """Latest collected state per router, shared by the poller and the REST handlers"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshots: Dict[str, Dict] = {}
+        self._listeners: List[Callable[[str, Dict], None]] = []
+        self._remove_listeners: List[Callable[[str], None]] = []
+
+    def add_listener(self, listener: Callable[[str, Dict], None]):
+        """Call listener(ip, snapshot) after every store, in store order so it must be quick"""
+        self._listeners.append(listener)
+
+    def add_remove_listener(self, listener: Callable[[str], None]):
+        """Call listener(ip) after a router's snapshot is dropped"""
+        self._remove_listeners.append(listener)
+
+    def _notify(self, ip: str, snapshot: Dict):
+        for listener in self._listeners:
+            try:
+                listener(ip, snapshot)
+            except Exception as e:
+                print(f"Error in snapshot listener for router {ip}: {str(e)}")
+
+    def get(self, ip: str) -> Optional[Dict]:
+        return self._snapshots.get(ip)
+
+    def put(self, ip: str, snapshot: Dict):
+        # Snapshots are replaced, never mutated, so readers need no lock
+        with self._lock:
+            self._snapshots[ip] = snapshot
+            self._notify(ip, snapshot)
+
+    def update(self, ip: str, **fields):
+        """Merge freshly read fields into the router's snapshot"""
+        with self._lock:
+            snapshot = dict(self._snapshots.get(ip, {}))
+            snapshot.update(fields)
+            snapshot["last_updated"] = datetime.now().isoformat()
+            snapshot["polled_at"] = time.time()
+            self._snapshots[ip] = snapshot
+            self._notify(ip, snapshot)
+
+    def remove(self, ip: str):
+        with self._lock:
+            if self._snapshots.pop(ip, None) is None:
+                return
+            for listener in self._remove_listeners:
+                try:
+                    listener(ip)
+                except Exception as e:
+                    print(f"Error in snapshot listener for router {ip}: {str(e)}")
+
+    def ips(self) -> List[str]:
+        return list(self._snapshots)
+
+
+CACHE = SnapshotCache()
+# What collect() stores, live reads of routes or neighbors alone merge in only part of it
+SNAPSHOT_FIELDS = ("last_updated", "rip_version", "routes", "neighbors", "interfaces", "polled_at")
+
+
+def is_complete(snapshot: Optional[Dict]) -> bool:
+    """True when a cached snapshot holds the full state collect() reads"""
+    return snapshot is not None and all(field in snapshot for field in SNAPSHOT_FIELDS)
+
+
+def collect(router: Dict, cache: SnapshotCache = CACHE) -> Dict:
+    """Read routes, neighbors and interfaces from one router and store the snapshot"""
+    conn = ru.RouterConnection(router['ip'], router['username'], router['password'])
+    snapshot = dict(conn.collect_state())
+    snapshot["polled_at"] = time.time()
+    cache.put(router['ip'], snapshot)
+    return snapshot
+
+
+class RipPoller:
+    """Background thread that refreshes the snapshot cache on a fixed interval"""
+
+    def __init__(self, load_routers: Callable[[], List[Dict]], interval: float = 30.0,
+                 cache: SnapshotCache = CACHE, on_error: Optional[Callable[[str, Exception], None]] = None):
+        self.load_routers = load_routers
+        self.interval = interval
+        self.cache = cache
+        self.on_error = on_error
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="rip-poller", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def poll_once(self):
+        """Poll every registered router in parallel"""
+        routers = self.load_routers()
+        with metrics.POLL_SECONDS.time():
+            futures = {EXECUTOR.submit(collect, router, self.cache): router['ip'] for router in routers}
+            wait(futures)
+        for future, ip in futures.items():
+            if future.exception() is not None:
+                metrics.POLL_ERRORS.inc(ip)
+                print(f"Error polling router {ip}: {future.exception()}")
+                if self.on_error is not None:
+                    self.on_error(ip, future.exception())
+
+        registered = {router['ip'] for router in routers}
+        for ip in self.cache.ips():
+            if ip not in registered:
+                self.cache.remove(ip)
+
+    def _run(self):
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                self.poll_once()
+            except Exception as e:
+                print(f"Error in RIP poller: {str(e)}")
+            self._stop.wait(max(0.0, self.interval - (time.monotonic() - started)))
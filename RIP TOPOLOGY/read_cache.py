@@ -0,0 +1,92 @@
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+import threading
+import time
+
+DEFAULT_TTL = 10.0
+
+
+class _Flight:
+    """One in-progress device read that concurrent callers wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class ReadThroughCache:
+    """TTL + LRU cache keyed by (router, command) with single-flight loading"""
+
+    def __init__(self, max_entries: int = 1024, ttls: Optional[Dict[str, float]] = None):
+        self.max_entries = max_entries
+        self.ttls = dict(ttls or {})
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, object]]" = OrderedDict()
+        self._flights: Dict[Tuple[str, str], _Flight] = {}
+        self._generations: Dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_load(self, router_ip: str, command: str, loader: Callable, refresh: bool = False):
+        """Return the cached result for a command or run loader once for all waiting callers"""
+        key = (router_ip, command)
+        with self._lock:
+            if not refresh:
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+            self.misses += 1
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                generation = self._generations.get(router_ip, 0)
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = loader()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+                # A config write during the load makes this result stale, do not store it
+                if flight.error is None and self._generations.get(router_ip, 0) == generation:
+                    self._store(key, flight.result)
+            flight.done.set()
+        return flight.result
+
+    def _store(self, key: Tuple[str, str], value):
+        ttl = self.ttls.get(key[1], DEFAULT_TTL)
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, router_ip: str, command: Optional[str] = None):
+        """Drop cached reads for a router, or only one of its commands"""
+        with self._lock:
+            self._generations[router_ip] = self._generations.get(router_ip, 0) + 1
+            if command is not None:
+                self._entries.pop((router_ip, command), None)
+                return
+            for key in [k for k in self._entries if k[0] == router_ip]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        """Get entry count and hit/miss counters"""
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
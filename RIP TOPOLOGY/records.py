@@ -0,0 +1,270 @@
+from functools import lru_cache
+from json.encoder import encode_basestring_ascii
+from typing import Callable, Dict, List, Optional, Tuple, Union
+import json
+import socket
+import sys
+
+# Unassigned interfaces have no address, 'show ip interface brief' prints this instead
+UNASSIGNED = "unassigned"
+
+
+# Uncached, a bounded cache misses on every prefix of a large table and costs more than the conversion
+def ip_to_int(address: str) -> int:
+    # Unlike inet_aton, inet_pton only takes dotted quads, shorthand like '10.1' would not round-trip
+    try:
+        return int.from_bytes(socket.inet_pton(socket.AF_INET, address), "big")
+    except OSError:
+        raise ValueError(f"Not an IPv4 address: {address!r}") from None
+
+
+def int_to_ip(value: int) -> str:
+    return socket.inet_ntoa(value.to_bytes(4, "big"))
+
+
+# Next hops repeat on most routes of a table, the prefixes do not and would only churn a shared cache
+next_hop_to_int = lru_cache(maxsize=4096)(ip_to_int)
+next_hop_to_ip = lru_cache(maxsize=4096)(int_to_ip)
+
+
+def prefix_to_int(network: str) -> Tuple[int, int]:
+    """'10.1.0.0/16' to (address, length), a bare address is a /32"""
+    address, _, length = network.partition("/")
+    length = int(length or 32)
+    if not 0 <= length <= 32:
+        raise ValueError(f"Invalid prefix length: {network!r}")
+    return ip_to_int(address), length
+
+
+def _intern(value: str) -> str:
+    # Interface names and states repeat on every route of every router, keep one copy of each
+    return sys.intern(value) if value else ""
+
+
+class Record:
+    """Base for the slotted records kept in snapshots.
+
+    Records also answer record["field"] and record.get("field") with the text the JSON API
+    returns, so code written against the old per-entry dicts keeps working."""
+    __slots__ = ()
+    # JSON field names, to_dict() builds them in this order
+    FIELDS: Tuple[str, ...] = ()
+
+    def __getitem__(self, field: str):
+        return self.to_dict()[field]
+
+    def get(self, field: str, default=None):
+        return self.to_dict().get(field, default)
+
+    def keys(self):
+        return self.FIELDS
+
+    def __contains__(self, field) -> bool:
+        return field in self.FIELDS
+
+    def to_dict(self) -> Dict:
+        raise NotImplementedError
+
+    def json(self) -> str:
+        """The record as JSON text, what dumps() writes in its place"""
+        return json.dumps(self.to_dict())
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Record):
+            other = other.to_dict()
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class RipRoute(Record):
+    """One path of 'show ip route rip', prefix and next hop as integers"""
+    __slots__ = ("prefix", "length", "distance", "metric", "next_hop", "interface", "last_updated")
+    FIELDS = ("network", "distance", "metric", "next_hop", "interface", "last_updated")
+
+    def __init__(self, prefix: int, length: int, distance: int, metric: int, next_hop: int, interface: str,
+                 last_updated: str):
+        self.prefix = prefix
+        self.length = length
+        self.distance = distance
+        self.metric = metric
+        self.next_hop = next_hop
+        self.interface = _intern(interface)
+        # One string object shared by every route of the snapshot
+        self.last_updated = last_updated
+
+    def to_dict(self) -> Dict:
+        return {"network": self.network(), "distance": str(self.distance),
+                "metric": str(self.metric), "next_hop": next_hop_to_ip(self.next_hop), "interface": self.interface,
+                "last_updated": self.last_updated}
+
+    def json(self) -> str:
+        # Tables run to 100k routes, written straight to text without a dict per route.
+        # Addresses and numbers never need escaping
+        return (f'{{"network": "{int_to_ip(self.prefix)}/{self.length}", "distance": "{self.distance}", '
+                f'"metric": "{self.metric}", "next_hop": "{next_hop_to_ip(self.next_hop)}", '
+                f'"interface": {encode_basestring_ascii(self.interface)}, '
+                f'"last_updated": {encode_basestring_ascii(self.last_updated)}}}')
+
+    def network(self) -> str:
+        return f"{int_to_ip(self.prefix)}/{self.length}"
+
+    def path(self) -> Tuple[str, str, str, str]:
+        """distance, metric, next hop and interface as text, in route_diff.ROUTE_FIELDS order"""
+        return str(self.distance), str(self.metric), next_hop_to_ip(self.next_hop), self.interface
+
+    @classmethod
+    def from_dict(cls, route: Dict, last_updated: str) -> "RipRoute":
+        prefix, length = prefix_to_int(route["network"])
+        return cls(prefix, length, int(route["distance"]), int(route["metric"]),
+                   next_hop_to_int(route["next_hop"]), route.get("interface") or "", last_updated)
+
+
+class RipNeighbor(Record):
+    """One RIP routing information source"""
+    __slots__ = ("neighbor", "interface", "uptime", "last_update")
+    FIELDS = ("neighbor", "interface", "uptime", "last_update")
+
+    def __init__(self, neighbor: int, interface: str, uptime: str, last_update: str):
+        self.neighbor = neighbor
+        self.interface = _intern(interface)
+        self.uptime = uptime
+        self.last_update = last_update
+
+    def to_dict(self) -> Dict:
+        return {"neighbor": int_to_ip(self.neighbor), "interface": self.interface, "uptime": self.uptime,
+                "last_update": self.last_update}
+
+    @classmethod
+    def from_dict(cls, neighbor: Dict, last_update: str) -> "RipNeighbor":
+        return cls(ip_to_int(neighbor["neighbor"]), neighbor.get("interface") or "", neighbor.get("uptime") or "",
+                   last_update)
+
+
+class InterfaceStatus(Record):
+    """One line of 'show ip interface brief', ip_address is None when unassigned"""
+    __slots__ = ("interface", "ip_address", "status", "proto")
+    FIELDS = ("interface", "ip_address", "status", "proto")
+
+    def __init__(self, interface: str, ip_address: Optional[int], status: str, proto: str):
+        self.interface = _intern(interface)
+        self.ip_address = ip_address
+        self.status = _intern(status)
+        self.proto = _intern(proto)
+
+    def to_dict(self) -> Dict:
+        return {"interface": self.interface,
+                "ip_address": UNASSIGNED if self.ip_address is None else int_to_ip(self.ip_address),
+                "status": self.status, "proto": self.proto}
+
+    @classmethod
+    def from_dict(cls, interface: Dict) -> "InterfaceStatus":
+        address = interface.get("ip_address") or UNASSIGNED
+        return cls(interface["interface"], None if address == UNASSIGNED else ip_to_int(address),
+                   interface.get("status") or "", interface.get("proto") or "")
+
+
+Entry = Union[Record, Dict]
+
+
+def _convert(entries, make: Callable[[Dict], Record]) -> List[Entry]:
+    converted = []
+    for entry in entries:
+        if isinstance(entry, Record):
+            converted.append(entry)
+            continue
+        try:
+            converted.append(make(entry))
+        except (KeyError, ValueError, TypeError, AttributeError):
+            # Output a parser could not fully read (TextFSM fallback, IPv6), keep it as it came
+            converted.append(entry)
+    return converted
+
+
+def routes(entries, last_updated: str) -> List[Entry]:
+    return _convert(entries, lambda route: RipRoute.from_dict(route, last_updated))
+
+
+def neighbors(entries, last_update: str) -> List[Entry]:
+    return _convert(entries, lambda neighbor: RipNeighbor.from_dict(neighbor, last_update))
+
+
+def interfaces(entries) -> List[Entry]:
+    return _convert(entries, InterfaceStatus.from_dict)
+
+
+def compact_snapshot(snapshot: Dict) -> Dict:
+    """Snapshot with its JSON route, neighbor and interface dicts turned back into records"""
+    compacted = dict(snapshot)
+    # Entries read in one poll carry the same timestamp, keep one string per distinct value
+    stamps: Dict[str, str] = {}
+
+    def stamp(value) -> str:
+        return stamps.setdefault(value, value) if isinstance(value, str) else ""
+
+    if isinstance(snapshot.get("routes"), list):
+        compacted["routes"] = _convert(
+            snapshot["routes"], lambda route: RipRoute.from_dict(route, stamp(route.get("last_updated"))))
+    if isinstance(snapshot.get("neighbors"), list):
+        compacted["neighbors"] = _convert(
+            snapshot["neighbors"], lambda neighbor: RipNeighbor.from_dict(neighbor, stamp(neighbor.get("last_update"))))
+    if isinstance(snapshot.get("interfaces"), list):
+        compacted["interfaces"] = interfaces(snapshot["interfaces"])
+    return compacted
+
+
+def json_default(value):
+    """json.dumps default= hook writing records in the dict shape the API always returned"""
+    if isinstance(value, Record):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+# Stands in for record text while json.dumps writes the rest of the payload, then gets swapped for it
+_MARKER = "\x00record\x00"
+_ENCODED_MARKER = json.dumps(_MARKER)
+
+
+def _list_text(entries: List[Entry]) -> str:
+    return "[" + ", ".join([entry.json() if isinstance(entry, Record) else json.dumps(entry, default=json_default)
+                            for entry in entries]) + "]"
+
+
+def dumps(value, **kwargs) -> str:
+    """json.dumps that writes records from their own text instead of building a dict for each"""
+    texts: List[str] = []
+
+    def splice(text: str) -> str:
+        texts.append(text)
+        return _MARKER
+
+    def default(obj):
+        if isinstance(obj, Record):
+            return splice(obj.json())
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+    def swap_lists(obj, depth: int):
+        # Snapshots and API responses keep their record lists a level or two down, each is written as one text
+        if isinstance(obj, list) and obj and isinstance(obj[0], Record):
+            return splice(_list_text(obj))
+        if depth and isinstance(obj, dict):
+            return {key: swap_lists(item, depth - 1) for key, item in obj.items()}
+        return obj
+
+    text = json.dumps(swap_lists(value, 2), default=default, **kwargs)
+    if not texts:
+        return text
+    parts = text.split(_ENCODED_MARKER)
+    if len(parts) != len(texts) + 1:
+        # A string in the payload matched the marker, write it the slow way
+        return json.dumps(value, default=json_default, **kwargs)
+    pieces = [parts[0]]
+    for record_text, part in zip(texts, parts[1:]):
+        pieces.append(record_text)
+        pieces.append(part)
+    return "".join(pieces)
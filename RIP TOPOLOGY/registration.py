@@ -0,0 +1,102 @@
+from concurrent.futures import Future
+from datetime import datetime
+from typing import Dict, List, Optional
+from netmiko.exceptions import NetmikoAuthenticationException
+import threading
+import asyncio
+import os
+import async_router as ar
+
+PENDING = "pending"
+REACHABLE = "reachable"
+UNREACHABLE = "unreachable"
+# The router answered but turned the credentials down, fixing the password is the way out
+AUTH_FAILED = "auth_failed"
+# Logins allowed in flight at once, each is a coroutine rather than a thread
+VALIDATE_CONCURRENCY = int(os.environ.get("RIP_VALIDATE_CONCURRENCY", "100"))
+VALIDATE_TIMEOUT = float(os.environ.get("RIP_VALIDATE_TIMEOUT", "20"))
+
+
+class RegistrationValidator:
+    """Saves new routers as pending and validates them in the background.
+
+    Validation logs in with the asyncio Telnet client on one event loop thread, so
+    hundreds of routers can be waiting on a slow login at once without a blocked worker
+    each. The outcome is written back onto the router's inventory record."""
+
+    def __init__(self, inventory, concurrency: int = VALIDATE_CONCURRENCY, timeout: float = VALIDATE_TIMEOUT):
+        self.inventory = inventory
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    def _event_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="rip-validate", daemon=True).start()
+                self._slots = asyncio.Semaphore(self.concurrency)
+                self._loop = loop
+            return self._loop
+
+    def register(self, routers: List[Dict]) -> List[Dict]:
+        """Save routers as pending with one inventory write and queue their validation"""
+        registered_at = datetime.now().isoformat()
+        records = [dict(router, status=PENDING, registered_at=registered_at, validation=None) for router in routers]
+        self.inventory.put_many(records)
+        for record in records:
+            self.submit(record)
+        return records
+
+    def register_checked(self, routers: List[Dict], probes: Dict[str, Dict], checked_at: str) -> List[Dict]:
+        """Save routers the caller already logged in to as reachable, their probe result as the validation"""
+        registered_at = datetime.now().isoformat()
+        records = [dict(router, status=REACHABLE, registered_at=registered_at,
+                        validation=dict(probes[router["ip"]], checked_at=checked_at)) for router in routers]
+        self.inventory.put_many(records)
+        return records
+
+    def resume(self):
+        """Queue routers left pending by a previous process"""
+        for record in self.inventory.all():
+            if record.get("status") == PENDING:
+                self.submit(record)
+
+    def submit(self, record: Dict) -> Future:
+        return asyncio.run_coroutine_threadsafe(self._validate(record), self._event_loop())
+
+    async def _validate(self, record: Dict):
+        async with self._slots:
+            checked_at = datetime.now().isoformat()
+            try:
+                result = await ar.probe(record["ip"], record["username"], record["password"], self.timeout)
+                status, validation = REACHABLE, dict(result, checked_at=checked_at)
+            except NetmikoAuthenticationException:
+                message = f"Router {record['ip']} rejected the username or password"
+                status, validation = AUTH_FAILED, {"checked_at": checked_at, "error": message}
+            except Exception as e:
+                status, validation = UNREACHABLE, {"checked_at": checked_at, "error": str(e) or type(e).__name__}
+        # Inventory writes are blocking file or SQLite I/O, keep them off the loop
+        await asyncio.get_running_loop().run_in_executor(None, self._record, record, status, validation)
+
+    def _record(self, record: Dict, status: str, validation: Dict):
+        def validated(current: Optional[Dict]) -> Optional[Dict]:
+            # Removed or registered again while this check ran, the newer registration wins
+            if current is None or current.get("registered_at") != record["registered_at"]:
+                return None
+            return dict(current, status=status, validation=validation)
+
+        # Checked and written under the inventory's write lock, a registration in between cannot be overwritten
+        self.inventory.update(record["ip"], validated)
+
+
+def status_of(router: Dict) -> Dict:
+    """Registration status of an inventory record, routers added before validation was tracked are unknown"""
+    return {
+        "ip": router["ip"],
+        "status": router.get("status", "unknown"),
+        "registered_at": router.get("registered_at"),
+        "validation": router.get("validation")
+    }
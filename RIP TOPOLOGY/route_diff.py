@@ -0,0 +1,125 @@
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+import threading
+import time
+import records
+
+# Fields that make up a path, per entry timestamps are left out so an unchanged table compares equal
+ROUTE_FIELDS = ("network", "distance", "metric", "next_hop", "interface")
+# Deltas kept per router, clients further behind get the full table
+MAX_DELTAS = 64
+
+Paths = Tuple[Tuple[str, ...], ...]
+
+
+def index_routes(routes: List[Dict]) -> Dict[str, Paths]:
+    """Map each network to its sorted paths so equal-cost routes compare as a set"""
+    table: Dict[str, List[Tuple[str, ...]]] = {}
+    for route in routes:
+        if isinstance(route, records.RipRoute):
+            table.setdefault(route.network(), []).append(route.path())
+            continue
+        path = tuple(str(route.get(field, "")) for field in ROUTE_FIELDS[1:])
+        table.setdefault(route.get("network", ""), []).append(path)
+    return {network: tuple(sorted(paths)) for network, paths in table.items()}
+
+
+def expand(network: str, paths: Paths) -> List[Dict]:
+    return [dict(zip(ROUTE_FIELDS, (network,) + path)) for path in paths]
+
+
+def describe(network: str, old: Optional[Paths], new: Optional[Paths]) -> Optional[Dict]:
+    """Turn a network's paths before and after into an added, withdrawn or changed entry"""
+    if old == new:
+        return None
+    if old is None:
+        return {"type": "added", "network": network, "routes": expand(network, new)}
+    if new is None:
+        return {"type": "withdrawn", "network": network, "routes": expand(network, old)}
+    return {"type": "changed", "network": network, "previous": expand(network, old), "routes": expand(network, new)}
+
+
+class RouterTable:
+    """Current table of one router with the deltas that led to it"""
+
+    def __init__(self, table: Dict[str, Paths], version: int, max_deltas: int):
+        self.table = table
+        self.version = version
+        # (previous version, version, {network: (old paths, new paths)}) oldest first
+        self.deltas = deque(maxlen=max_deltas)
+
+
+class RouteTracker:
+    """Versioned route tables per router, the version only moves when the table changes"""
+
+    def __init__(self, max_deltas: int = MAX_DELTAS):
+        self.max_deltas = max_deltas
+        self._lock = threading.Lock()
+        self._routers: Dict[str, RouterTable] = {}
+        self._assigned: Dict[str, int] = {}
+
+    def assign_version(self, router_ip: str, version: int):
+        """Version for the next table observed for router_ip, so processes sharing snapshots agree"""
+        with self._lock:
+            self._assigned[router_ip] = version
+
+    def observe(self, router_ip: str, routes: List[Dict]) -> List[Dict]:
+        """Record a freshly read table and return what changed since the last one"""
+        table = index_routes(routes)
+        with self._lock:
+            assigned = self._assigned.pop(router_ip, None)
+            state = self._routers.get(router_ip)
+            if state is None:
+                # Versions start at the wall clock in ms so ones handed out before a restart read as too old
+                version = assigned or time.time_ns() // 1_000_000
+                self._routers[router_ip] = RouterTable(table, version, self.max_deltas)
+                return []
+            delta = {
+                network: (state.table.get(network), table.get(network))
+                for network in state.table.keys() | table.keys()
+                if state.table.get(network) != table.get(network)
+            }
+            if not delta and (assigned is None or assigned <= state.version):
+                return []
+            previous = state.version
+            state.version = assigned if assigned is not None and assigned > previous else previous + 1
+            state.table = table
+            # An empty delta moves a version this process missed onto the one the others use
+            state.deltas.append((previous, state.version, delta))
+        return [describe(network, old, new) for network, (old, new) in sorted(delta.items())]
+
+    def on_snapshot(self, router_ip: str, snapshot: Dict):
+        """SnapshotCache listener"""
+        if "routes" in snapshot:
+            self.observe(router_ip, snapshot["routes"])
+
+    def version(self, router_ip: str) -> Optional[int]:
+        state = self._routers.get(router_ip)
+        return state.version if state else None
+
+    def etag(self, router_ip: str) -> Optional[str]:
+        state = self._routers.get(router_ip)
+        return f"{router_ip}-{state.version}" if state else None
+
+    def since(self, router_ip: str, version: int) -> Optional[List[Dict]]:
+        """Changes after version folded into one entry per network, None when they are no longer known"""
+        with self._lock:
+            state = self._routers.get(router_ip)
+            if state is None or version > state.version:
+                return None
+            if version == state.version:
+                return []
+            if not state.deltas or version < state.deltas[0][0]:
+                return None
+            combined: Dict[str, Tuple[Optional[Paths], Optional[Paths]]] = {}
+            for _, delta_version, delta in state.deltas:
+                if delta_version <= version:
+                    continue
+                for network, (old, new) in delta.items():
+                    combined[network] = (combined[network][0] if network in combined else old, new)
+        changes = (describe(network, old, new) for network, (old, new) in sorted(combined.items()))
+        return [change for change in changes if change is not None]
+
+    def remove(self, router_ip: str):
+        with self._lock:
+            self._routers.pop(router_ip, None)
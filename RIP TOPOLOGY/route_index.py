@@ -0,0 +1,233 @@
+from typing import Dict, List, Optional, Tuple
+import threading
+import records
+import route_diff
+
+MASKS = [(0xFFFFFFFF << (32 - length)) & 0xFFFFFFFF for length in range(33)]
+MAX_TRACE_HOPS = 16
+
+
+def route_prefixes(routes) -> Dict[str, Tuple[int, int]]:
+    """Network -> (address, length) of a route list, records already carry them as ints"""
+    prefixes = {}
+    for route in routes:
+        if isinstance(route, records.RipRoute):
+            prefixes[route.network()] = (route.prefix, route.length)
+            continue
+        network = route.get("network", "")
+        if network not in prefixes:
+            try:
+                prefixes[network] = records.prefix_to_int(network)
+            except ValueError:
+                # IPv6 or output the parser could not read, not something the trie can hold
+                pass
+    return prefixes
+
+
+class _Node:
+    __slots__ = ("value", "length", "entry", "children")
+
+    def __init__(self, value: int, length: int, entry=None):
+        self.value = value
+        self.length = length
+        self.entry = entry
+        self.children = [None, None]
+
+
+class PrefixTrie:
+    """Path-compressed binary (Patricia) trie over IPv4 prefixes.
+
+    Only prefixes and branch points are nodes, so a lookup visits at most one node per
+    distinct prefix length on the way down instead of one per bit."""
+
+    def __init__(self):
+        self._root = _Node(0, 0)
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def insert(self, value: int, length: int, entry):
+        value &= MASKS[length]
+        node = self._root
+        while True:
+            if node.length == length:
+                if node.entry is None:
+                    self._size += 1
+                node.entry = entry
+                return
+            bit = (value >> (31 - node.length)) & 1
+            child = node.children[bit]
+            if child is None:
+                node.children[bit] = _Node(value, length, entry)
+                self._size += 1
+                return
+            common = min(child.length, length, 32 - (child.value ^ value).bit_length())
+            if common == child.length:
+                node = child
+                continue
+            if common == length:
+                # The new prefix covers the child
+                inserted = _Node(value, length, entry)
+                inserted.children[(child.value >> (31 - length)) & 1] = child
+            else:
+                inserted = _Node(value & MASKS[common], common)
+                inserted.children[(child.value >> (31 - common)) & 1] = child
+                inserted.children[(value >> (31 - common)) & 1] = _Node(value, length, entry)
+            node.children[bit] = inserted
+            self._size += 1
+            return
+
+    def delete(self, value: int, length: int) -> bool:
+        value &= MASKS[length]
+        path: List[Tuple[_Node, int]] = []
+        node = self._root
+        while node.length < length:
+            bit = (value >> (31 - node.length)) & 1
+            child = node.children[bit]
+            if child is None or child.length > length or (value & MASKS[child.length]) != child.value:
+                return False
+            path.append((node, bit))
+            node = child
+        if node.length != length or node.entry is None:
+            return False
+        node.entry = None
+        self._size -= 1
+        # Splice out nodes left without an entry and with fewer than two children
+        while path and node.entry is None:
+            remaining = [child for child in node.children if child is not None]
+            if len(remaining) == 2:
+                break
+            parent, bit = path.pop()
+            parent.children[bit] = remaining[0] if remaining else None
+            node = parent
+        return True
+
+    def lookup(self, address: int):
+        """Entry of the longest prefix containing address, None when nothing matches"""
+        node = self._root
+        best = node.entry
+        length = 0
+        masks = MASKS
+        while length < 32:
+            node = node.children[(address >> (31 - length)) & 1]
+            if node is None:
+                break
+            length = node.length
+            if (address & masks[length]) != node.value:
+                break
+            if node.entry is not None:
+                best = node.entry
+        return best
+
+
+class RouteIndex:
+    """Longest-prefix-match tries of every router's RIP routes, patched from each poll"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tries: Dict[str, PrefixTrie] = {}
+        self._tables: Dict[str, Dict[str, route_diff.Paths]] = {}
+        self._prefixes: Dict[str, Dict[str, Tuple[int, int]]] = {}
+        self._addresses: Dict[str, frozenset] = {}
+        self._owners: Dict[str, str] = {}
+
+    def on_snapshot(self, router_ip: str, snapshot: Dict):
+        """SnapshotCache listener, only networks that changed touch the trie"""
+        table = prefixes = None
+        if "routes" in snapshot:
+            table = route_diff.index_routes(snapshot["routes"])
+            prefixes = route_prefixes(snapshot["routes"])
+        addresses = None
+        if "interfaces" in snapshot:
+            addresses = frozenset(
+                interface["ip_address"] for interface in snapshot["interfaces"]
+                if interface.get("ip_address") not in (None, "", "unassigned")
+            )
+        with self._lock:
+            if table is not None:
+                self._apply(router_ip, table, prefixes)
+            if addresses is not None and self._addresses.get(router_ip) != addresses:
+                for address in self._addresses.get(router_ip, ()):
+                    if self._owners.get(address) == router_ip:
+                        del self._owners[address]
+                for address in addresses:
+                    self._owners[address] = router_ip
+                self._addresses[router_ip] = addresses
+            self._owners.setdefault(router_ip, router_ip)
+
+    def _apply(self, router_ip: str, table: Dict[str, route_diff.Paths], prefixes: Dict[str, Tuple[int, int]]):
+        trie = self._tries.setdefault(router_ip, PrefixTrie())
+        previous = self._tables.get(router_ip, {})
+        previous_prefixes = self._prefixes.get(router_ip, {})
+        for network in previous.keys() - table.keys():
+            if network in previous_prefixes:
+                trie.delete(*previous_prefixes[network])
+        for network, paths in table.items():
+            if previous.get(network) != paths and network in prefixes:
+                trie.insert(*prefixes[network], (network, paths))
+        self._tables[router_ip] = table
+        self._prefixes[router_ip] = prefixes
+
+    def remove(self, router_ip: str):
+        with self._lock:
+            self._tries.pop(router_ip, None)
+            self._tables.pop(router_ip, None)
+            self._prefixes.pop(router_ip, None)
+            for address in self._addresses.pop(router_ip, ()):
+                if self._owners.get(address) == router_ip:
+                    del self._owners[address]
+
+    def size(self) -> int:
+        return sum(len(trie) for trie in self._tries.values())
+
+    def lookup(self, router_ip: str, dst: str) -> Optional[Dict]:
+        """Route the router uses for dst, None when it has no RIP route covering it"""
+        address = records.ip_to_int(dst)
+        with self._lock:
+            trie = self._tries.get(router_ip)
+            entry = trie.lookup(address) if trie is not None else None
+        if entry is None:
+            return None
+        network, paths = entry
+        return {"network": network, "routes": route_diff.expand(network, paths)}
+
+    def lookup_all(self, dst: str) -> Dict[str, Optional[Dict]]:
+        return {router_ip: self.lookup(router_ip, dst) for router_ip in list(self._tries)}
+
+    def trace(self, router_ip: str, dst: str, max_hops: int = MAX_TRACE_HOPS) -> Dict:
+        """Follow longest-prefix matches router by router until dst is reached or the walk ends"""
+        records.ip_to_int(dst)
+        hops = []
+        visited = set()
+        current = router_ip
+        status = "max_hops"
+        for _ in range(max_hops):
+            if self._owners.get(dst) == current:
+                status = "delivered"
+                break
+            if current in visited:
+                status = "loop"
+                break
+            visited.add(current)
+            match = self.lookup(current, dst)
+            if match is None:
+                # show ip route rip leaves out connected networks, dst may still be one hop away
+                status = "no_route" if current in self._tries else "not_polled"
+                hops.append({"router": current})
+                break
+            # Equal-cost paths are sorted, the trace follows the first
+            route = match["routes"][0]
+            hops.append({"router": current, "network": match["network"], "next_hop": route["next_hop"],
+                         "metric": route["metric"], "interface": route["interface"],
+                         "paths": len(match["routes"])})
+            peer = self._owners.get(route["next_hop"])
+            if peer is None:
+                status = "left_fleet"
+                break
+            current = peer
+        else:
+            hops.append({"router": current})
+        if status in ("delivered", "loop"):
+            hops.append({"router": current})
+        return {"dst": dst, "from": router_ip, "status": status, "hops": hops}
@@ -1,19 +1,188 @@
 from netmiko import ConnectHandler
-from typing import Dict, List, Optional
+from netmiko.utilities import get_structured_data
+from netmiko.exceptions import NetmikoTimeoutException, ReadTimeout
+from typing import Dict, List, Optional, Tuple
+from contextlib import contextmanager
 import os
 import json
+import time
+import atexit
+import threading
 from datetime import datetime
+from session_pool import POOL, SessionPool
+from scheduler import SCHEDULER, RouterScheduler, RouterBusy, READ, WRITE
+from read_cache import ReadThroughCache
+import session_logging
+import metrics
+import parsers
+import records
+
+ROUTES_COMMAND = "show ip route rip"
+# IOS has no 'show ip rip neighbors', RIP sources are listed by 'show ip protocols'
+NEIGHBORS_COMMAND = "show ip protocols"
+INTERFACES_COMMAND = "show ip interface brief"
+MAX_BATCH_COMMANDS = 20
+# Lets the fake_router simulator stand in for devices on an unprivileged port
+TELNET_PORT = int(os.environ.get("RIP_TELNET_PORT", "23"))
+# Seconds to hold write memory so back-to-back changes share one save, 0 saves immediately
+SAVE_DEBOUNCE = float(os.environ.get("RIP_SAVE_DEBOUNCE", "0"))
+
+# Shared by every caller in the process, writes below invalidate it
+READ_CACHE = ReadThroughCache(ttls={ROUTES_COMMAND: 10.0, NEIGHBORS_COMMAND: 10.0})
+
+def process_routes(routes_output, last_updated: Optional[str] = None) -> List[Dict]:
+    """Build route records from parsed 'show ip route rip' output, sharing one timestamp"""
+    if not isinstance(routes_output, list):
+        return []
+    return records.routes(routes_output, last_updated or datetime.now().isoformat())
+
+def process_neighbors(neighbors_output, last_update: Optional[str] = None) -> List[Dict]:
+    """Build neighbor records from parsed 'show ip rip neighbors' output, sharing one timestamp"""
+    if not isinstance(neighbors_output, list):
+        return []
+    return records.neighbors(neighbors_output, last_update or datetime.now().isoformat())
+
+def process_interfaces(interfaces_output) -> List[Dict]:
+    """Build interface records from parsed 'show ip interface brief' output"""
+    if not isinstance(interfaces_output, list):
+        return []
+    return records.interfaces(interfaces_output)
+
+def is_timeout(error: BaseException) -> bool:
+    """True for a router that did not answer in time, as opposed to one that refused or failed"""
+    return isinstance(error, (TimeoutError, NetmikoTimeoutException, ReadTimeout))
+
+def split_endpoint(endpoint: str) -> Tuple[str, int]:
+    """Router address as 'host' or a console 'host:port', IPv6 as '[addr]:port'"""
+    if endpoint.startswith("["):
+        host, _, rest = endpoint[1:].partition("]")
+        return host, int(rest[1:]) if rest.startswith(":") else TELNET_PORT
+    if endpoint.count(":") == 1:
+        host, port = endpoint.split(":")
+        return host, int(port)
+    return endpoint, TELNET_PORT
+
+def send_timed(net_connect, command: str) -> str:
+    """Send a command and record how long the router took to answer"""
+    with metrics.COMMAND_SECONDS.time(str(net_connect.host), metrics.command_label(command)):
+        return net_connect.send_command(command)
+
+def parse_timed(command: str, parser, output: str):
+    with metrics.PARSE_SECONDS.time(metrics.command_label(command), "compiled"):
+        return parser(output)
+
+def send_parsed(net_connect, command: str):
+    """Send a show command and parse it with the compiled parser, TextFSM only as a fallback"""
+    output = send_timed(net_connect, command)
+    parser = parsers.get_parser(command)
+    if parser is None:
+        with metrics.PARSE_SECONDS.time(metrics.command_label(command), "textfsm"):
+            return get_structured_data(output, platform="cisco_ios", command=command)
+    return parse_timed(command, parser, output)
+
+def rip_version_commands(version: str) -> List[str]:
+    return [
+        "router rip",
+        f"version {version}",
+        "no auto-summary"  # Disable auto-summary for better route control
+    ]
+
+def rip_interface_commands(interface: str, action: str) -> List[str]:
+    if action == "enable":
+        return [f"interface {interface}", "ip rip enable"]
+    return [f"interface {interface}", "no ip rip enable"]
+
+class ConfigTransaction:
+    """Collects RIP and interface changes and applies them with one config set and one save"""
+
+    def __init__(self, conn: "RouterConnection"):
+        self.conn = conn
+        self.commands: List[str] = []
+        self.changes: List[str] = []
+        self.rip_version: Optional[str] = None
+
+    def set_rip_version(self, version: str) -> "ConfigTransaction":
+        if version not in ["1", "2"]:
+            raise ValueError("Invalid RIP version. Must be 1 or 2.")
+        self.commands.extend(rip_version_commands(version))
+        self.changes.append(f"RIP version {version}")
+        self.rip_version = version
+        return self
+
+    def configure_rip_interface(self, interface: str, action: str = "enable") -> "ConfigTransaction":
+        if action not in ["enable", "disable"]:
+            raise ValueError("Invalid action. Must be enable or disable.")
+        self.commands.extend(rip_interface_commands(interface, action))
+        self.changes.append(f"RIP {action}d on interface {interface}")
+        return self
+
+    def commit(self, save: bool = True) -> Dict:
+        """Apply every collected change in one config set"""
+        if not self.commands:
+            return {"status": "error", "message": "Transaction has no changes"}
+        try:
+            output = self.conn.apply_config(self.commands, save)
+        except RouterBusy:
+            # Nothing was sent, the caller may retry later
+            raise
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+        if self.rip_version is not None:
+            self.conn.router_state["rip_version"] = self.rip_version
+        self.conn.router_state["last_updated"] = datetime.now().isoformat()
+        return {"status": "success", "message": "; ".join(self.changes), "config": output}
+
+class DeferredSaver:
+    """Coalesces write memory for routers changed within a debounce window"""
+
+    def __init__(self, window: float):
+        self.window = window
+        self._lock = threading.Lock()
+        self._pending: Dict[str, threading.Timer] = {}
+
+    def schedule(self, conn: "RouterConnection"):
+        """Save the router's config once the window closes, sharing the save with later changes"""
+        ip = conn.router_ip
+        with self._lock:
+            if ip in self._pending:
+                return
+            timer = threading.Timer(self.window, self._save, args=(ip, conn))
+            timer.daemon = True
+            self._pending[ip] = timer
+            timer.start()
+
+    def _save(self, ip: str, conn: "RouterConnection"):
+        with self._lock:
+            self._pending.pop(ip, None)
+        result = conn.save_config()
+        if result["status"] != "success":
+            print(f"Error saving config on router {ip}: {result['message']}")
+
+    def flush(self):
+        """Run every pending save now"""
+        with self._lock:
+            pending = list(self._pending.items())
+        for ip, timer in pending:
+            timer.cancel()
+            self._save(ip, timer.args[1])
 
 class RouterConnection:
-    def __init__(self, router_ip: str, username: str = "", password: str = "cisco"):
+    def __init__(self, router_ip: str, username: str = "", password: str = "cisco",
+                 pool: Optional[SessionPool] = POOL, scheduler: Optional[RouterScheduler] = SCHEDULER):
+        # GNS3 consoles share one host and differ by port, router_ip is then host:port
+        self.router_ip = router_ip
+        host, port = split_endpoint(router_ip)
         self.device = {
             "device_type": "cisco_ios_telnet",  # Using Telnet for Packet Tracer
-            "host": router_ip,
+            "host": host,
+            "port": port,
             "username": username,
             "password": password,
-            "timeout": 20,
-            "session_log": f"router_{router_ip}.log"
+            "timeout": 20
         }
+        session_log = session_logging.for_router(router_ip, password)
+        if session_log is not None:
+            self.device["session_log"] = session_log
         self.router_state = {
             "last_updated": datetime.now().isoformat(),
             "rip_version": "2",
@@ -21,138 +190,223 @@ class RouterConnection:
             "routes": [],
             "neighbors": []
         }
-
+        self.pool = pool
+        self.scheduler = scheduler
 
     def connect(self) -> Optional[ConnectHandler]:
         """Establish connection to router"""
+        started = time.perf_counter()
         try:
-            return ConnectHandler(**self.device)
+            connection = ConnectHandler(**self.device)
         except Exception as e:
-            print(f"Error connecting to router {self.device['host']}: {str(e)}")
+            metrics.CONNECT_FAILURES.inc(self.router_ip)
+            print(f"Error connecting to router {self.router_ip}: {str(e)}")
             return None
+        metrics.CONNECT_SECONDS.observe(time.perf_counter() - started, self.router_ip)
+        return connection
+
+    @contextmanager
+    def session(self, kind: str = READ):
+        """Wait for a slot on the router, then lease a session for the duration of the block"""
+        if self.scheduler is None:
+            with self._session() as net_connect:
+                yield net_connect
+            return
+        with self.scheduler.slot(self.router_ip, kind):
+            with self._session() as net_connect:
+                yield net_connect
+
+    @contextmanager
+    def _session(self):
+        """Lease a pooled session, or open a one-off connection when pooling is off"""
+        request_id = session_logging.current_request_id()
+        # A pooled connection keeps the session log it was opened with
+        session_log = self.device.get("session_log")
+        try:
+            if self.pool is None:
+                conn = self.connect()
+                if conn is None:
+                    raise Exception("Could not connect to router")
+                with conn as net_connect:
+                    session_log = net_connect.session_log or session_log
+                    if session_log is not None:
+                        session_log.begin(request_id)
+                    yield net_connect
+                return
+            with self.pool.session(self.device) as net_connect:
+                session_log = net_connect.session_log or session_log
+                if session_log is not None:
+                    session_log.begin(request_id)
+                yield net_connect
+        except Exception as e:
+            if isinstance(session_log, session_logging.RouterSessionLog):
+                session_log.fail(e)
+            raise
 
     def get_rip_routes(self) -> List[Dict]:
         """Get RIP routes from the router"""
         try:
-            conn = self.connect()
-            if conn is None:
-                raise Exception("Could not connect to router")
-            with conn as net_connect:
+            with self.session() as net_connect:
                 # Get RIP routes
-                routes_output = net_connect.send_command("show ip route rip", use_textfsm=True)
+                routes_output = send_parsed(net_connect, ROUTES_COMMAND)
                 
                 # Get interface information
-                interfaces_output = net_connect.send_command("show ip interface brief", use_textfsm=True)
+                interfaces_output = send_parsed(net_connect, INTERFACES_COMMAND)
                 
                 # Process and combine the data
-                routes = []
-                if isinstance(routes_output, list):
-                    for route in routes_output:
-                        route_info = {
-                            "network": route.get("network", ""),
-                            "distance": route.get("distance", ""),
-                            "metric": route.get("metric", ""),
-                            "next_hop": route.get("next_hop", ""),
-                            "interface": route.get("interface", ""),
-                            "last_updated": datetime.now().isoformat()
-                        }
-                        routes.append(route_info)
+                last_updated = datetime.now().isoformat()
+                routes = process_routes(routes_output, last_updated)
                 
                 self.router_state["routes"] = routes
-                self.router_state["interfaces"] = interfaces_output if isinstance(interfaces_output, list) else []
-                self.router_state["last_updated"] = datetime.now().isoformat()
+                self.router_state["interfaces"] = process_interfaces(interfaces_output)
+                self.router_state["last_updated"] = last_updated
                 
                 return routes
         except Exception as e:
             print(f"Error getting RIP routes: {str(e)}")
-            return []
+            # An empty table would read as every route withdrawn, callers decide what a failure means
+            raise
 
     def get_rip_neighbors(self) -> List[Dict]:
         """Get RIP neighbors from the router"""
         try:
-            with self.connect() as net_connect:
+            with self.session() as net_connect:
                 # Get RIP neighbors
-                neighbors_output = net_connect.send_command("show ip rip neighbors", use_textfsm=True)
+                neighbors_output = send_parsed(net_connect, NEIGHBORS_COMMAND)
                 
-                # Get interface status
-                interfaces_output = net_connect.send_command("show ip interface brief", use_textfsm=True)
-                
-                neighbors = []
-                if isinstance(neighbors_output, list):
-                    for neighbor in neighbors_output:
-                        neighbor_info = {
-                            "neighbor": neighbor.get("neighbor", ""),
-                            "interface": neighbor.get("interface", ""),
-                            "uptime": neighbor.get("uptime", ""),
-                            "last_update": datetime.now().isoformat()
-                        }
-                        neighbors.append(neighbor_info)
+                last_updated = datetime.now().isoformat()
+                neighbors = process_neighbors(neighbors_output, last_updated)
                 
                 self.router_state["neighbors"] = neighbors
-                self.router_state["last_updated"] = datetime.now().isoformat()
+                self.router_state["last_updated"] = last_updated
                 
                 return neighbors
         except Exception as e:
             print(f"Error getting RIP neighbors: {str(e)}")
-            return []
+            # An empty list would read as every neighbor down, callers decide what a failure means
+            raise
+
+    def run_batch(self, commands: List[str], parse: bool = True) -> List[Dict]:
+        """Run an ordered list of show commands over a single session"""
+        for command in commands:
+            if not command.strip().lower().startswith("show "):
+                raise ValueError(f"Only show commands can be batched: {command!r}")
 
-    def set_rip_version(self, version: str) -> Dict:
+        results = []
+        try:
+            with self.session() as net_connect:
+                for command in commands:
+                    started = time.monotonic()
+                    if parse:
+                        output = send_parsed(net_connect, command)
+                    else:
+                        output = send_timed(net_connect, command)
+                    results.append({
+                        "command": command,
+                        "status": "success",
+                        "output": output,
+                        "elapsed": round(time.monotonic() - started, 3)
+                    })
+        except RouterBusy:
+            raise
+        except Exception as e:
+            # The failed command ends the batch, the rest never ran
+            failed = len(results)
+            if failed == len(commands):
+                return results
+            results.append({"command": commands[failed], "status": "error", "message": str(e)})
+            for command in commands[failed + 1:]:
+                results.append({"command": command, "status": "skipped"})
+        return results
+
+    def collect_state(self) -> Dict:
+        """Collect routes, neighbors, RIP version and interfaces with one login"""
+        results = self.run_batch([ROUTES_COMMAND, NEIGHBORS_COMMAND, INTERFACES_COMMAND], parse=False)
+        for result in results:
+            if result["status"] == "error":
+                raise Exception(f"{result['command']}: {result['message']}")
+        outputs = {result["command"]: result["output"] for result in results}
+
+        rip_version = parse_timed(NEIGHBORS_COMMAND, parsers.parse_rip_version, outputs[NEIGHBORS_COMMAND])
+        if rip_version is not None:
+            self.router_state["rip_version"] = rip_version
+        last_updated = datetime.now().isoformat()
+        self.router_state["routes"] = process_routes(
+            parse_timed(ROUTES_COMMAND, parsers.parse_rip_routes, outputs[ROUTES_COMMAND]), last_updated)
+        self.router_state["neighbors"] = process_neighbors(
+            parse_timed(NEIGHBORS_COMMAND, parsers.parse_rip_neighbors, outputs[NEIGHBORS_COMMAND]), last_updated)
+        self.router_state["interfaces"] = process_interfaces(parse_timed(
+            INTERFACES_COMMAND, parsers.parse_interfaces_brief, outputs[INTERFACES_COMMAND]))
+        self.router_state["last_updated"] = last_updated
+        return self.router_state
+
+    def probe(self) -> Dict:
+        """Log in and read the RIP version, raising when the router cannot be reached"""
+        started = time.monotonic()
+        with self.session() as net_connect:
+            login_seconds = time.monotonic() - started
+            output = send_timed(net_connect, NEIGHBORS_COMMAND)
+        return {
+            "login_seconds": round(login_seconds, 3),
+            "rip_version": parse_timed(NEIGHBORS_COMMAND, parsers.parse_rip_version, output)
+        }
+
+    def apply_config(self, commands: List[str], save: bool = True) -> str:
+        """Send config commands in one config set and optionally write memory"""
+        with self.session(WRITE) as net_connect:
+            # send_config_set enters and leaves config mode itself
+            with metrics.COMMAND_SECONDS.time(str(net_connect.host), "configure"):
+                output = net_connect.send_config_set(commands)
+            if save:
+                with metrics.COMMAND_SECONDS.time(str(net_connect.host), "write memory"):
+                    output += net_connect.save_config()
+            return output
+
+    def save_config(self) -> Dict:
+        """Write the running config to startup config"""
+        try:
+            with self.session(WRITE) as net_connect:
+                return {"status": "success", "message": "Configuration saved", "config": net_connect.save_config()}
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+
+    def transaction(self) -> "ConfigTransaction":
+        """Start collecting changes to apply together"""
+        return ConfigTransaction(self)
+
+    def set_rip_version(self, version: str, save: bool = True) -> Dict:
         """Configure RIP version on the router"""
         if version not in ["1", "2"]:
             return {"status": "error", "message": "Invalid RIP version. Must be 1 or 2."}
         
         try:
-            with self.connect() as net_connect:
-                # Enter configuration mode
-                net_connect.config_mode()
-                
-                # Configure RIP version
-                commands = [
-                    "router rip",
-                    f"version {version}",
-                    "no auto-summary"  # Disable auto-summary for better route control
-                ]
-                output = net_connect.send_config_set(commands)
-                
-                # Save configuration
-                net_connect.save_config()
-                
-                self.router_state["rip_version"] = version
-                self.router_state["last_updated"] = datetime.now().isoformat()
-                
-                return {
-                    "status": "success",
-                    "message": f"RIP version {version} configured successfully",
-                    "config": output
-                }
+            output = self.apply_config(rip_version_commands(version), save)
+            
+            self.router_state["rip_version"] = version
+            self.router_state["last_updated"] = datetime.now().isoformat()
+            
+            return {
+                "status": "success",
+                "message": f"RIP version {version} configured successfully",
+                "config": output
+            }
+        except RouterBusy:
+            raise
         except Exception as e:
             return {"status": "error", "message": str(e)}
 
-    def configure_rip_interface(self, interface: str, action: str = "enable") -> Dict:
+    def configure_rip_interface(self, interface: str, action: str = "enable", save: bool = True) -> Dict:
         """Enable or disable RIP on a specific interface"""
         try:
-            with self.connect() as net_connect:
-                net_connect.config_mode()
-                
-                if action == "enable":
-                    commands = [
-                        f"interface {interface}",
-                        "ip rip enable"
-                    ]
-                else:
-                    commands = [
-                        f"interface {interface}",
-                        "no ip rip enable"
-                    ]
-                
-                output = net_connect.send_config_set(commands)
-                net_connect.save_config()
-                
-                return {
-                    "status": "success",
-                    "message": f"RIP {action}d on interface {interface}",
-                    "config": output
-                }
+            output = self.apply_config(rip_interface_commands(interface, action), save)
+            
+            return {
+                "status": "success",
+                "message": f"RIP {action}d on interface {interface}",
+                "config": output
+            }
+        except RouterBusy:
+            raise
         except Exception as e:
             return {"status": "error", "message": str(e)}
 
@@ -160,28 +414,68 @@ class RouterConnection:
         """Get current router state"""
         return self.router_state
 
+SAVER = DeferredSaver(SAVE_DEBOUNCE)
+atexit.register(SAVER.flush)
+
 # Module level functions that app.py calls
-def get_rip_routes(router_ip: str, username: str, password: str) -> List[Dict]:
-    """Get RIP routes from a router"""
+def get_rip_routes(router_ip: str, username: str, password: str, fresh: bool = False) -> List[Dict]:
+    """Get RIP routes from a router, shared with concurrent callers and cached briefly"""
+    conn = RouterConnection(router_ip, username, password)
+    return READ_CACHE.get_or_load(router_ip, ROUTES_COMMAND, conn.get_rip_routes, refresh=fresh)
+
+def get_rip_neighbors(router_ip: str, username: str, password: str, fresh: bool = False) -> List[Dict]:
+    """Get RIP neighbors from a router, shared with concurrent callers and cached briefly"""
     conn = RouterConnection(router_ip, username, password)
-    return conn.get_rip_routes()
+    return READ_CACHE.get_or_load(router_ip, NEIGHBORS_COMMAND, conn.get_rip_neighbors, refresh=fresh)
 
-def get_rip_neighbors(router_ip: str, username: str, password: str) -> List[Dict]:
-    """Get RIP neighbors from a router"""
+def probe(router_ip: str, username: str, password: str) -> Dict:
+    """Check that a router answers and accepts the credentials, raising when it does not"""
     conn = RouterConnection(router_ip, username, password)
-    return conn.get_rip_neighbors()
+    return conn.probe()
+
+def _write(conn: RouterConnection, apply) -> Dict:
+    """Run a config change, then save now or hand the save to the debouncer"""
+    deferred = SAVE_DEBOUNCE > 0
+    try:
+        result = apply(not deferred)
+    finally:
+        READ_CACHE.invalidate(conn.router_ip)
+    if result["status"] == "success":
+        result["saved"] = "deferred" if deferred else "saved"
+        if deferred:
+            SAVER.schedule(conn)
+    return result
 
 def set_rip_version(router_ip: str, username: str, password: str, version: str) -> Dict:
     """Configure RIP version on a router"""
     conn = RouterConnection(router_ip, username, password)
-    return conn.set_rip_version(version)
+    return _write(conn, lambda save: conn.set_rip_version(version, save))
 
 def configure_rip_interface(router_ip: str, username: str, password: str, interface: str, action: str = "enable") -> Dict:
     """Configure RIP on a specific interface"""
     conn = RouterConnection(router_ip, username, password)
-    return conn.configure_rip_interface(interface, action)
+    return _write(conn, lambda save: conn.configure_rip_interface(interface, action, save))
+
+def apply_rip_changes(router_ip: str, username: str, password: str, version: Optional[str] = None,
+                      interfaces: List[Dict] = ()) -> Dict:
+    """Apply a RIP version and interface changes in one transaction with a single save"""
+    conn = RouterConnection(router_ip, username, password)
+    tx = conn.transaction()
+    try:
+        if version is not None:
+            tx.set_rip_version(version)
+        for change in interfaces:
+            tx.configure_rip_interface(change['interface'], change['action'])
+    except ValueError as e:
+        return {"status": "error", "message": str(e)}
+    return _write(conn, tx.commit)
+
+def run_batch(router_ip: str, username: str, password: str, commands: List[str]) -> List[Dict]:
+    """Run several show commands on a router over one session"""
+    conn = RouterConnection(router_ip, username, password)
+    return conn.run_batch(commands)
 
 def get_router_state(router_ip: str, username: str, password: str) -> Dict:
     """Get current router state"""
     conn = RouterConnection(router_ip, username, password)
-    return conn.get_router_state()
+    return conn.get_router_state()
\ No newline at end of file
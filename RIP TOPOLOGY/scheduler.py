@@ -0,0 +1,141 @@
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Deque, Dict, Optional
+import threading
+import time
+import os
+import metrics
+
+READ = "read"
+WRITE = "write"
+# Concurrent sessions per router, Packet Tracer and small IOS images only have a few VTY lines
+MAX_SESSIONS = max(1, int(os.environ.get("RIP_MAX_SESSIONS", "1")))
+# Requests allowed to wait per router before new ones are turned away
+MAX_QUEUED = int(os.environ.get("RIP_MAX_QUEUED", "32"))
+QUEUE_TIMEOUT = float(os.environ.get("RIP_QUEUE_TIMEOUT", "60"))
+# A write queued this long goes ahead of reads, so a steady stream of reads cannot starve it
+WRITE_AGING = 5.0
+# Seconds a client turned away by a busy router is told to wait, sent as Retry-After
+RETRY_AFTER = int(os.environ.get("RIP_RETRY_AFTER", "5"))
+
+# Who is asking, requests from the same client take turns with everyone else's
+CLIENT: ContextVar[Optional[str]] = ContextVar("client", default=None)
+
+
+class RouterBusy(Exception):
+    """The router's queue is full or a request waited too long for a session"""
+
+
+class _Waiter:
+    __slots__ = ("kind", "queued", "event", "granted")
+
+    def __init__(self, kind: str):
+        self.kind = kind
+        self.queued = time.monotonic()
+        self.event = threading.Event()
+        self.granted = False
+
+
+class _RouterQueue:
+    def __init__(self):
+        self.active = 0
+        self.waiting = 0
+        # kind -> client -> waiters, clients are served in turn
+        self.queues: Dict[str, "OrderedDict[str, Deque[_Waiter]]"] = {READ: OrderedDict(), WRITE: OrderedDict()}
+
+
+class RouterScheduler:
+    """Limits concurrent sessions per router and hands freed slots out fairly.
+
+    Every router has its own slots and queue, so a slow router never holds up the others.
+    Within a router reads go before writes and waiting clients take turns."""
+
+    def __init__(self, max_sessions: int = MAX_SESSIONS, max_queued: int = MAX_QUEUED,
+                 timeout: float = QUEUE_TIMEOUT, write_aging: float = WRITE_AGING):
+        self.max_sessions = max_sessions
+        self.max_queued = max_queued
+        self.timeout = timeout
+        self.write_aging = write_aging
+        self._lock = threading.Lock()
+        self._routers: Dict[str, _RouterQueue] = {}
+
+    @contextmanager
+    def slot(self, host: str, kind: str = READ, client: Optional[str] = None):
+        """Hold one of the router's session slots for the duration of the block"""
+        self.acquire(host, kind, client)
+        try:
+            yield
+        finally:
+            self.release(host)
+
+    def acquire(self, host: str, kind: str = READ, client: Optional[str] = None):
+        client = client or CLIENT.get() or "background"
+        with self._lock:
+            router = self._routers.setdefault(host, _RouterQueue())
+            # Nobody jumps the queue, a free slot only goes straight to the caller when no one waits
+            if router.active < self.max_sessions and router.waiting == 0:
+                router.active += 1
+                metrics.QUEUE_SECONDS.observe(0.0, kind)
+                return
+            if router.waiting >= self.max_queued:
+                metrics.QUEUE_REJECTED.inc(kind)
+                raise RouterBusy(f"Router {host} is busy, {router.waiting} requests already queued")
+            waiter = _Waiter(kind)
+            router.queues[kind].setdefault(client, deque()).append(waiter)
+            router.waiting += 1
+
+        waiter.event.wait(self.timeout)
+        with self._lock:
+            # granted is the source of truth, the slot may have been handed over just after the wait ran out
+            if not waiter.granted:
+                queue = router.queues[kind][client]
+                queue.remove(waiter)
+                if not queue:
+                    del router.queues[kind][client]
+                router.waiting -= 1
+                metrics.QUEUE_REJECTED.inc(kind)
+                raise RouterBusy(f"Timed out after {self.timeout:g}s waiting for a session to {host}")
+        metrics.QUEUE_SECONDS.observe(time.monotonic() - waiter.queued, kind)
+
+    def release(self, host: str):
+        with self._lock:
+            router = self._routers[host]
+            waiter = self._next(router)
+            if waiter is not None:
+                # The slot passes straight to the waiter, active stays the same
+                waiter.granted = True
+                waiter.event.set()
+                return
+            router.active -= 1
+            if router.active == 0:
+                del self._routers[host]
+
+    def _next(self, router: _RouterQueue) -> Optional[_Waiter]:
+        reads, writes = router.queues[READ], router.queues[WRITE]
+        if writes and (not reads or time.monotonic() - min(queue[0].queued for queue in writes.values())
+                       >= self.write_aging):
+            queues = writes
+        elif reads:
+            queues = reads
+        else:
+            return None
+        client, queue = next(iter(queues.items()))
+        waiter = queue.popleft()
+        if queue:
+            # Back of the line until every other waiting client had a turn
+            queues.move_to_end(client)
+        else:
+            del queues[client]
+        router.waiting -= 1
+        return waiter
+
+    def stats(self) -> Dict:
+        """Get active and queued session counts per router"""
+        with self._lock:
+            return {host: {"active": router.active, "queued": router.waiting}
+                    for host, router in self._routers.items()}
+
+
+# Shared by every RouterConnection in the process
+SCHEDULER = RouterScheduler()
@@ -0,0 +1,155 @@
+from logging.handlers import QueueListener, RotatingFileHandler
+from contextvars import ContextVar
+from typing import Callable, Dict, Optional
+from netmiko.session_log import SessionLog
+import functools
+import contextvars
+import logging
+import atexit
+import queue
+import uuid
+import os
+
+# off: no transcripts, errors: keep a session's transcript only when it fails, full: everything
+LEVELS = ("off", "errors", "full")
+LEVEL = os.environ.get("RIP_SESSION_LOG", "errors").lower()
+LOG_DIR = os.environ.get("RIP_SESSION_LOG_DIR", "logs")
+MAX_BYTES = int(os.environ.get("RIP_SESSION_LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+BACKUPS = int(os.environ.get("RIP_SESSION_LOG_BACKUPS", "5"))
+# Transcript kept in memory per session at the errors level
+ERROR_BUFFER = 64 * 1024
+QUEUE_SIZE = 10000
+
+REQUEST_ID: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex[:12]
+
+
+def current_request_id() -> str:
+    return REQUEST_ID.get() or new_request_id()
+
+
+def bind(fn: Callable) -> Callable:
+    """Carry the caller's request ID and client into a worker thread"""
+    context = contextvars.copy_context()
+
+    @functools.wraps(fn)
+    def bound(*args, **kwargs):
+        # A context can only be entered by one thread at a time, bound tasks may run in parallel
+        return context.copy().run(fn, *args, **kwargs)
+    return bound
+
+
+class RouterLogFiles(logging.Handler):
+    """Sends each record to its router's size-rotated file, opened on first use"""
+
+    def __init__(self, directory: str, max_bytes: int = MAX_BYTES, backups: int = BACKUPS):
+        super().__init__()
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._files: Dict[str, RotatingFileHandler] = {}
+        self._formatter = logging.Formatter("%(asctime)s [%(request_id)s] %(levelname)s\n%(message)s")
+
+    def emit(self, record: logging.LogRecord):
+        handler = self._files.get(record.router)
+        if handler is None:
+            os.makedirs(self.directory, exist_ok=True)
+            handler = RotatingFileHandler(os.path.join(self.directory, f"router_{record.router}.log"),
+                                          maxBytes=self.max_bytes, backupCount=self.backups, delay=True)
+            handler.setFormatter(self._formatter)
+            self._files[record.router] = handler
+        handler.emit(record)
+
+    def close(self):
+        for handler in self._files.values():
+            handler.close()
+        super().close()
+
+
+class SessionLogWriter:
+    """Queues transcript chunks and writes them from one background thread, a full
+    queue drops chunks rather than stall a router session"""
+
+    def __init__(self, directory: str = LOG_DIR, max_bytes: int = MAX_BYTES, backups: int = BACKUPS):
+        self._queue: queue.Queue = queue.Queue(QUEUE_SIZE)
+        self._listener = QueueListener(self._queue, RouterLogFiles(directory, max_bytes, backups))
+        self._started = False
+        self.dropped = 0
+
+    def write(self, router_ip: str, request_id: str, text: str, level: int = logging.INFO):
+        if not self._started:
+            self._listener.start()
+            self._started = True
+        record = logging.LogRecord("session", level, "", 0, text, None, None)
+        record.router = router_ip
+        record.request_id = request_id
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        if self._started:
+            self._listener.stop()
+            self._started = False
+        for handler in self._listener.handlers:
+            handler.close()
+
+
+class RouterSessionLog(SessionLog):
+    """netmiko session log that buffers in memory and hands finished chunks to a writer.
+
+    A pooled connection keeps its log across requests, begin() tags what follows with the
+    ID of the request now using it."""
+
+    def __init__(self, router_ip: str, level: str, writer: SessionLogWriter, secrets: Dict[str, str] = None):
+        super().__init__(no_log=secrets or {})
+        self.router_ip = router_ip
+        self.level = level
+        self.writer = writer
+        self.request_id = current_request_id()
+
+    def open(self):
+        pass
+
+    def begin(self, request_id: str):
+        self.flush()
+        self.request_id = request_id
+        if self.level == "errors":
+            self._read_buffer()
+
+    def flush(self):
+        # netmiko flushes after every command, at the errors level the transcript is held back
+        if self.level != "full":
+            if self.slog_buffer.tell() > ERROR_BUFFER:
+                self.slog_buffer = type(self.slog_buffer)(self._read_buffer()[-ERROR_BUFFER:])
+                self.slog_buffer.seek(0, os.SEEK_END)
+            return
+        data = self._read_buffer()
+        if data:
+            self.writer.write(self.router_ip, self.request_id, self.no_log_filter(data))
+
+    def fail(self, error: Exception):
+        """Write what this session has buffered together with the error that ended it"""
+        data = self._read_buffer()
+        self.writer.write(self.router_ip, self.request_id,
+                          self.no_log_filter(data) + f"\n*** {type(error).__name__}: {error}", logging.ERROR)
+
+    def close(self):
+        self.flush()
+
+
+WRITER = SessionLogWriter()
+atexit.register(WRITER.close)
+
+
+def for_router(router_ip: str, password: str = "", level: str = LEVEL) -> Optional[RouterSessionLog]:
+    """Session log for a new connection, None when logging is off"""
+    if level not in LEVELS:
+        raise ValueError(f"RIP_SESSION_LOG must be one of {', '.join(LEVELS)}")
+    if level == "off":
+        return None
+    return RouterSessionLog(router_ip, level, WRITER, {"password": password} if password else None)
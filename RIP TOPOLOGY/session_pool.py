@@ -0,0 +1,218 @@
+from netmiko import ConnectHandler
+from typing import Dict, List, Optional, Tuple
+from contextlib import contextmanager
+import threading
+import atexit
+import time
+import metrics
+import scheduler
+
+
+class PooledSession:
+    def __init__(self, connection, ticket=None):
+        self.connection = connection
+        # Held from SessionGate.acquire for as long as the login stays open
+        self.ticket = ticket
+        self.created = time.monotonic()
+        self.last_used = self.created
+
+
+class SessionPool:
+    """Process-wide pool of authenticated netmiko sessions keyed by router and credentials"""
+
+    def __init__(self, max_per_router: int = 1, idle_timeout: float = 300.0,
+                 keepalive_interval: float = 30.0, acquire_timeout: float = 60.0, gate=None):
+        self.max_per_router = max_per_router
+        self.idle_timeout = idle_timeout
+        self.keepalive_interval = keepalive_interval
+        self.acquire_timeout = acquire_timeout
+        # shared_state.SessionGate limiting the logins of all worker processes together
+        self.gate = gate
+        self._reaper: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+        self._idle: Dict[Tuple, List[PooledSession]] = {}
+        self._open: Dict[Tuple, int] = {}
+
+    @staticmethod
+    def key_for(device: Dict) -> Tuple:
+        """Build the pool key for a netmiko device dict"""
+        return (
+            device.get("device_type"),
+            device.get("host"),
+            device.get("port"),
+            device.get("username"),
+            device.get("password"),
+        )
+
+    @contextmanager
+    def session(self, device: Dict):
+        """Lease a session for the duration of one request"""
+        key = self.key_for(device)
+        pooled = self._checkout(key, device)
+        healthy = False
+        try:
+            yield pooled.connection
+            healthy = True
+        finally:
+            if healthy:
+                self._checkin(key, pooled)
+            else:
+                # The device may be mid-command or in config mode, never reuse it
+                self._discard(key, pooled)
+
+    def _checkout(self, key: Tuple, device: Dict) -> PooledSession:
+        deadline = time.monotonic() + self.acquire_timeout
+        with self._available:
+            self._evict_idle_locked()
+            while True:
+                idle = self._idle.get(key)
+                if idle:
+                    pooled = idle.pop()
+                    break
+                if self._open.get(key, 0) < self.max_per_router:
+                    # Reserve the slot before the slow login so other threads wait on it
+                    self._open[key] = self._open.get(key, 0) + 1
+                    pooled = None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"Timed out waiting for a session to {device.get('host')}")
+                self._available.wait(remaining)
+
+        ticket = None
+        if pooled is not None:
+            if time.monotonic() - pooled.last_used < self.keepalive_interval or self._is_alive(pooled):
+                metrics.POOL_CHECKOUTS.inc("hit")
+                return pooled
+            # Keep the reserved slot and the gate ticket and log in again below
+            ticket, pooled.ticket = pooled.ticket, None
+            self._close(pooled)
+        metrics.POOL_CHECKOUTS.inc("miss")
+        host = str(device.get("host"))
+        try:
+            if self.gate is not None and ticket is None:
+                ticket = self.gate.acquire(f"{host}:{device.get('port')}", max(0.0, deadline - time.monotonic()))
+        except Exception:
+            self._release_slot(key)
+            raise
+        started = time.perf_counter()
+        try:
+            connection = ConnectHandler(**device)
+        except Exception:
+            metrics.CONNECT_FAILURES.inc(host)
+            self._release_ticket(ticket)
+            self._release_slot(key)
+            raise
+        metrics.CONNECT_SECONDS.observe(time.perf_counter() - started, host)
+        return PooledSession(connection, ticket)
+
+    def _checkin(self, key: Tuple, pooled: PooledSession):
+        pooled.last_used = time.monotonic()
+        with self._available:
+            self._idle.setdefault(key, []).append(pooled)
+            self._available.notify()
+
+    def _discard(self, key: Tuple, pooled: PooledSession):
+        self._close(pooled)
+        self._release_slot(key)
+
+    def _release_slot(self, key: Tuple):
+        with self._available:
+            remaining = self._open.get(key, 0) - 1
+            if remaining > 0:
+                self._open[key] = remaining
+            else:
+                self._open.pop(key, None)
+            self._available.notify()
+
+    def _evict_idle_locked(self):
+        now = time.monotonic()
+        for key in list(self._idle):
+            keep = []
+            for pooled in self._idle[key]:
+                if now - pooled.last_used > self.idle_timeout:
+                    self._close(pooled)
+                    self._open[key] -= 1
+                else:
+                    keep.append(pooled)
+            if keep:
+                self._idle[key] = keep
+            else:
+                del self._idle[key]
+            if self._open.get(key) == 0:
+                del self._open[key]
+
+    def evict_idle(self):
+        """Close sessions that have been idle longer than idle_timeout"""
+        with self._available:
+            self._evict_idle_locked()
+
+    def start_reaper(self, interval: float = 1.0):
+        """Evict idle sessions every interval instead of on the next checkout, so they free their gate slots"""
+        if self._reaper is not None and self._reaper.is_alive():
+            return
+
+        def run():
+            while True:
+                time.sleep(interval)
+                self.evict_idle()
+
+        self._reaper = threading.Thread(target=run, name="session-reaper", daemon=True)
+        self._reaper.start()
+
+    def invalidate(self, device: Dict):
+        """Close every idle session for a device, e.g. after its credentials change"""
+        key = self.key_for(device)
+        with self._available:
+            for pooled in self._idle.pop(key, []):
+                self._close(pooled)
+                self._open[key] -= 1
+            if self._open.get(key) == 0:
+                del self._open[key]
+            self._available.notify_all()
+
+    def close_all(self):
+        """Close every idle session in the pool"""
+        with self._available:
+            for key, sessions in self._idle.items():
+                for pooled in sessions:
+                    self._close(pooled)
+                self._open[key] -= len(sessions)
+                if self._open[key] <= 0:
+                    del self._open[key]
+            self._idle.clear()
+            self._available.notify_all()
+
+    def stats(self) -> Dict:
+        """Get open and idle session counts"""
+        with self._lock:
+            return {
+                "open": sum(self._open.values()),
+                "idle": sum(len(s) for s in self._idle.values()),
+                "routers": len(self._open)
+            }
+
+    @staticmethod
+    def _is_alive(pooled: PooledSession) -> bool:
+        try:
+            return pooled.connection.is_alive()
+        except Exception:
+            return False
+
+    def _release_ticket(self, ticket):
+        if self.gate is not None:
+            self.gate.release(ticket)
+
+    def _close(self, pooled: PooledSession):
+        try:
+            pooled.connection.disconnect()
+        except Exception:
+            pass
+        self._release_ticket(pooled.ticket)
+        pooled.ticket = None
+
+
+# Shared by every RouterConnection in the process
+POOL = SessionPool(max_per_router=scheduler.MAX_SESSIONS)
+atexit.register(POOL.close_all)
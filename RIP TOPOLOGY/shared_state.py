@@ -0,0 +1,289 @@
+from collections import deque
+from typing import Callable, Dict, Optional
+import threading
+import sqlite3
+import json
+import time
+import uuid
+import os
+import re
+import records
+import scheduler
+
+try:
+    import fcntl
+except ImportError:
+    # Windows, where gunicorn does not run either and there is only ever one process
+    fcntl = None
+
+SYNC_INTERVAL = 0.5
+MAINTENANCE_INTERVAL = 60.0
+# Superseded snapshot changes are kept this long for workers that fell behind
+CHANGE_RETENTION = 300.0
+JOB_RETENTION = 86400.0
+# Seconds between tries while other workers hold every session slot of a router
+GATE_RETRY = 0.05
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT, ip TEXT NOT NULL, origin TEXT NOT NULL,
+    ts REAL NOT NULL, version INTEGER, data TEXT
+);
+CREATE INDEX IF NOT EXISTS changes_ip ON changes (ip, seq);
+CREATE TABLE IF NOT EXISTS poll_errors (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, ip TEXT NOT NULL, origin TEXT NOT NULL, ts REAL NOT NULL, message TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS jobs (job_id TEXT PRIMARY KEY, updated REAL NOT NULL, data TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS revocations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, digest BLOB NOT NULL, exp REAL NOT NULL, origin TEXT NOT NULL
+);
+"""
+
+
+class SharedState:
+    """State shared by several server processes on one host through one SQLite file.
+
+    Every process writes its snapshot cache changes through to the file and replays the
+    others' into its own cache, so the listeners hanging off the cache (route versions,
+    events, topology, lookups) see the same stream everywhere. Poll errors, job status and
+    token revocations are shared the same way. A file lock elects the one process that polls."""
+
+    def __init__(self, path: str, cache, routes=None, authenticator=None, sync_interval: float = SYNC_INTERVAL,
+                 poll_error_listener: Optional[Callable[[str, Exception], None]] = None):
+        self.path = path
+        self.cache = cache
+        self.routes = routes
+        self.authenticator = authenticator
+        self.sync_interval = sync_interval
+        self.poll_error_listener = poll_error_listener
+        self.origin = uuid.uuid4().hex
+        self.is_leader = False
+        self._local = threading.local()
+        self._pending = deque()
+        self._pending_errors = deque()
+        self._last_change = 0
+        self._last_error = 0
+        self._last_revocation = 0
+        self._leader_file = None
+        self._on_leader: Optional[Callable[[], None]] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        with self._connect() as db:
+            db.executescript(SCHEMA)
+        cache.add_listener(self.on_snapshot)
+        cache.add_remove_listener(self.on_remove)
+        if authenticator is not None:
+            authenticator.on_revoke = self.on_revoke
+
+    def _connect(self) -> sqlite3.Connection:
+        # sqlite3 connections cannot be shared between threads
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    def on_snapshot(self, router_ip: str, snapshot: Dict):
+        """SnapshotCache listener, only queues the change"""
+        if getattr(self._local, "replaying", False):
+            return
+        version = self.routes.version(router_ip) if self.routes is not None else None
+        # Serialised by flush, snapshots are replaced rather than mutated
+        self._pending.append((router_ip, time.time(), version, snapshot))
+
+    def on_remove(self, router_ip: str):
+        if not getattr(self._local, "replaying", False):
+            self._pending.append((router_ip, time.time(), None, None))
+
+    def on_poll_error(self, router_ip: str, error: Exception):
+        """Poller on_error hook, only the leader polls so the other processes hear of failures from here"""
+        self._pending_errors.append((router_ip, time.time(), str(error)))
+
+    def on_revoke(self, digest: bytes, exp: float):
+        with self._connect() as db:
+            db.execute("INSERT INTO revocations (digest, exp, origin) VALUES (?, ?, ?)", (digest, exp, self.origin))
+
+    def start(self, on_leader: Optional[Callable[[], None]] = None):
+        """Catch up with the other processes, then follow them from a background thread"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._on_leader = on_leader
+        self.load()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="rip-shared-state", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+        if self._leader_file is not None:
+            self._leader_file.close()
+            self._leader_file = None
+            self.is_leader = False
+
+    def _run(self):
+        last_maintenance = 0.0
+        while True:
+            try:
+                self.try_lead()
+                self.flush()
+                self.pull()
+                if self.is_leader and time.time() - last_maintenance >= MAINTENANCE_INTERVAL:
+                    self.compact()
+                    last_maintenance = time.time()
+            except sqlite3.Error as e:
+                print(f"Error syncing shared state: {str(e)}")
+            if self._stop.wait(self.sync_interval):
+                return
+
+    def try_lead(self) -> bool:
+        """Take the leader lock if no other process holds it, the OS frees it when the holder dies"""
+        if self.is_leader:
+            return True
+        if fcntl is not None:
+            lock_file = open(self.path + ".leader", "a")
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                return False
+            self._leader_file = lock_file
+        self.is_leader = True
+        if self._on_leader is not None:
+            self._on_leader()
+        return True
+
+    def flush(self):
+        """Write this process's queued snapshot changes and poll errors in one transaction"""
+        rows = [self._pending.popleft() for _ in range(len(self._pending))]
+        errors = [self._pending_errors.popleft() for _ in range(len(self._pending_errors))]
+        if not rows and not errors:
+            return
+        with self._connect() as db:
+            db.executemany(
+                "INSERT INTO changes (ip, ts, version, data, origin) VALUES (?, ?, ?, ?, ?)",
+                [(router_ip, ts, version, None if snapshot is None else records.dumps(snapshot, separators=(",", ":")),
+                  self.origin) for router_ip, ts, version, snapshot in rows]
+            )
+            db.executemany("INSERT INTO poll_errors (ip, ts, message, origin) VALUES (?, ?, ?, ?)",
+                           [(router_ip, ts, message, self.origin) for router_ip, ts, message in errors])
+
+    def load(self):
+        """Apply the latest snapshot of every router, for a process that just started"""
+        db = self._connect()
+        self._last_change = db.execute("SELECT COALESCE(MAX(seq), 0) FROM changes").fetchone()[0]
+        # Failures from before the start are not news, the next poll reports what still fails
+        self._last_error = db.execute("SELECT COALESCE(MAX(id), 0) FROM poll_errors").fetchone()[0]
+        self._apply(db.execute(
+            "SELECT ip, version, data, NULL FROM changes WHERE data IS NOT NULL AND seq IN"
+            " (SELECT MAX(seq) FROM changes WHERE seq <= ? GROUP BY ip) ORDER BY seq", (self._last_change,)))
+        self._last_revocation = self._apply_revocations(db, 0, time.time())
+
+    def pull(self):
+        """Apply what the other processes changed since the last pull"""
+        db = self._connect()
+        # Own rows only move the sequence on, their data is not read back
+        rows = db.execute(
+            "SELECT seq, ts, ip, origin, version, CASE WHEN origin = ? THEN NULL ELSE data END FROM changes"
+            " WHERE seq > ? ORDER BY seq", (self.origin, self._last_change)).fetchall()
+        errors = db.execute("SELECT id, ts, ip, origin, message FROM poll_errors WHERE id > ? ORDER BY id",
+                            (self._last_error,)).fetchall()
+        if rows:
+            self._last_change = rows[-1][0]
+        if errors:
+            self._last_error = errors[-1][0]
+        # In time order, so a failed poll and the snapshot that recovers from it replay the way they happened
+        timeline = sorted(
+            [(ts, ip, version, data, None) for _, ts, ip, origin, version, data in rows if origin != self.origin]
+            + [(ts, ip, None, None, message) for _, ts, ip, origin, message in errors if origin != self.origin],
+            key=lambda row: row[0])
+        self._apply(row[1:] for row in timeline)
+        self._last_revocation = self._apply_revocations(db, self._last_revocation, 0)
+
+    def _apply(self, rows):
+        self._local.replaying = True
+        try:
+            for router_ip, version, data, error in rows:
+                if error is not None:
+                    if self.poll_error_listener is not None:
+                        self.poll_error_listener(router_ip, RuntimeError(error))
+                    continue
+                if data is None:
+                    self.cache.remove(router_ip)
+                    continue
+                if version is not None and self.routes is not None:
+                    self.routes.assign_version(router_ip, version)
+                self.cache.put(router_ip, records.compact_snapshot(json.loads(data)))
+        finally:
+            self._local.replaying = False
+
+    def _apply_revocations(self, db: sqlite3.Connection, after: int, now: float) -> int:
+        last = after
+        for row_id, digest, exp, origin in db.execute(
+                "SELECT id, digest, exp, origin FROM revocations WHERE id > ? AND exp > ? ORDER BY id", (after, now)):
+            if origin != self.origin and self.authenticator is not None:
+                self.authenticator.revoke_digest(bytes(digest), exp)
+            last = row_id
+        return last
+
+    def save_job(self, job: Dict):
+        with self._connect() as db:
+            db.execute("INSERT OR REPLACE INTO jobs (job_id, updated, data) VALUES (?, ?, ?)",
+                       (job["job_id"], time.time(), json.dumps(job)))
+
+    def load_job(self, job_id: str) -> Optional[Dict]:
+        row = self._connect().execute("SELECT data FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def compact(self, now: Optional[float] = None):
+        """Drop superseded snapshot changes, old poll errors, finished revocations and old jobs"""
+        now = time.time() if now is None else now
+        with self._connect() as db:
+            db.execute(
+                "DELETE FROM changes WHERE ts < ? AND seq NOT IN (SELECT MAX(seq) FROM changes GROUP BY ip)",
+                (now - CHANGE_RETENTION,))
+            db.execute("DELETE FROM poll_errors WHERE ts < ?", (now - CHANGE_RETENTION,))
+            db.execute("DELETE FROM revocations WHERE exp <= ?", (now,))
+            db.execute("DELETE FROM jobs WHERE updated < ?", (now - JOB_RETENTION,))
+
+
+class SessionGate:
+    """Per-router session slots shared by every worker process, one flock file per slot.
+
+    Each worker pools its own sessions, so without the gate N workers could open
+    N times RIP_MAX_SESSIONS logins to a router. The OS drops a dead worker's locks."""
+
+    def __init__(self, directory: str, slots: int = scheduler.MAX_SESSIONS, retry: float = GATE_RETRY):
+        self.directory = directory
+        self.slots = slots
+        self.retry = retry
+        os.makedirs(directory, exist_ok=True)
+
+    def acquire(self, host: str, timeout: float):
+        """Lock a free slot of the router and return the ticket to release, RouterBusy after timeout"""
+        if fcntl is None:
+            return None
+        name = re.sub(r"[^\w.-]", "_", host)
+        deadline = time.monotonic() + timeout
+        while True:
+            for slot in range(self.slots):
+                ticket = open(os.path.join(self.directory, f"{name}.{slot}"), "a")
+                try:
+                    fcntl.flock(ticket, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    return ticket
+                except OSError:
+                    ticket.close()
+            if time.monotonic() >= deadline:
+                raise scheduler.RouterBusy(f"Timed out after {timeout:g}s waiting for a session to {host}, "
+                                           f"other workers hold all {self.slots}")
+            time.sleep(self.retry)
+
+    @staticmethod
+    def release(ticket):
+        if ticket is not None:
+            # Closing the file drops the lock
+            ticket.close()
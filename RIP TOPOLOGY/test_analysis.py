@@ -0,0 +1,57 @@
+import unittest
+from analysis import analyze, find_cycles, RipAnalyzer
+
+def snapshot(addresses, routes):
+    return {
+        'interfaces': [{'interface': f'Ethernet0/{i}', 'ip_address': a} for i, a in enumerate(addresses)],
+        'routes': [{'network': n, 'distance': '120', 'metric': str(m), 'next_hop': h, 'interface': ''}
+                   for n, m, h in routes]
+    }
+
+class TestAnalysis(unittest.TestCase):
+    def test_consistent_chain(self):
+        # R1 -- R2 -- R3, 9.0.0.0/8 connected to R3
+        snapshots = {
+            'r1': snapshot(['10.0.12.1'], [('9.0.0.0/8', 2, '10.0.12.2')]),
+            'r2': snapshot(['10.0.12.2', '10.0.23.2'], [('9.0.0.0/8', 1, '10.0.23.3')]),
+            'r3': snapshot(['10.0.23.3', '9.1.1.1'], []),
+        }
+        report = analyze(snapshots)
+        self.assertEqual(report['summary'], {'near_infinity': 0, 'hop_count': 0, 'loops': 0,
+                                             'black_holes': 0, 'unresolved_next_hops': 0})
+
+    def test_hop_count_and_black_hole(self):
+        snapshots = {
+            'r1': snapshot(['10.0.12.1'], [('9.0.0.0/8', 5, '10.0.12.2'), ('8.0.0.0/8', 2, '10.0.12.2')]),
+            'r2': snapshot(['10.0.12.2'], [('9.0.0.0/8', 1, '10.0.23.3')]),
+        }
+        report = analyze(snapshots)
+        self.assertEqual([(h['router'], h['expected']) for h in report['hop_count']], [('r1', 2)])
+        self.assertEqual(report['black_holes'], [{'network': '8.0.0.0/8', 'router': 'r2', 'from': ['r1']}])
+        self.assertEqual(report['summary']['unresolved_next_hops'], 1)
+
+    def test_loop_and_near_infinity(self):
+        snapshots = {
+            'r1': snapshot(['10.0.12.1'], [('9.0.0.0/8', 14, '10.0.12.2')]),
+            'r2': snapshot(['10.0.12.2'], [('9.0.0.0/8', 15, '10.0.12.1'), ('7.0.0.0/8', 16, '10.0.12.1')]),
+        }
+        report = analyze(snapshots)
+        self.assertEqual(len(report['loops']), 1)
+        self.assertEqual(set(report['loops'][0]['path']), {'r1', 'r2'})
+        self.assertEqual(sorted((n['router'], n['metric']) for n in report['near_infinity']),
+                         [('r1', 14), ('r2', 15), ('r2', 16)])
+
+    def test_cycles_reported_once(self):
+        graph = {'a': ['b'], 'b': ['c', 'd'], 'c': ['a'], 'd': [], 'e': ['a']}
+        self.assertEqual(find_cycles(graph), [['a', 'b', 'c']])
+
+    def test_report_cached_until_snapshot_replaced(self):
+        analyzer = RipAnalyzer()
+        snapshots = {'r1': snapshot(['10.0.12.1'], [])}
+        first = analyzer.analyze(snapshots)
+        self.assertIs(analyzer.analyze(dict(snapshots)), first)
+        snapshots['r1'] = snapshot(['10.0.12.1'], [])
+        self.assertIsNot(analyzer.analyze(snapshots), first)
+
+if __name__ == '__main__':
+    unittest.main()
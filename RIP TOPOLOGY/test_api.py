@@ -0,0 +1,188 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest import mock
+from fake_router import FakeRouter, Simulator
+
+# The app reads its configuration at import
+DIR = tempfile.mkdtemp()
+os.environ['RIP_INVENTORY'] = os.path.join(DIR, 'routers_db.json')
+os.environ['RIP_POLL_INTERVAL'] = '0'
+os.environ['RIP_HISTORY'] = ''
+os.environ['RIP_SESSION_LOG'] = 'off'
+import app as A
+import events
+import poller
+import router_utils as ru
+
+class ApiTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.simulator = Simulator()
+        cls.router = FakeRouter(route_count=3)
+        cls.host, cls.port = cls.simulator.add(cls.router)
+        cls.ip = f'{cls.host}:{cls.port}'
+        with open(os.environ['RIP_INVENTORY'], 'w') as f:
+            json.dump([{'ip': cls.ip, 'username': 'admin', 'password': 'admin'}], f)
+        cls.client = A.app.test_client()
+        token = cls.client.post('/login', json={'username': 'admin', 'password': 'admin'}).get_json()['token']
+        cls.headers = {'Authorization': f'Bearer {token}'}
+
+    @classmethod
+    def tearDownClass(cls):
+        ru.POOL.close_all()
+        cls.simulator.close()
+
+    def setUp(self):
+        poller.CACHE.remove(self.ip)
+        ru.READ_CACHE.invalidate(self.ip)
+
+    def get(self, path):
+        return self.client.get(path, headers=self.headers)
+
+class TestSnapshotReads(ApiTestCase):
+    def test_routes_fall_back_to_a_live_read_then_serve_the_snapshot(self):
+        commands = self.router.commands
+        response = self.get(f'/routers/{self.ip}/rip/routes')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.get_json()['routes']), 3)
+        self.assertGreater(self.router.commands, commands)
+        commands = self.router.commands
+        self.assertEqual(self.get(f'/routers/{self.ip}/rip/routes').status_code, 200)
+        self.assertEqual(self.router.commands, commands)
+
+    def test_fresh_reads_the_router(self):
+        poller.collect(A.find_router(self.ip))
+        commands = self.router.commands
+        self.assertEqual(self.get(f'/routers/{self.ip}/rip/routes?fresh=true').status_code, 200)
+        self.assertGreater(self.router.commands, commands)
+        commands = self.router.commands
+        self.assertEqual(self.get(f'/routers/{self.ip}/state?fresh=true').status_code, 200)
+        self.assertGreater(self.router.commands, commands)
+
+    def test_state_after_a_routes_read_is_complete(self):
+        self.get(f'/routers/{self.ip}/rip/routes')
+        state = self.get(f'/routers/{self.ip}/state').get_json()
+        self.assertEqual(len(state['routes']), 3)
+        self.assertEqual(len(state['interfaces']), 4)
+        self.assertIn('neighbors', state)
+        self.assertIn('rip_version', state)
+
+    def test_state_serves_a_complete_snapshot(self):
+        poller.collect(A.find_router(self.ip))
+        commands = self.router.commands
+        self.assertEqual(len(self.get(f'/routers/{self.ip}/state').get_json()['interfaces']), 4)
+        self.assertEqual(self.router.commands, commands)
+
+class TestTransactionValidation(ApiTestCase):
+    def post(self, body):
+        return self.client.post(f'/routers/{self.ip}/rip/transaction', json=body, headers=self.headers)
+
+    def test_malformed_interface_changes_are_rejected(self):
+        commands = self.router.commands
+        for interfaces in [[{'action': 'enable'}], ['Ethernet0/1'], [{'interface': 'Ethernet0/1', 'action': 'up'}],
+                           {'interface': 'Ethernet0/1', 'action': 'enable'}]:
+            response = self.post({'interfaces': interfaces})
+            self.assertEqual(response.status_code, 400, interfaces)
+            self.assertIn('interface', response.get_json()['error'])
+        self.assertEqual(self.router.commands, commands)
+
+    def test_invalid_version_is_rejected(self):
+        self.assertEqual(self.post({'version': '3'}).status_code, 400)
+
+class TestCommandBatch(ApiTestCase):
+    def post(self, commands):
+        return self.client.post(f'/routers/{self.ip}/exec/batch', json={'commands': commands}, headers=self.headers)
+
+    def test_batch_limit(self):
+        commands = self.router.commands
+        response = self.post(['show ip protocols'] * (ru.MAX_BATCH_COMMANDS + 1))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(str(ru.MAX_BATCH_COMMANDS), response.get_json()['error'])
+        self.assertEqual(self.router.commands, commands)
+
+    def test_batch_at_the_limit_runs(self):
+        response = self.post(['show ip protocols'] * ru.MAX_BATCH_COMMANDS)
+        self.assertEqual(response.status_code, 200)
+        results = response.get_json()['results']
+        self.assertEqual([r['status'] for r in results], ['success'] * ru.MAX_BATCH_COMMANDS)
+
+    def test_config_commands_are_rejected(self):
+        self.assertEqual(self.post(['show ip route', 'reload']).status_code, 400)
+
+class TestGns3Import(ApiTestCase):
+    def project(self, *ports):
+        return {'topology': {'nodes': [{'node_id': f'n{port}', 'name': f'R{port}', 'node_type': 'iou',
+                                        'console_host': self.host, 'console': port, 'console_type': 'telnet'}
+                                       for port in ports], 'links': []}}
+
+    def post(self, project, **params):
+        return self.client.post('/routers/import', data=json.dumps(project), headers=self.headers,
+                                query_string=dict(username='admin', password='admin', **params))
+
+    def test_imported_routers_carry_their_validation(self):
+        response = self.post(self.project(self.port, 1))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['imported'], 1)
+        self.assertIsNone(A.INVENTORY.get(f'{self.host}:1'))
+        status = self.get(f'/routers/{self.ip}/status').get_json()
+        self.assertEqual(status['status'], 'reachable')
+        self.assertIsNotNone(status['registered_at'])
+        self.assertIn('checked_at', status['validation'])
+        self.assertIn('rip_version', status['validation'])
+
+    def test_unvalidated_imports_are_pending(self):
+        self.addCleanup(A.INVENTORY.remove, f'{self.host}:1')
+        with mock.patch.object(A.REGISTRATION, 'submit') as submit:
+            response = self.post(self.project(1), validate='false')
+        self.assertEqual(response.get_json()['imported'], 1)
+        self.assertEqual(submit.call_count, 1)
+        status = self.get(f'/routers/{self.host}:1/status').get_json()
+        self.assertEqual(status['status'], 'pending')
+        self.assertIsNotNone(status['registered_at'])
+
+class TestEventStreams(ApiTestCase):
+    def test_streams_past_the_limit_are_turned_away(self):
+        with mock.patch.object(events, 'STREAMS', threading.BoundedSemaphore(1)), \
+                mock.patch.object(events, 'MAX_STREAMS', 1):
+            stream = self.client.get('/events', headers=self.headers, buffered=False)
+            self.assertEqual(stream.status_code, 200)
+            busy = self.get('/events')
+            self.assertEqual(busy.status_code, 503)
+            self.assertIn('Retry-After', busy.headers)
+            stream.close()
+            again = self.client.get('/events', headers=self.headers, buffered=False)
+            self.assertEqual(again.status_code, 200)
+            again.close()
+
+class TestBackgroundTasks(unittest.TestCase):
+    def test_single_process_reaps_idle_sessions(self):
+        self.assertIsNone(A.SHARED)
+        A.start_background_tasks()
+        self.assertTrue(ru.POOL._reaper.is_alive())
+
+class TestRemovedSnapshots(unittest.TestCase):
+    def test_removal_drops_routes_lookups_and_topology(self):
+        ip = '10.9.9.1'
+        poller.CACHE.put(ip, {
+            'routes': [{'network': '10.8.0.0/16', 'distance': '120', 'metric': '1', 'next_hop': '10.9.9.2',
+                        'interface': 'Ethernet0/0', 'last_updated': 'now'}],
+            'neighbors': [{'neighbor': '10.9.9.2', 'interface': 'Ethernet0/0', 'uptime': '00:00:01'}],
+            'interfaces': [{'interface': 'Ethernet0/0', 'ip_address': '10.9.9.1', 'status': 'up', 'proto': 'up'}]})
+        self.assertIsNotNone(A.ROUTES.version(ip))
+        self.assertIsNotNone(A.ROUTE_INDEX.lookup(ip, '10.8.1.1'))
+        self.assertIn('10.9.9.2', A.TOPOLOGY.render([{'ip': ip}])[1])
+
+        poller.CACHE.remove(ip)
+        self.assertIsNone(A.ROUTES.version(ip))
+        self.assertIsNone(A.ROUTE_INDEX.lookup(ip, '10.8.1.1'))
+        self.assertNotIn('10.9.9.2', A.TOPOLOGY.render([{'ip': ip}])[1])
+
+def tearDownModule():
+    shutil.rmtree(DIR, ignore_errors=True)
+
+if __name__ == '__main__':
+    unittest.main()
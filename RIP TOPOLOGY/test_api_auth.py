@@ -0,0 +1,73 @@
+import time
+import unittest
+from unittest import mock
+import jwt
+import api_auth
+from api_auth import Authenticator, AuthError
+
+def token(exp, secret='secret', username='admin'):
+    return jwt.encode({'username': username, 'exp': exp}, secret, algorithm='HS256')
+
+class TestAuthenticator(unittest.TestCase):
+    def setUp(self):
+        self.auth = Authenticator('secret', {'grafana': 'k3y'}, max_entries=2)
+
+    def test_verified_tokens_skip_the_signature_check(self):
+        valid = token(int(time.time()) + 60)
+        with mock.patch.object(api_auth.jwt, 'decode', wraps=jwt.decode) as decode:
+            self.assertEqual(self.auth.verify_token(valid)['username'], 'admin')
+            self.assertEqual(self.auth.verify_token(valid)['username'], 'admin')
+        self.assertEqual(decode.call_count, 1)
+
+    def test_cached_token_still_expires(self):
+        exp = int(time.time()) + 60
+        valid = token(exp)
+        self.auth.verify_token(valid)
+        with self.assertRaisesRegex(AuthError, 'expired'):
+            self.auth.verify_token(valid, now=exp + 1)
+        self.assertEqual(self.auth.stats()['cached'], 0)
+
+    def test_rejects_bad_signature_and_expired(self):
+        with self.assertRaisesRegex(AuthError, 'signature'):
+            self.auth.verify_token(token(int(time.time()) + 60, secret='other'))
+        with self.assertRaisesRegex(AuthError, 'expired'):
+            self.auth.verify_token(token(int(time.time()) - 60))
+
+    def test_cache_is_bounded(self):
+        for username in ('a', 'b', 'c'):
+            self.auth.verify_token(token(int(time.time()) + 60, username=username))
+        self.assertEqual(self.auth.stats()['cached'], 2)
+
+    def test_revoked_token_is_rejected(self):
+        valid = token(int(time.time()) + 60)
+        self.auth.verify_token(valid)
+        self.auth.revoke(valid)
+        with self.assertRaisesRegex(AuthError, 'revoked'):
+            self.auth.verify_token(valid)
+        # Revocations are forgotten once the token has expired anyway
+        self.auth.revoke(token(int(time.time()) + 600, username='b'), now=time.time() + 120)
+        self.assertEqual(self.auth.stats()['revoked'], 1)
+
+    def test_api_keys(self):
+        self.assertEqual(self.auth.verify_api_key('k3y')['username'], 'grafana')
+        with self.assertRaises(AuthError):
+            self.auth.verify_api_key('k3y ')
+
+    def test_parse_api_keys(self):
+        self.assertEqual(api_auth.parse_api_keys(' a:1, b:x:y ,'), {'a': '1', 'b': 'x:y'})
+        with self.assertRaises(ValueError):
+            api_auth.parse_api_keys('nokey')
+
+    def test_stream_ticket_only_opens_the_event_stream(self):
+        with mock.patch.object(api_auth, 'SECRET_KEY', 'secret'):
+            ticket = api_auth.generate_ticket('admin')
+        self.assertEqual(self.auth.verify_token(ticket, scope=api_auth.EVENTS_SCOPE)['username'], 'admin')
+        # Cached after the first check, the scope is still enforced
+        with self.assertRaisesRegex(AuthError, 'event stream'):
+            self.auth.verify_token(ticket)
+        with self.assertRaisesRegex(AuthError, 'Not an event stream ticket'):
+            self.auth.verify_token(token(int(time.time()) + 60), scope=api_auth.EVENTS_SCOPE)
+        self.assertLessEqual(jwt.decode(ticket, 'secret', algorithms=['HS256'])['exp'], time.time() + 60)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from aiohttp.test_utils import TestClient, TestServer
+import async_app
+import inventory
+from fake_router import FakeRouter, Simulator
+
+class TestAsyncAppAgainstSimulator(unittest.IsolatedAsyncioTestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.simulator = Simulator()
+        cls.host, cls.port = cls.simulator.add(FakeRouter(route_count=3))
+        cls.ip = f'{cls.host}:{cls.port}'
+        cls.dir = tempfile.mkdtemp()
+        path = os.path.join(cls.dir, 'routers_db.json')
+        with open(path, 'w') as f:
+            json.dump([{'ip': cls.ip, 'username': 'admin', 'password': 'admin'}], f)
+        cls.inventory = inventory.open_inventory(path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.simulator.close()
+        shutil.rmtree(cls.dir)
+
+    async def asyncSetUp(self):
+        patcher = mock.patch.object(async_app, 'INVENTORY', self.inventory)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = TestClient(TestServer(async_app.create_app()))
+        await self.client.start_server()
+        response = await self.client.post('/login', json={'username': 'admin', 'password': 'admin'})
+        self.headers = {'Authorization': 'Bearer ' + (await response.json())['token']}
+
+    async def asyncTearDown(self):
+        await self.client.close()
+
+    async def test_routes(self):
+        response = await self.client.get(f'/routers/{self.ip}/rip/routes', headers=self.headers)
+        self.assertEqual(response.status, 200)
+        routes = (await response.json())['routes']
+        self.assertEqual([route['network'] for route in routes], ['10.0.0.0/24', '10.0.1.0/24', '10.0.2.0/24'])
+
+    async def test_unknown_router(self):
+        response = await self.client.get('/routers/10.9.9.9/rip/routes', headers=self.headers)
+        self.assertEqual(response.status, 404)
+
+    async def test_fleet_routes(self):
+        response = await self.client.get('/fleet/rip/routes', headers=self.headers)
+        body = await response.json()
+        self.assertEqual(body['summary'], {'ok': 1, 'error': 0, 'timeout': 0})
+        self.assertEqual(len(body['routers'][self.ip]['routes']), 3)
+
+    async def test_fleet_timeout_is_checked(self):
+        for timeout in ('abc', '0', '-1', 'nan', 'inf', '301'):
+            for path in ('/fleet/rip/routes', '/fleet/rip/neighbors'):
+                response = await self.client.get(path, params={'timeout': timeout}, headers=self.headers)
+                self.assertEqual(response.status, 400, (path, timeout))
+                self.assertIn('timeout', (await response.json())['error'])
+        response = await self.client.get('/fleet/rip/routes', params={'timeout': '5'}, headers=self.headers)
+        self.assertEqual(response.status, 200)
+
+    async def test_token_required(self):
+        response = await self.client.get('/routers')
+        self.assertEqual(response.status, 401)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import time
+import unittest
+from unittest import mock
+from netmiko.exceptions import NetmikoAuthenticationException
+import async_router as ar
+from fake_router import FakeRouter, Simulator
+
+class TestAsyncRouterAgainstSimulator(unittest.IsolatedAsyncioTestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.simulator = Simulator()
+        cls.router = FakeRouter(route_count=3)
+        cls.host, cls.port = cls.simulator.add(cls.router)
+        cls.endpoint = f'{cls.host}:{cls.port}'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.simulator.close()
+
+    async def test_collect_state(self):
+        state = await ar.collect_state(self.endpoint, 'admin', 'admin')
+        self.assertEqual(len(state['routes']), 3)
+        self.assertEqual(state['routes'][0]['network'], '10.0.0.0/24')
+        self.assertEqual(len(state['interfaces']), 4)
+
+    async def test_wrong_password_is_an_authentication_error(self):
+        started = time.monotonic()
+        with self.assertRaises(NetmikoAuthenticationException):
+            await ar.probe(self.endpoint, 'admin', 'wrong', timeout=10)
+        # Turned down on the first '% Login invalid', not after the timeout
+        self.assertLess(time.monotonic() - started, 5)
+
+class TestNegotiate(unittest.TestCase):
+    def setUp(self):
+        self.conn = ar.AsyncRouterConnection('10.0.0.1')
+        self.conn._writer = mock.Mock()
+
+    def test_command_split_across_reads(self):
+        self.assertEqual(self.conn._negotiate(b'Username' + bytes([ar.IAC])), b'Username')
+        self.assertEqual(self.conn._negotiate(bytes([ar.WILL])), b'')
+        self.assertEqual(self.conn._negotiate(bytes([1]) + b': '), b': ')
+        self.conn._writer.write.assert_called_once_with(bytes([ar.IAC, ar.DONT, 1]))
+
+    def test_subnegotiation_split_across_reads(self):
+        self.assertEqual(self.conn._negotiate(b'R1' + bytes([ar.IAC, ar.SB, 24, 1])), b'R1')
+        self.assertEqual(self.conn._negotiate(bytes([ar.IAC, ar.SE]) + b'>'), b'>')
+
+    def test_escaped_iac_is_data(self):
+        self.assertEqual(self.conn._negotiate(bytes([ar.IAC])), b'')
+        self.assertEqual(self.conn._negotiate(bytes([ar.IAC])), bytes([ar.IAC]))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import threading
+import unittest
+from events import EventBus, ConvergenceWatcher, sse_stream
+from route_diff import RouteTracker
+
+def snapshot(networks, neighbors):
+    return {
+        'routes': [{'network': n, 'distance': '120', 'metric': '1', 'next_hop': '10.0.0.2', 'interface': ''}
+                   for n in networks],
+        'neighbors': [{'neighbor': n, 'interface': '', 'uptime': ''} for n in neighbors]
+    }
+
+class TestEventBus(unittest.TestCase):
+    def test_read_after_id(self):
+        bus = EventBus()
+        start = bus.last_id()
+        bus.publish('a')
+        bus.publish('b', router='10.0.0.1')
+        self.assertEqual([e['type'] for e in bus.read(start)], ['a', 'b'])
+        self.assertEqual([e['type'] for e in bus.read(start + 1)], ['b'])
+        self.assertEqual(bus.read(start + 2, timeout=0), [])
+
+    def test_reader_wakes_on_publish(self):
+        bus = EventBus()
+        start = bus.last_id()
+        threading.Timer(0.05, bus.publish, args=('late',)).start()
+        self.assertEqual([e['type'] for e in bus.read(start, timeout=5)], ['late'])
+
+    def test_dropped_events_need_resync(self):
+        bus = EventBus(max_events=2)
+        start = bus.last_id()
+        for _ in range(3):
+            bus.publish('a')
+        self.assertIsNone(bus.read(start))
+        self.assertIsNone(bus.read(start + 10))
+        stream = sse_stream(bus, start)
+        next(stream)
+        self.assertIn('event: resync', next(stream))
+
+class TestConvergenceWatcher(unittest.TestCase):
+    def test_route_neighbor_and_poll_events(self):
+        bus = EventBus()
+        watcher = ConvergenceWatcher(bus, RouteTracker())
+        start = bus.last_id()
+        watcher.on_snapshot('10.0.0.1', snapshot(['1.0.0.0/8'], ['10.0.0.2']))
+        self.assertEqual(bus.read(start, timeout=0), [])
+
+        watcher.on_poll_error('10.0.0.1', TimeoutError('no answer'))
+        watcher.on_snapshot('10.0.0.1', snapshot(['1.0.0.0/8', '2.0.0.0/8'], ['10.0.0.3']))
+        events = bus.read(start)
+        self.assertEqual([e['type'] for e in events],
+                         ['poll_error', 'route_change', 'neighbor_up', 'neighbor_down', 'poll_recovered'])
+        self.assertEqual(events[1]['changes'][0]['network'], '2.0.0.0/8')
+        self.assertEqual(events[2]['neighbor'], '10.0.0.3')
+
+if __name__ == '__main__':
+    unittest.main()
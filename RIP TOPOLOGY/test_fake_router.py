@@ -0,0 +1,45 @@
+import unittest
+import router_utils as ru
+from fake_router import FakeRouter, Simulator
+from session_pool import SessionPool
+
+class TestRouterConnectionAgainstSimulator(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.simulator = Simulator()
+        cls.router = FakeRouter(route_count=3)
+        cls.host, cls.port = cls.simulator.add(cls.router)
+        cls.pool = SessionPool()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pool.close_all()
+        cls.simulator.close()
+
+    def connection(self):
+        conn = ru.RouterConnection(self.host, 'admin', 'admin', pool=self.pool)
+        conn.device['port'] = self.port
+        return conn
+
+    def test_collect_state_uses_one_login(self):
+        sessions = self.router.sessions
+        state = self.connection().collect_state()
+        self.connection().collect_state()
+        self.assertEqual(len(state['routes']), 3)
+        self.assertEqual(state['routes'][0]['network'], '10.0.0.0/24')
+        self.assertEqual(len(state['interfaces']), 4)
+        self.assertLessEqual(self.router.sessions - sessions, 1)
+
+    def test_transaction_saves_once(self):
+        saves = self.router.saves
+        result = self.connection().transaction() \
+            .set_rip_version('1') \
+            .configure_rip_interface('Ethernet0/1', 'disable') \
+            .configure_rip_interface('Ethernet0/1', 'enable') \
+            .commit()
+        self.assertEqual(result['status'], 'success')
+        self.assertEqual(self.router.saves - saves, 1)
+        self.assertEqual(self.connection().collect_state()['rip_version'], '1')
+
+if __name__ == '__main__':
+    unittest.main()
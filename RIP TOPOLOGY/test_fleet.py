@@ -0,0 +1,115 @@
+import threading
+import time
+import unittest
+import fleet
+import poller
+from jobs import JobManager
+
+ROUTERS = [{'ip': ip, 'username': 'admin', 'password': 'admin'} for ip in ('10.0.0.1', '10.0.0.2', '10.0.0.3')]
+
+class TestFanOut(unittest.TestCase):
+    def test_failures_are_errors_not_empty_results(self):
+        release = threading.Event()
+        def read(ip, username, password):
+            if ip == '10.0.0.2':
+                raise ConnectionRefusedError('[Errno 111] Connection refused')
+            if ip == '10.0.0.3':
+                release.wait(5)
+            return ['route']
+        try:
+            result = fleet.fan_out(ROUTERS, read, 'routes', timeout=0.5)
+        finally:
+            release.set()
+        routers = result['routers']
+        self.assertEqual(result['summary'], {'ok': 1, 'error': 1, 'timeout': 1})
+        self.assertEqual(routers['10.0.0.1']['routes'], ['route'])
+        self.assertEqual(routers['10.0.0.2'], {'status': 'error', 'message': '[Errno 111] Connection refused'})
+        self.assertNotIn('routes', routers['10.0.0.2'])
+        self.assertEqual(routers['10.0.0.3']['status'], 'timeout')
+
+    def test_poller_does_not_share_the_fan_out_threads(self):
+        self.assertIsNot(poller.EXECUTOR, fleet.EXECUTOR)
+
+    def test_busy_config_pushes_do_not_hold_up_reads(self):
+        release = threading.Event()
+        def push(router):
+            release.wait(5)
+            return {'status': 'success'}
+        # More pushes than either pool has threads, all stuck on slow routers
+        routers = [dict(ROUTERS[0], ip=f'10.1.{i // 256}.{i % 256}') for i in range(fleet.FLEET_WORKERS * 2)]
+        JobManager(max_workers=fleet.FLEET_WORKERS).submit('rip_config', routers, push)
+        try:
+            result = fleet.fan_out(ROUTERS, lambda ip, username, password: ['route'], 'routes', timeout=2)
+        finally:
+            release.set()
+        self.assertEqual(result['summary'], {'ok': 3, 'error': 0, 'timeout': 0})
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError('condition not met in time')
+        time.sleep(0.01)
+
+class TestJobManager(unittest.TestCase):
+    def setUp(self):
+        self.manager = JobManager(max_workers=4)
+
+    def test_job_goes_from_running_to_done(self):
+        release = threading.Event()
+        def task(router):
+            release.wait(5)
+            return {'status': 'success'}
+        job = self.manager.submit('rip_config', ROUTERS, task, concurrency=1)
+        wait_until(lambda: job.status == 'running')
+        wait_until(lambda: job.to_dict()['summary'] == {'running': 1, 'pending': 2})
+        self.assertIsNone(job.finished)
+        release.set()
+        wait_until(lambda: job.status == 'done')
+        status = self.manager.status(job.id)
+        self.assertEqual(status['summary'], {'success': 3})
+        self.assertIsNotNone(status['finished'])
+
+    def test_results_are_kept_per_router(self):
+        def task(router):
+            if router['ip'] == '10.0.0.2':
+                raise ConnectionRefusedError('refused')
+            return {'status': 'success', 'router': router['ip']}
+        job = self.manager.submit('rip_config', ROUTERS, task)
+        wait_until(lambda: job.status == 'done')
+        routers = self.manager.status(job.id)['routers']
+        self.assertEqual(routers['10.0.0.1'], {'status': 'success', 'router': '10.0.0.1'})
+        self.assertEqual(routers['10.0.0.2'], {'status': 'error', 'message': 'refused'})
+        self.assertEqual(list(routers), [router['ip'] for router in ROUTERS])
+
+    def test_concurrent_jobs_stay_apart_within_their_limits(self):
+        lock = threading.Lock()
+        running = {'a': 0, 'b': 0}
+        peak = {'a': 0, 'b': 0}
+        def task_for(name):
+            def task(router):
+                with lock:
+                    running[name] += 1
+                    peak[name] = max(peak[name], running[name])
+                time.sleep(0.02)
+                with lock:
+                    running[name] -= 1
+                return {'status': 'success', 'job': name}
+            return task
+        many = [dict(ROUTERS[0], ip=f'10.2.0.{i}') for i in range(8)]
+        a = self.manager.submit('rip_config', many, task_for('a'), concurrency=2)
+        b = self.manager.submit('rip_config', many, task_for('b'), concurrency=1)
+        wait_until(lambda: a.status == 'done' and b.status == 'done')
+        self.assertNotEqual(a.id, b.id)
+        self.assertLessEqual(peak['a'], 2)
+        self.assertEqual(peak['b'], 1)
+        self.assertEqual({r['job'] for r in self.manager.status(a.id)['routers'].values()}, {'a'})
+        self.assertEqual({r['job'] for r in self.manager.status(b.id)['routers'].values()}, {'b'})
+
+    def test_concurrency_is_capped_and_unknown_jobs_are_none(self):
+        job = self.manager.submit('rip_config', ROUTERS, lambda router: {'status': 'success'}, concurrency=50)
+        self.assertEqual(job.concurrency, 4)
+        self.assertIsNone(self.manager.status('missing'))
+
+if __name__ == '__main__':
+    unittest.main()
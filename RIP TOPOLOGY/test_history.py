@@ -0,0 +1,56 @@
+import os
+import shutil
+import tempfile
+import unittest
+from history import HistoryStore
+
+def snapshot(ts, networks, metric='1'):
+    return {
+        'polled_at': ts,
+        'routes': [{'network': n, 'distance': '120', 'metric': metric, 'next_hop': '10.0.0.2',
+                    'interface': 'Ethernet0/0', 'last_updated': 'ignored'} for n in networks],
+        'neighbors': [{'neighbor': '10.0.0.2', 'interface': '', 'uptime': '00:00:12'}]
+    }
+
+class TestHistoryStore(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.store = HistoryStore(os.path.join(self.dir, 'history.db'), retention=1000, full_resolution=100, bucket=50)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def count(self, table):
+        return self.store._connect().execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+
+    def test_identical_tables_stored_once(self):
+        for ts in range(10):
+            self.store.on_snapshot('10.0.0.1', snapshot(1000 + ts, ['1.0.0.0/8']))
+        self.store.on_snapshot('10.0.0.1', snapshot(1010, ['1.0.0.0/8'], metric='2'))
+        self.store.flush()
+        self.assertEqual(self.count('samples'), 11)
+        self.assertEqual(self.count('tables'), 2)
+
+        result = self.store.query('10.0.0.1', 1000, 1010)
+        self.assertEqual(len(result['samples']), 11)
+        self.assertEqual([s['routes'][0]['metric'] for s in result['samples'] if 'routes' in s], ['1', '2'])
+        self.assertEqual(result['samples'][0]['neighbors'][0]['uptime'], '00:00:12')
+
+    def test_events(self):
+        self.store.record_event({'type': 'route_change', 'router': '10.0.0.1', 'changes': []})
+        self.store.record_event({'type': 'resync'})
+        self.store.flush()
+        self.assertEqual(self.count('events'), 1)
+
+    def test_retention_and_downsampling(self):
+        for ts in range(0, 1000, 10):
+            self.store.on_snapshot('10.0.0.1', snapshot(ts, [f'{ts % 3}.0.0.0/8']))
+        self.store.flush()
+        self.store.compact(now=1500)
+        # Past retention before 500, one per 50 s bucket until 1400, nothing newer to keep at full rate
+        timestamps = [row[0] for row in self.store._connect().execute('SELECT ts FROM samples ORDER BY ts')]
+        self.assertEqual(timestamps, list(range(500, 1000, 50)))
+        self.assertLessEqual(self.count('tables'), 3)
+
+if __name__ == '__main__':
+    unittest.main()
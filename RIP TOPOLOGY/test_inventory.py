@@ -0,0 +1,84 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+from inventory import JsonInventory, SqliteInventory
+
+class InventoryTests:
+    def test_put_and_get(self):
+        self.inventory.put({'ip': '10.0.0.1', 'username': 'admin', 'password': 'admin'})
+        self.assertEqual(self.inventory.get('10.0.0.1')['username'], 'admin')
+        self.assertIsNone(self.inventory.get('10.0.0.2'))
+
+    def test_put_replaces_same_ip(self):
+        self.inventory.put({'ip': '10.0.0.1', 'username': 'admin', 'password': 'admin'})
+        self.inventory.put({'ip': '10.0.0.1', 'username': 'cisco', 'password': 'cisco'})
+        self.assertEqual(len(self.inventory.all()), 1)
+        self.assertEqual(self.inventory.get('10.0.0.1')['username'], 'cisco')
+
+    def test_put_many(self):
+        self.inventory.put({'ip': '10.0.0.1', 'username': 'admin', 'password': 'admin'})
+        self.inventory.put_many([{'ip': '10.0.0.1', 'username': 'cisco', 'password': 'cisco'},
+                                 {'ip': '127.0.0.1:5008', 'username': 'cisco', 'password': 'cisco'}])
+        self.assertEqual(len(self.inventory.all()), 2)
+        self.assertEqual(self.inventory.get('10.0.0.1')['username'], 'cisco')
+
+    def test_concurrent_puts_are_not_lost(self):
+        threads = [
+            threading.Thread(target=self.inventory.put,
+                             args=({'ip': f'10.0.0.{i}', 'username': 'admin', 'password': 'admin'},))
+            for i in range(20)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(self.inventory.all()), 20)
+
+    def test_concurrent_updates_are_not_lost(self):
+        self.inventory.put({'ip': '10.0.0.1', 'username': 'admin', 'password': 'admin', 'count': 0})
+        def bump():
+            for _ in range(10):
+                self.inventory.update('10.0.0.1', lambda router: dict(router, count=router['count'] + 1))
+        threads = [threading.Thread(target=bump) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(self.inventory.get('10.0.0.1')['count'], 40)
+
+    def test_update_can_leave_the_router(self):
+        self.assertIsNone(self.inventory.update('10.0.0.1', lambda router: router))
+        self.assertIsNone(self.inventory.get('10.0.0.1'))
+        self.inventory.put({'ip': '10.0.0.1', 'username': 'admin', 'password': 'admin'})
+        self.assertIsNone(self.inventory.update('10.0.0.1', lambda router: None))
+        self.assertEqual(self.inventory.get('10.0.0.1')['username'], 'admin')
+
+    def test_remove(self):
+        self.inventory.put({'ip': '10.0.0.1', 'username': 'admin', 'password': 'admin'})
+        self.assertTrue(self.inventory.remove('10.0.0.1'))
+        self.assertFalse(self.inventory.remove('10.0.0.1'))
+
+class TestJsonInventory(InventoryTests, unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, 'routers_db.json')
+        self.inventory = JsonInventory(self.path)
+
+    def test_reloads_when_file_changes(self):
+        self.inventory.put({'ip': '10.0.0.1', 'username': 'admin', 'password': 'admin'})
+        with open(self.path, 'w') as f:
+            json.dump([{'ip': '10.0.0.9', 'username': 'admin', 'password': 'admin', 'extra': 'x' * 10}], f)
+        self.assertIsNone(self.inventory.get('10.0.0.1'))
+        self.assertIsNotNone(self.inventory.get('10.0.0.9'))
+
+class TestSqliteInventory(InventoryTests, unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.inventory = SqliteInventory(os.path.join(self.tmp.name, 'routers.db'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import unittest
+import metrics
+
+class TestMetrics(unittest.TestCase):
+    def metric(self, metric):
+        self.addCleanup(metrics.REGISTRY.remove, metric)
+        return metric
+
+    def test_counter_labels_and_escaping(self):
+        counter = self.metric(metrics.Counter('test_total', 'Test counter', ['router']))
+        counter.inc('10.0.0.1')
+        counter.inc('10.0.0.1', amount=2)
+        counter.inc('a"b')
+        self.assertEqual(counter.samples(), ['test_total{router="10.0.0.1"} 3', 'test_total{router="a\\"b"} 1'])
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = self.metric(metrics.Histogram('test_seconds', 'Test histogram', buckets=(0.1, 1.0)))
+        for value in (0.05, 0.1, 0.5, 5.0):
+            histogram.observe(value)
+        self.assertEqual(histogram.samples(), [
+            'test_seconds_bucket{le="0.1"} 2',
+            'test_seconds_bucket{le="1.0"} 3',
+            'test_seconds_bucket{le="+Inf"} 4',
+            'test_seconds_sum 5.65',
+            'test_seconds_count 4'
+        ])
+
+    def test_render_includes_help_type_and_callbacks(self):
+        self.metric(metrics.CallbackMetric('test_entries', 'Test gauge', 'gauge', lambda: {(): 7}))
+        text = metrics.render()
+        self.assertIn('# HELP test_entries Test gauge\n# TYPE test_entries gauge\ntest_entries 7\n', text)
+        self.assertIn('# TYPE rip_command_seconds histogram', text)
+
+    def test_command_label_is_bounded(self):
+        self.assertEqual(metrics.command_label('show  ip route RIP'), 'show ip route rip')
+        self.assertEqual(metrics.command_label('show running-config'), 'other')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+import parsers
+
+ROUTES = """Codes: L - local, C - connected, S - static, R - RIP, M - mobile, B - BGP
+
+Gateway of last resort is not set
+
+      10.0.0.0/8 is variably subnetted, 2 subnets, 2 masks
+R        10.2.0.0/24 [120/2] via 10.0.0.2, 00:00:05, Serial0/0/0
+                     [120/2] via 10.0.0.6, 00:00:05, Serial0/0/1
+R     30.0.0.0/8 [120/1] via 20.0.0.2, 00:00:12, Ethernet0/1
+     172.16.0.0/24 is subnetted, 1 subnets
+R       172.16.5.0 [120/3] via 20.0.0.2, 00:00:12, Ethernet0/1
+R     40.0.0.0/8 is possibly down, routing via 20.0.0.2, Ethernet0/1
+"""
+
+PROTOCOLS = """Routing Protocol is "rip"
+  Sending updates every 30 seconds, next due in 13 seconds
+  Default version control: send version 2, receive version 2
+  Routing Information Sources:
+    Gateway         Distance      Last Update
+    20.0.0.2             120      00:00:12
+  Distance: (default is 120)
+
+Routing Protocol is "ospf 1"
+  Routing Information Sources:
+    Gateway         Distance      Last Update
+    9.9.9.9              110      00:00:12
+"""
+
+BRIEF = """Interface              IP-Address      OK? Method Status                Protocol
+Ethernet0/0            10.0.0.1        YES NVRAM  up                    up
+Ethernet0/2            unassigned      YES NVRAM  administratively down down
+"""
+
+class TestParsers(unittest.TestCase):
+    def test_routes(self):
+        routes = parsers.parse_rip_routes(ROUTES)
+        self.assertEqual([r['network'] for r in routes],
+                         ['10.2.0.0/24', '10.2.0.0/24', '30.0.0.0/8', '172.16.5.0/24', '40.0.0.0/8'])
+        self.assertEqual(routes[1]['next_hop'], '10.0.0.6')
+        self.assertEqual(routes[1]['interface'], 'Serial0/0/1')
+        self.assertEqual(routes[-1]['metric'], '16')
+
+    def test_rip_sources_skip_other_protocols(self):
+        self.assertEqual(parsers.parse_rip_neighbors(PROTOCOLS),
+                         [{'neighbor': '20.0.0.2', 'interface': '', 'uptime': '00:00:12'}])
+        self.assertEqual(parsers.parse_rip_version(PROTOCOLS), '2')
+
+    def test_interfaces_brief(self):
+        interfaces = parsers.parse_interfaces_brief(BRIEF)
+        self.assertEqual(len(interfaces), 2)
+        self.assertEqual(interfaces[1]['status'], 'administratively down')
+
+    def test_registry_normalises_commands(self):
+        self.assertIs(parsers.get_parser('show  ip route RIP'), parsers.parse_rip_routes)
+        self.assertIsNone(parsers.get_parser('show version'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+import poller
+import router_utils as ru
+from fake_router import FakeRouter, Simulator
+from poller import RipPoller, SnapshotCache
+
+class TestRipPoller(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.simulator = Simulator()
+        cls.host, cls.port = cls.simulator.add(FakeRouter(route_count=3))
+        cls.router = {'ip': f'{cls.host}:{cls.port}', 'username': 'admin', 'password': 'admin'}
+
+    @classmethod
+    def tearDownClass(cls):
+        ru.POOL.close_all()
+        cls.simulator.close()
+
+    def setUp(self):
+        self.cache = SnapshotCache()
+        self.errors = []
+
+    def poller(self, routers):
+        return RipPoller(lambda: routers, interval=0, cache=self.cache,
+                         on_error=lambda ip, e: self.errors.append(ip))
+
+    def test_poll_stores_complete_snapshots(self):
+        self.poller([self.router]).poll_once()
+        snapshot = self.cache.get(self.router['ip'])
+        self.assertTrue(poller.is_complete(snapshot))
+        self.assertEqual(len(snapshot['routes']), 3)
+        self.assertEqual(len(snapshot['interfaces']), 4)
+        self.assertEqual(self.errors, [])
+
+    def test_unreachable_router_is_reported_and_not_cached(self):
+        dead = {'ip': '127.0.0.1:1', 'username': 'admin', 'password': 'admin'}
+        self.poller([self.router, dead]).poll_once()
+        self.assertEqual(self.errors, ['127.0.0.1:1'])
+        self.assertIsNone(self.cache.get('127.0.0.1:1'))
+        self.assertIsNotNone(self.cache.get(self.router['ip']))
+
+    def test_deregistered_router_is_dropped(self):
+        self.cache.put('10.0.0.9', {'routes': []})
+        removed = []
+        self.cache.add_remove_listener(removed.append)
+        self.poller([self.router]).poll_once()
+        self.assertEqual(self.cache.ips(), [self.router['ip']])
+        self.assertEqual(removed, ['10.0.0.9'])
+
+    def test_partial_snapshot_is_not_complete(self):
+        self.cache.update('10.0.0.1', routes=[])
+        self.assertFalse(poller.is_complete(self.cache.get('10.0.0.1')))
+        self.assertFalse(poller.is_complete(None))
+
+if __name__ == '__main__':
+    unittest.main()
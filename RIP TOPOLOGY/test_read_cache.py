@@ -0,0 +1,86 @@
+import threading
+import time
+import unittest
+from read_cache import ReadThroughCache
+
+class TestReadThroughCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = ReadThroughCache(max_entries=2, ttls={'show ip route rip': 60})
+        self.calls = 0
+
+    def loader(self, value='routes', delay=0):
+        def load():
+            self.calls += 1
+            time.sleep(delay)
+            return value
+        return load
+
+    def test_hit_within_ttl(self):
+        self.cache.get_or_load('10.0.0.1', 'show ip route rip', self.loader())
+        self.assertEqual(self.cache.get_or_load('10.0.0.1', 'show ip route rip', self.loader()), 'routes')
+        self.assertEqual(self.calls, 1)
+
+    def test_refresh_bypasses_entry(self):
+        self.cache.get_or_load('10.0.0.1', 'show ip route rip', self.loader())
+        self.cache.get_or_load('10.0.0.1', 'show ip route rip', self.loader(), refresh=True)
+        self.assertEqual(self.calls, 2)
+
+    def test_concurrent_callers_share_one_load(self):
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(
+                self.cache.get_or_load('10.0.0.1', 'show ip route rip', self.loader(delay=0.2))))
+            for _ in range(8)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(results, ['routes'] * 8)
+        self.assertEqual(self.calls, 1)
+
+    def test_invalidate_drops_router_entries(self):
+        self.cache.get_or_load('10.0.0.1', 'show ip route rip', self.loader())
+        self.cache.invalidate('10.0.0.1')
+        self.cache.get_or_load('10.0.0.1', 'show ip route rip', self.loader())
+        self.assertEqual(self.calls, 2)
+
+    def test_lru_eviction(self):
+        for ip in ['10.0.0.1', '10.0.0.2', '10.0.0.3']:
+            self.cache.get_or_load(ip, 'show ip route rip', self.loader())
+        self.assertEqual(self.cache.stats()['entries'], 2)
+        self.cache.get_or_load('10.0.0.1', 'show ip route rip', self.loader())
+        self.assertEqual(self.calls, 4)
+
+    def test_failed_load_is_not_cached(self):
+        def fail():
+            self.calls += 1
+            raise ConnectionRefusedError('router down')
+        with self.assertRaises(ConnectionRefusedError):
+            self.cache.get_or_load('10.0.0.1', 'show ip route rip', fail)
+        self.assertEqual(self.cache.stats()['entries'], 0)
+        # The next caller retries the router instead of getting a cached failure
+        self.assertEqual(self.cache.get_or_load('10.0.0.1', 'show ip route rip', self.loader()), 'routes')
+        self.assertEqual(self.calls, 2)
+
+    def test_waiting_callers_share_the_failure(self):
+        errors = []
+        def fail():
+            self.calls += 1
+            time.sleep(0.2)
+            raise ConnectionRefusedError('router down')
+        def call():
+            try:
+                self.cache.get_or_load('10.0.0.1', 'show ip route rip', fail)
+            except ConnectionRefusedError as e:
+                errors.append(e)
+        threads = [threading.Thread(target=call) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual((len(errors), self.calls), (4, 1))
+        self.assertEqual(self.cache.stats()['entries'], 0)
+
+if __name__ == '__main__':
+    unittest.main()
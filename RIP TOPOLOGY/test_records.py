@@ -0,0 +1,87 @@
+import json
+import unittest
+import records
+from records import InterfaceStatus, RipNeighbor, RipRoute
+import router_utils as ru
+
+PARSED_ROUTES = [
+    {'network': '10.1.0.0/16', 'distance': '120', 'metric': '2', 'next_hop': '192.168.1.2', 'interface': 'Ethernet0/0'},
+    {'network': '10.2.0.0/16', 'distance': '120', 'metric': '16', 'next_hop': '192.168.1.2', 'interface': ''},
+]
+
+class TestRecords(unittest.TestCase):
+    def test_routes_keep_the_json_shape(self):
+        routes = ru.process_routes(PARSED_ROUTES, '2024-01-01T00:00:00')
+        self.assertTrue(all(isinstance(route, RipRoute) for route in routes))
+        self.assertEqual(routes[0].prefix, 0x0A010000)
+        self.assertEqual(routes[1].metric, 16)
+        self.assertEqual(json.loads(json.dumps(routes, default=records.json_default)),
+                         [dict(route, last_updated='2024-01-01T00:00:00') for route in PARSED_ROUTES])
+
+    def test_one_timestamp_and_interned_interfaces_per_snapshot(self):
+        routes = ru.process_routes([dict(route) for route in PARSED_ROUTES * 2])
+        self.assertEqual(len({id(route.last_updated) for route in routes}), 1)
+        self.assertIs(routes[0].interface, routes[2].interface)
+
+    def test_dict_style_access(self):
+        route = ru.process_routes(PARSED_ROUTES, 'now')[0]
+        self.assertEqual(route['network'], '10.1.0.0/16')
+        self.assertEqual(route.get('next_hop'), '192.168.1.2')
+        self.assertEqual(route.get('missing', 'x'), 'x')
+        self.assertEqual(dict(route)['metric'], '2')
+        self.assertEqual(route, dict(PARSED_ROUTES[0], last_updated='now'))
+        with self.assertRaises(KeyError):
+            route['missing']
+
+    def test_unreadable_entries_kept_as_dicts(self):
+        odd = {'network': '2001:db8::/32', 'distance': '120', 'metric': '1', 'next_hop': 'fe80::1', 'interface': ''}
+        routes = records.routes([odd, PARSED_ROUTES[0]], 'now')
+        self.assertIs(routes[0], odd)
+        self.assertIsInstance(routes[1], RipRoute)
+        with self.assertRaises(ValueError):
+            records.ip_to_int('10.1')
+
+    def test_neighbors_and_interfaces(self):
+        neighbors = ru.process_neighbors([{'neighbor': '10.0.0.2', 'interface': '', 'uptime': '00:00:12'}], 'now')
+        self.assertIsInstance(neighbors[0], RipNeighbor)
+        self.assertEqual(neighbors[0].to_dict(),
+                         {'neighbor': '10.0.0.2', 'interface': '', 'uptime': '00:00:12', 'last_update': 'now'})
+        interfaces = ru.process_interfaces([
+            {'interface': 'Ethernet0/0', 'ip_address': '10.0.0.1', 'status': 'up', 'proto': 'up'},
+            {'interface': 'Ethernet0/1', 'ip_address': 'unassigned', 'status': 'administratively down',
+             'proto': 'down'}])
+        self.assertIsInstance(interfaces[1], InterfaceStatus)
+        self.assertIsNone(interfaces[1].ip_address)
+        self.assertEqual(interfaces[1]['ip_address'], 'unassigned')
+        self.assertEqual(ru.process_interfaces(None), [])
+
+    def test_compact_snapshot_round_trip(self):
+        snapshot = {'last_updated': 'now', 'routes': ru.process_routes(PARSED_ROUTES, 'now'),
+                    'neighbors': ru.process_neighbors([{'neighbor': '10.0.0.2', 'interface': '', 'uptime': '1'}], 'now'),
+                    'interfaces': []}
+        loaded = records.compact_snapshot(json.loads(json.dumps(snapshot, default=records.json_default)))
+        self.assertEqual(loaded['routes'], snapshot['routes'])
+        self.assertIsInstance(loaded['neighbors'][0], RipNeighbor)
+        self.assertIs(loaded['routes'][0].last_updated, loaded['routes'][1].last_updated)
+
+    def test_dumps_writes_what_json_default_does(self):
+        odd = {'network': '2001:db8::/32', 'distance': '120', 'metric': '1', 'next_hop': 'fe80::1', 'interface': ''}
+        routes = records.routes(PARSED_ROUTES + [odd], 'now "quoted"')
+        routes[0].interface = 'Ethernet0/0 "uplink" \u00e9'
+        snapshot = {'routes': routes, 'neighbors': [], 'interfaces': ru.process_interfaces(
+            [{'interface': 'Ethernet0/1', 'ip_address': 'unassigned', 'status': 'up', 'proto': 'up'}])}
+        for value in (snapshot, {'router': {'10.0.0.1': snapshot}}, [routes[1], {'nested': routes[0]}]):
+            self.assertEqual(json.loads(records.dumps(value)),
+                             json.loads(json.dumps(value, default=records.json_default)))
+        self.assertEqual(json.loads(records.dumps(routes, separators=(',', ':'))),
+                         json.loads(json.dumps(routes, default=records.json_default)))
+
+    def test_dumps_payload_matching_the_marker(self):
+        value = {'note': records._MARKER, 'routes': records.routes(PARSED_ROUTES, 'now')}
+        self.assertEqual(json.loads(records.dumps(value))['note'], records._MARKER)
+        self.assertEqual(json.loads(records.dumps(value))['routes'][1]['metric'], '16')
+        with self.assertRaises(TypeError):
+            records.dumps({'x': object()})
+
+if __name__ == '__main__':
+    unittest.main()
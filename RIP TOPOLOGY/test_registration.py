@@ -0,0 +1,73 @@
+import asyncio
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+import registration
+from fake_router import FakeRouter, Simulator
+from inventory import JsonInventory
+from registration import RegistrationValidator
+
+class TestRegistrationValidator(unittest.TestCase):
+    def setUp(self):
+        self.inventory = JsonInventory(os.path.join(tempfile.mkdtemp(), 'routers.json'))
+        self.in_flight = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    async def probe(self, ip, username, password, timeout):
+        with self.lock:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        await asyncio.sleep(0.05)
+        with self.lock:
+            self.in_flight -= 1
+        if ip.startswith('10.9.'):
+            raise ConnectionRefusedError('Connection refused')
+        return {'login_seconds': 0.05, 'rip_version': '2'}
+
+    def wait_until_done(self, count):
+        for _ in range(200):
+            if sum(r['status'] != 'pending' for r in self.inventory.all()) == count:
+                return
+            threading.Event().wait(0.01)
+        self.fail('validation did not finish')
+
+    def test_pending_then_validated_with_bounded_concurrency(self):
+        validator = RegistrationValidator(self.inventory, concurrency=5)
+        routers = [{'ip': f'10.0.0.{i}', 'username': 'admin', 'password': 'admin'} for i in range(20)]
+        routers.append({'ip': '10.9.0.1', 'username': 'admin', 'password': 'admin'})
+        with mock.patch.object(registration.ar, 'probe', self.probe):
+            records = validator.register(routers)
+            self.assertEqual({r['status'] for r in records}, {'pending'})
+            self.wait_until_done(21)
+        self.assertEqual(self.peak, 5)
+        status = registration.status_of(self.inventory.get('10.0.0.3'))
+        self.assertEqual(status['status'], 'reachable')
+        self.assertEqual(status['validation']['rip_version'], '2')
+        failed = registration.status_of(self.inventory.get('10.9.0.1'))
+        self.assertEqual((failed['status'], failed['validation']['error']), ('unreachable', 'Connection refused'))
+
+    def test_wrong_password_is_auth_failed(self):
+        with Simulator() as simulator:
+            host, port = simulator.add(FakeRouter())
+            validator = RegistrationValidator(self.inventory, timeout=10)
+            validator.register([{'ip': f'{host}:{port}', 'username': 'admin', 'password': 'wrong'}])
+            self.wait_until_done(1)
+        status = registration.status_of(self.inventory.get(f'{host}:{port}'))
+        self.assertEqual(status['status'], 'auth_failed')
+        self.assertEqual(status['validation']['error'], f'Router {host}:{port} rejected the username or password')
+
+    def test_newer_registration_wins(self):
+        validator = RegistrationValidator(self.inventory)
+        stale = {'ip': '10.0.0.1', 'username': 'admin', 'password': 'old', 'registered_at': 'before'}
+        self.inventory.put(dict(stale, registered_at='after', status='pending'))
+        validator._record(stale, 'reachable', {})
+        self.assertEqual(self.inventory.get('10.0.0.1')['status'], 'pending')
+
+    def test_legacy_records_are_unknown(self):
+        self.assertEqual(registration.status_of({'ip': '10.0.0.1'})['status'], 'unknown')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+from route_diff import RouteTracker
+
+def route(network, metric='1', next_hop='10.0.0.2'):
+    return {'network': network, 'distance': '120', 'metric': metric, 'next_hop': next_hop,
+            'interface': 'Ethernet0/0', 'last_updated': 'ignored'}
+
+class TestRouteTracker(unittest.TestCase):
+    def setUp(self):
+        self.tracker = RouteTracker(max_deltas=2)
+        self.tracker.observe('10.0.0.1', [route('1.0.0.0/8'), route('2.0.0.0/8')])
+        self.base = self.tracker.version('10.0.0.1')
+
+    def test_unchanged_table_keeps_version(self):
+        changes = self.tracker.observe('10.0.0.1', [route('2.0.0.0/8'), route('1.0.0.0/8')])
+        self.assertEqual(changes, [])
+        self.assertEqual(self.tracker.version('10.0.0.1'), self.base)
+        self.assertEqual(self.tracker.since('10.0.0.1', self.base), [])
+
+    def test_add_withdraw_and_change(self):
+        changes = self.tracker.observe('10.0.0.1', [route('1.0.0.0/8', metric='3'), route('3.0.0.0/8')])
+        self.assertEqual([(c['type'], c['network']) for c in changes],
+                         [('changed', '1.0.0.0/8'), ('withdrawn', '2.0.0.0/8'), ('added', '3.0.0.0/8')])
+        self.assertEqual(changes[0]['previous'][0]['metric'], '1')
+        self.assertEqual(changes[0]['routes'][0]['metric'], '3')
+        self.assertEqual(self.tracker.version('10.0.0.1'), self.base + 1)
+
+    def test_since_folds_deltas(self):
+        self.tracker.observe('10.0.0.1', [route('1.0.0.0/8'), route('2.0.0.0/8'), route('3.0.0.0/8')])
+        self.tracker.observe('10.0.0.1', [route('1.0.0.0/8', next_hop='10.0.0.3'), route('2.0.0.0/8')])
+        changes = self.tracker.since('10.0.0.1', self.base)
+        # 3.0.0.0/8 came and went, only the next hop change remains
+        self.assertEqual([(c['type'], c['network']) for c in changes], [('changed', '1.0.0.0/8')])
+
+    def test_unknown_versions_need_full_table(self):
+        for metric in '234':
+            self.tracker.observe('10.0.0.1', [route('1.0.0.0/8', metric=metric)])
+        self.assertIsNone(self.tracker.since('10.0.0.1', self.base))
+        self.assertIsNone(self.tracker.since('10.0.0.1', self.base + 10))
+        self.assertIsNone(self.tracker.since('10.0.0.9', self.base))
+        self.assertEqual(len(self.tracker.since('10.0.0.1', self.base + 1)), 1)
+
+    def test_assigned_versions_match_another_process(self):
+        other = RouteTracker()
+        other.assign_version('10.0.0.1', self.base + 500)
+        other.observe('10.0.0.1', [route('1.0.0.0/8'), route('2.0.0.0/8')])
+        self.assertEqual(other.version('10.0.0.1'), self.base + 500)
+        # Same table under a newer version, nothing changed for clients of this process
+        other.assign_version('10.0.0.1', self.base + 900)
+        self.assertEqual(other.observe('10.0.0.1', [route('1.0.0.0/8'), route('2.0.0.0/8')]), [])
+        self.assertEqual(other.since('10.0.0.1', self.base + 500), [])
+        other.assign_version('10.0.0.1', self.base + 1000)
+        other.observe('10.0.0.1', [route('1.0.0.0/8')])
+        self.assertEqual(other.version('10.0.0.1'), self.base + 1000)
+        self.assertEqual([c['type'] for c in other.since('10.0.0.1', self.base + 500)], ['withdrawn'])
+
+if __name__ == '__main__':
+    unittest.main()
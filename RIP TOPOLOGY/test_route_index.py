@@ -0,0 +1,72 @@
+import random
+import unittest
+from records import ip_to_int, prefix_to_int
+from route_index import PrefixTrie, RouteIndex, MASKS
+
+def route(network, next_hop, metric='1'):
+    return {'network': network, 'distance': '120', 'metric': metric, 'next_hop': next_hop, 'interface': ''}
+
+class TestPrefixTrie(unittest.TestCase):
+    def test_longest_match(self):
+        trie = PrefixTrie()
+        for network in ['0.0.0.0/0', '10.0.0.0/8', '10.3.0.0/16', '10.3.4.0/24', '10.3.4.128/25']:
+            trie.insert(*prefix_to_int(network), network)
+        self.assertEqual(trie.lookup(ip_to_int('10.3.4.5')), '10.3.4.0/24')
+        self.assertEqual(trie.lookup(ip_to_int('10.3.4.200')), '10.3.4.128/25')
+        self.assertEqual(trie.lookup(ip_to_int('10.3.9.1')), '10.3.0.0/16')
+        self.assertEqual(trie.lookup(ip_to_int('11.0.0.1')), '0.0.0.0/0')
+        self.assertTrue(trie.delete(*prefix_to_int('10.3.4.0/24')))
+        self.assertFalse(trie.delete(*prefix_to_int('10.3.4.0/24')))
+        self.assertEqual(trie.lookup(ip_to_int('10.3.4.5')), '10.3.0.0/16')
+        self.assertEqual(len(trie), 4)
+
+    def test_matches_linear_scan(self):
+        rng = random.Random(7)
+        prefixes = {}
+        for _ in range(2000):
+            length = rng.randint(8, 32)
+            value = rng.getrandbits(32) & MASKS[length]
+            prefixes[(value, length)] = (value, length)
+        trie = PrefixTrie()
+        for key in prefixes:
+            trie.insert(*key, key)
+        for key in list(prefixes)[::3]:
+            trie.delete(*key)
+            del prefixes[key]
+
+        def scan(address):
+            found = [key for key in prefixes if address & MASKS[key[1]] == key[0]]
+            return max(found, key=lambda key: key[1]) if found else None
+
+        for value, length in list(prefixes)[:300]:
+            address = value | rng.getrandbits(32 - length) if length < 32 else value
+            self.assertEqual(trie.lookup(address), scan(address))
+        for _ in range(300):
+            address = rng.getrandbits(32)
+            self.assertEqual(trie.lookup(address), scan(address))
+
+class TestRouteIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = RouteIndex()
+        # r1 -> r2 -> r3, 9.1.0.0/16 lives behind r3
+        self.index.on_snapshot('r1', {'routes': [route('9.0.0.0/8', '10.0.12.2')],
+                                      'interfaces': [{'ip_address': '10.0.12.1'}]})
+        self.index.on_snapshot('r2', {'routes': [route('9.1.0.0/16', '10.0.23.3')],
+                                      'interfaces': [{'ip_address': '10.0.12.2'}]})
+        self.index.on_snapshot('r3', {'routes': [], 'interfaces': [{'ip_address': '10.0.23.3'}, {'ip_address': '9.1.2.3'}]})
+
+    def test_trace(self):
+        trace = self.index.trace('r1', '9.1.2.3')
+        self.assertEqual(trace['status'], 'delivered')
+        self.assertEqual([hop['router'] for hop in trace['hops']], ['r1', 'r2', 'r3'])
+        self.assertEqual(self.index.trace('r1', '9.2.0.1')['status'], 'no_route')
+
+    def test_updates_from_polls(self):
+        self.assertEqual(self.index.lookup('r2', '9.1.2.3')['network'], '9.1.0.0/16')
+        self.index.on_snapshot('r2', {'routes': [route('9.1.2.0/24', '10.0.23.3', '2')]})
+        self.assertEqual(self.index.lookup('r2', '9.1.9.9'), None)
+        self.assertEqual(self.index.lookup('r2', '9.1.2.3')['routes'][0]['metric'], '2')
+        self.assertEqual(self.index.size(), 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+from contextlib import contextmanager
+import time
+import unittest
+from unittest import mock
+from router_utils import DeferredSaver, RouterConnection
+from scheduler import RouterBusy
+import router_utils as ru
+
+def connection(ip='10.0.0.1', status='success'):
+    conn = mock.Mock(router_ip=ip)
+    conn.save_config.return_value = {'status': status, 'message': 'saved'}
+    return conn
+
+class TestDeferredSaver(unittest.TestCase):
+    def test_changes_within_the_window_share_one_save(self):
+        saver = DeferredSaver(0.05)
+        first, second = connection(), connection()
+        saver.schedule(first)
+        saver.schedule(second)
+        time.sleep(0.2)
+        first.save_config.assert_called_once()
+        second.save_config.assert_not_called()
+        # The window is over, the next change gets a save of its own
+        saver.schedule(second)
+        time.sleep(0.2)
+        second.save_config.assert_called_once()
+
+    def test_routers_are_saved_separately(self):
+        saver = DeferredSaver(0.05)
+        a, b = connection('10.0.0.1'), connection('10.0.0.2')
+        saver.schedule(a)
+        saver.schedule(b)
+        time.sleep(0.2)
+        a.save_config.assert_called_once()
+        b.save_config.assert_called_once()
+
+    def test_flush_saves_pending_routers_now(self):
+        saver = DeferredSaver(60)
+        conn = connection()
+        saver.schedule(conn)
+        saver.flush()
+        conn.save_config.assert_called_once()
+        saver.flush()
+        conn.save_config.assert_called_once()
+
+    def test_failed_save_is_logged_not_raised(self):
+        saver = DeferredSaver(60)
+        conn = connection(status='error')
+        saver.schedule(conn)
+        with mock.patch('builtins.print') as printed:
+            saver.flush()
+        self.assertIn('10.0.0.1', printed.call_args[0][0])
+
+class TestRunBatch(unittest.TestCase):
+    COMMANDS = ['show ip route rip', 'show ip protocols', 'show ip interface brief']
+
+    def setUp(self):
+        self.conn = RouterConnection('10.0.0.1', 'admin', 'admin')
+        self.logins = 0
+
+    def run_batch(self, outputs, commands=COMMANDS):
+        @contextmanager
+        def session(kind=ru.READ):
+            self.logins += 1
+            yield mock.Mock()
+        with mock.patch.object(self.conn, 'session', session), \
+                mock.patch.object(ru, 'send_parsed', side_effect=outputs):
+            return self.conn.run_batch(commands)
+
+    def test_every_command_over_one_session(self):
+        results = self.run_batch([[], 'parsed', 'rows'])
+        self.assertEqual([r['status'] for r in results], ['success'] * 3)
+        self.assertEqual([r['output'] for r in results], [[], 'parsed', 'rows'])
+        self.assertEqual(self.logins, 1)
+
+    def test_failed_command_skips_the_rest(self):
+        results = self.run_batch(['parsed', OSError('Socket is closed'), 'never read'])
+        self.assertEqual([r['status'] for r in results], ['success', 'error', 'skipped'])
+        self.assertEqual(results[1], {'command': 'show ip protocols', 'status': 'error', 'message': 'Socket is closed'})
+        self.assertEqual([r['command'] for r in results], self.COMMANDS)
+
+    def test_failed_login_fails_the_first_command(self):
+        with mock.patch.object(self.conn, 'session', side_effect=ConnectionRefusedError('refused')):
+            results = self.conn.run_batch(self.COMMANDS)
+        self.assertEqual([r['status'] for r in results], ['error', 'skipped', 'skipped'])
+
+    def test_busy_router_is_not_a_command_error(self):
+        with mock.patch.object(self.conn, 'session', side_effect=RouterBusy('all sessions in use')):
+            with self.assertRaises(RouterBusy):
+                self.conn.run_batch(self.COMMANDS)
+
+    def test_only_show_commands(self):
+        with self.assertRaises(ValueError):
+            self.run_batch([], ['show ip route', 'reload'])
+        self.assertEqual(self.logins, 0)
+
+if __name__ == '__main__':
+    unittest.main()
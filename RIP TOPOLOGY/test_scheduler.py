@@ -0,0 +1,92 @@
+import threading
+import time
+import unittest
+from scheduler import RouterScheduler, RouterBusy, READ, WRITE
+
+class TestRouterScheduler(unittest.TestCase):
+    def queue_behind(self, scheduler, host, requests):
+        """Hold the only slot, queue requests in order, then release and record who ran"""
+        order = []
+        scheduler.acquire(host)
+        threads = []
+        for kind, client in requests:
+            def run(kind=kind, client=client):
+                with scheduler.slot(host, kind, client):
+                    order.append((kind, client))
+            thread = threading.Thread(target=run)
+            thread.start()
+            threads.append(thread)
+            # Wait until it is queued so the queue order is deterministic
+            while scheduler.stats()[host]['queued'] < len(threads):
+                time.sleep(0.001)
+        scheduler.release(host)
+        for thread in threads:
+            thread.join(5)
+        return order
+
+    def test_limits_sessions_per_router(self):
+        scheduler = RouterScheduler(max_sessions=2)
+        active = []
+        peak = []
+        lock = threading.Lock()
+
+        def work(host):
+            with scheduler.slot(host):
+                with lock:
+                    active.append(host)
+                    peak.append(active.count(host))
+                time.sleep(0.02)
+                with lock:
+                    active.remove(host)
+
+        threads = [threading.Thread(target=work, args=(host,)) for host in ['r1', 'r2'] * 4]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(max(peak), 2)
+        self.assertEqual(scheduler.stats(), {})
+
+    def test_reads_go_before_writes(self):
+        scheduler = RouterScheduler(max_sessions=1)
+        order = self.queue_behind(scheduler, 'r1', [(WRITE, 'a'), (READ, 'b'), (READ, 'c')])
+        self.assertEqual(order, [(READ, 'b'), (READ, 'c'), (WRITE, 'a')])
+
+    def test_old_writes_are_not_starved(self):
+        scheduler = RouterScheduler(max_sessions=1, write_aging=0)
+        order = self.queue_behind(scheduler, 'r1', [(WRITE, 'a'), (READ, 'b')])
+        self.assertEqual(order, [(WRITE, 'a'), (READ, 'b')])
+
+    def test_clients_take_turns(self):
+        scheduler = RouterScheduler(max_sessions=1)
+        order = self.queue_behind(scheduler, 'r1', [(READ, 'a'), (READ, 'a'), (READ, 'a'), (READ, 'b')])
+        self.assertEqual([client for _, client in order], ['a', 'b', 'a', 'a'])
+
+    def test_full_queue_and_timeout_raise_busy(self):
+        scheduler = RouterScheduler(max_sessions=1, max_queued=0)
+        scheduler.acquire('r1')
+        with self.assertRaises(RouterBusy):
+            scheduler.acquire('r1')
+        scheduler = RouterScheduler(max_sessions=1, timeout=0.05)
+        scheduler.acquire('r1')
+        with self.assertRaisesRegex(RouterBusy, 'Timed out'):
+            scheduler.acquire('r1')
+        self.assertEqual(scheduler.stats(), {'r1': {'active': 1, 'queued': 0}})
+        scheduler.release('r1')
+        self.assertEqual(scheduler.stats(), {})
+
+    def test_busy_router_is_not_reported_as_empty(self):
+        import router_utils as ru
+        scheduler = RouterScheduler(max_sessions=1, max_queued=0)
+        conn = ru.RouterConnection('10.0.0.1', 'admin', 'admin', pool=None, scheduler=scheduler)
+        scheduler.acquire('10.0.0.1')
+        try:
+            for call in (conn.get_rip_routes, conn.get_rip_neighbors, lambda: conn.set_rip_version('2'),
+                         lambda: conn.run_batch(['show ip route rip'])):
+                with self.assertRaises(RouterBusy):
+                    call()
+        finally:
+            scheduler.release('10.0.0.1')
+
+if __name__ == '__main__':
+    unittest.main()
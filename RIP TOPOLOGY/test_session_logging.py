@@ -0,0 +1,60 @@
+import threading
+import unittest
+import session_logging
+from session_logging import RouterSessionLog
+
+class FakeWriter:
+    def __init__(self):
+        self.records = []
+
+    def write(self, router_ip, request_id, text, level=20):
+        self.records.append((request_id, text, level))
+
+class TestRouterSessionLog(unittest.TestCase):
+    def setUp(self):
+        self.writer = FakeWriter()
+
+    def test_full_writes_each_flush_with_request_id(self):
+        log = RouterSessionLog('10.0.0.1', 'full', self.writer, {'password': 's3cret'})
+        log.begin('req-1')
+        log.write('Password: s3cret\nR1#')
+        log.flush()
+        log.begin('req-2')
+        log.write('show ip route rip')
+        log.close()
+        self.assertEqual([(r[0], r[1]) for r in self.writer.records],
+                         [('req-1', 'Password: ********\nR1#'), ('req-2', 'show ip route rip')])
+
+    def test_errors_level_only_writes_failed_sessions(self):
+        log = RouterSessionLog('10.0.0.1', 'errors', self.writer)
+        log.begin('req-1')
+        log.write('fine')
+        log.flush()
+        log.begin('req-2')
+        log.write('broken')
+        log.fail(TimeoutError('no prompt'))
+        self.assertEqual(len(self.writer.records), 1)
+        request_id, text, level = self.writer.records[0]
+        self.assertEqual(request_id, 'req-2')
+        self.assertTrue(text.startswith('broken'))
+        self.assertIn('TimeoutError: no prompt', text)
+
+    def test_off_level(self):
+        self.assertIsNone(session_logging.for_router('10.0.0.1', level='off'))
+        with self.assertRaises(ValueError):
+            session_logging.for_router('10.0.0.1', level='verbose')
+
+    def test_bind_carries_request_id_to_threads(self):
+        seen = []
+        token = session_logging.REQUEST_ID.set('req-9')
+        try:
+            worker = session_logging.bind(lambda: seen.append(session_logging.REQUEST_ID.get()))
+        finally:
+            session_logging.REQUEST_ID.reset(token)
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+        self.assertEqual(seen, ['req-9'])
+
+if __name__ == '__main__':
+    unittest.main()
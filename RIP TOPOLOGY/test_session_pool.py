@@ -0,0 +1,71 @@
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from scheduler import RouterBusy
+from session_pool import SessionPool
+from shared_state import SessionGate
+
+DEVICE = {'device_type': 'cisco_ios_telnet', 'host': '192.168.1.1', 'username': 'admin', 'password': 'admin'}
+
+class TestSessionPool(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch('session_pool.ConnectHandler', side_effect=lambda **kw: mock.MagicMock())
+        self.connect_handler = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.pool = SessionPool(keepalive_interval=0)
+
+    def test_session_is_reused(self):
+        with self.pool.session(DEVICE) as first:
+            pass
+        with self.pool.session(DEVICE) as second:
+            pass
+        self.assertIs(first, second)
+        self.assertEqual(self.connect_handler.call_count, 1)
+
+    def test_dead_session_is_replaced(self):
+        with self.pool.session(DEVICE) as first:
+            first.is_alive.return_value = False
+        with self.pool.session(DEVICE) as second:
+            pass
+        self.assertIsNot(first, second)
+        first.disconnect.assert_called_once()
+        self.assertEqual(self.pool.stats()['open'], 1)
+
+    def test_failed_request_discards_session(self):
+        with self.assertRaises(RuntimeError):
+            with self.pool.session(DEVICE) as conn:
+                raise RuntimeError('command failed')
+        conn.disconnect.assert_called_once()
+        self.assertEqual(self.pool.stats(), {'open': 0, 'idle': 0, 'routers': 0})
+
+    def test_idle_sessions_are_evicted(self):
+        self.pool.idle_timeout = 0
+        with self.pool.session(DEVICE) as conn:
+            pass
+        self.pool.evict_idle()
+        conn.disconnect.assert_called_once()
+        self.assertEqual(self.pool.stats()['open'], 0)
+
+    def test_gate_limits_sessions_across_pools(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        # One pool per worker process, one VTY line between them
+        other = SessionPool(keepalive_interval=0, acquire_timeout=0.05,
+                            gate=SessionGate(directory, slots=1, retry=0.01))
+        self.pool.gate = SessionGate(directory, slots=1, retry=0.01)
+        with self.pool.session(DEVICE):
+            pass
+        # The idle session still holds the line
+        with self.assertRaises(RouterBusy):
+            with other.session(DEVICE):
+                pass
+        self.assertEqual(other.stats()['open'], 0)
+        self.pool.idle_timeout = 0
+        self.pool.evict_idle()
+        with other.session(DEVICE):
+            pass
+        self.assertEqual(self.connect_handler.call_count, 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from api_auth import Authenticator, AuthError
+from jobs import JobManager
+from poller import SnapshotCache
+from route_diff import RouteTracker
+from scheduler import RouterBusy
+from shared_state import SessionGate, SharedState
+import jwt
+
+def snapshot(*networks, metric='1'):
+    return {'routes': [{'network': n, 'distance': '120', 'metric': metric, 'next_hop': '10.0.0.2',
+                        'interface': 'Ethernet0/0', 'last_updated': 'ignored'} for n in networks],
+            'neighbors': [], 'last_updated': 'now'}
+
+class Worker:
+    """One server process: its own cache, route versions and authenticator on the shared file"""
+
+    def __init__(self, path):
+        self.cache = SnapshotCache()
+        self.routes = RouteTracker()
+        self.cache.add_listener(self.routes.on_snapshot)
+        self.auth = Authenticator('secret')
+        self.seen = []
+        self.cache.add_listener(lambda ip, snapshot: self.seen.append(('snapshot', ip)))
+        self.shared = SharedState(path, self.cache, self.routes, self.auth,
+                                  poll_error_listener=lambda ip, error: self.seen.append(('poll_error', ip, str(error))))
+
+    def sync(self):
+        self.shared.flush()
+        self.shared.pull()
+
+class TestSharedState(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'shared.db')
+        self.a = Worker(self.path)
+        self.b = Worker(self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_snapshots_replayed_with_the_same_version(self):
+        self.a.cache.put('10.0.0.1', snapshot('1.0.0.0/8'))
+        self.a.cache.put('10.0.0.1', snapshot('1.0.0.0/8', '2.0.0.0/8'))
+        self.a.sync()
+        self.b.sync()
+        self.assertEqual(self.b.cache.get('10.0.0.1')['routes'][1]['network'], '2.0.0.0/8')
+        self.assertEqual(self.b.routes.version('10.0.0.1'), self.a.routes.version('10.0.0.1'))
+        self.assertEqual(self.b.routes.etag('10.0.0.1'), self.a.routes.etag('10.0.0.1'))
+        self.assertEqual(len(self.b.routes.since('10.0.0.1', self.a.routes.version('10.0.0.1') - 1)), 1)
+
+        # Whichever worker fetched last, versions keep counting up everywhere
+        self.b.cache.put('10.0.0.1', snapshot('2.0.0.0/8'))
+        self.b.sync()
+        self.a.sync()
+        self.assertEqual(self.a.routes.version('10.0.0.1'), self.b.routes.version('10.0.0.1'))
+        self.assertEqual([r['network'] for r in self.a.cache.get('10.0.0.1')['routes']], ['2.0.0.0/8'])
+
+    def test_own_changes_not_replayed(self):
+        self.a.cache.put('10.0.0.1', snapshot('1.0.0.0/8'))
+        version = self.a.routes.version('10.0.0.1')
+        self.a.sync()
+        self.a.sync()
+        self.assertEqual(self.a.routes.version('10.0.0.1'), version)
+
+    def test_removal(self):
+        self.a.cache.put('10.0.0.1', snapshot('1.0.0.0/8'))
+        self.a.sync()
+        self.b.sync()
+        self.b.cache.remove('10.0.0.1')
+        self.b.sync()
+        self.a.sync()
+        self.assertIsNone(self.a.cache.get('10.0.0.1'))
+
+    def test_poll_errors_reach_other_workers_in_order(self):
+        self.a.shared.on_poll_error('10.0.0.1', OSError('timed out'))
+        self.a.cache.put('10.0.0.1', snapshot('1.0.0.0/8'))
+        self.a.sync()
+        self.b.sync()
+        self.assertEqual(self.b.seen, [('poll_error', '10.0.0.1', 'timed out'), ('snapshot', '10.0.0.1')])
+        self.assertEqual(self.a.seen, [('snapshot', '10.0.0.1')])
+        # A worker started later loads the snapshot but does not replay old failures
+        late = Worker(self.path)
+        late.shared.load()
+        late.sync()
+        self.assertEqual(late.seen, [('snapshot', '10.0.0.1')])
+
+    def test_new_worker_loads_latest_snapshots(self):
+        self.a.cache.put('10.0.0.1', snapshot('1.0.0.0/8'))
+        self.a.cache.put('10.0.0.1', snapshot('3.0.0.0/8'))
+        self.a.cache.put('10.0.0.2', snapshot('2.0.0.0/8'))
+        self.a.cache.remove('10.0.0.2')
+        self.a.sync()
+        c = Worker(self.path)
+        c.shared.load()
+        self.assertEqual(c.cache.get('10.0.0.1')['routes'][0]['network'], '3.0.0.0/8')
+        self.assertEqual(c.routes.version('10.0.0.1'), self.a.routes.version('10.0.0.1'))
+        self.assertIsNone(c.cache.get('10.0.0.2'))
+
+    def test_compact_keeps_latest_snapshot(self):
+        for metric in '123':
+            self.a.cache.put('10.0.0.1', snapshot('1.0.0.0/8', metric=metric))
+        self.a.sync()
+        self.a.shared.compact(now=time.time() + 3600)
+        rows = self.a.shared._connect().execute('SELECT COUNT(*) FROM changes').fetchone()[0]
+        self.assertEqual(rows, 1)
+
+    def test_job_status_from_another_worker(self):
+        jobs_a = JobManager(store=self.a.shared)
+        jobs_b = JobManager(store=self.b.shared)
+        job = jobs_a.submit('rip_config', [{'ip': '10.0.0.1'}], lambda router: {'status': 'ok'})
+        for _ in range(100):
+            status = jobs_b.status(job.id)
+            if status and status['status'] == 'done':
+                break
+            time.sleep(0.01)
+        self.assertEqual(status['status'], 'done')
+        self.assertEqual(status['routers']['10.0.0.1'], {'status': 'ok'})
+        self.assertIsNone(jobs_b.status('missing'))
+
+    def test_revocation_reaches_other_workers(self):
+        token = jwt.encode({'username': 'admin', 'exp': time.time() + 600}, 'secret', algorithm='HS256')
+        self.b.auth.verify_token(token)
+        self.a.auth.revoke(token)
+        self.b.sync()
+        with self.assertRaises(AuthError):
+            self.b.auth.verify_token(token)
+
+    def test_leader_lock(self):
+        self.assertTrue(self.a.shared.try_lead())
+        self.assertFalse(self.b.shared.try_lead())
+        self.a.shared.stop()
+        self.assertTrue(self.b.shared.try_lead())
+        self.b.shared.stop()
+
+class TestSessionGate(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        # Two workers, flocks on separately opened files conflict even inside one process
+        self.a = SessionGate(self.dir, slots=2, retry=0.01)
+        self.b = SessionGate(self.dir, slots=2, retry=0.01)
+
+    def test_slots_are_shared_between_workers(self):
+        first = self.a.acquire('10.0.0.1:23', timeout=0)
+        second = self.b.acquire('10.0.0.1:23', timeout=0)
+        with self.assertRaises(RouterBusy):
+            self.a.acquire('10.0.0.1:23', timeout=0.05)
+        # Other routers have their own slots
+        SessionGate.release(self.b.acquire('10.0.0.2:23', timeout=0))
+        SessionGate.release(first)
+        SessionGate.release(self.b.acquire('10.0.0.1:23', timeout=0))
+        SessionGate.release(second)
+
+if __name__ == '__main__':
+    unittest.main()
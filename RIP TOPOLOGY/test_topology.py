@@ -0,0 +1,78 @@
+import os
+import json
+import unittest
+import gns3
+import router_utils as ru
+from topology import TopologyGraph
+
+PROJECT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Rip-to-Rest-main1', 'RIP TOPOLOGY.json')
+
+def snapshot(addresses, neighbors):
+    return {
+        'interfaces': [{'interface': f'Ethernet0/{i}', 'ip_address': a, 'status': 'up', 'proto': 'up'}
+                       for i, a in enumerate(addresses)],
+        'neighbors': [{'neighbor': n, 'interface': '', 'uptime': ''} for n in neighbors]
+    }
+
+class TestTopologyGraph(unittest.TestCase):
+    def setUp(self):
+        self.graph = TopologyGraph()
+
+    def render(self, routers):
+        version, body = self.graph.render(routers)
+        data = json.loads(body)
+        nodes = [n['id'] for n in data['nodes']]
+        edges = {(nodes[e[0]], nodes[e[1]]): dict(zip(data['edge_fields'], e)) for e in data['edges']}
+        return version, data, edges
+
+    def test_gns3_links(self):
+        self.graph.load_gns3(gns3.load_project(PROJECT))
+        _, data, edges = self.render([{'ip': '10.0.0.1', 'name': 'IOU1'}])
+        self.assertEqual(data['summary']['nodes'], 6)
+        self.assertEqual(len(edges), 5)
+        edge = edges.get(('10.0.0.1', 'IOU2')) or edges.get(('IOU2', '10.0.0.1'))
+        self.assertEqual(edge['source'], 'gns3')
+        self.assertEqual(edge['state'], 'unknown')
+
+    def test_neighbors_resolve_to_routers(self):
+        routers = [{'ip': '10.0.0.1'}, {'ip': '10.0.0.2'}]
+        self.graph.on_snapshot('10.0.0.1', snapshot(['20.0.0.1'], ['20.0.0.2', '30.0.0.9']))
+        _, _, edges = self.render(routers)
+        self.assertEqual(edges[('10.0.0.1', '20.0.0.2')]['state'], 'up')
+
+        self.graph.on_snapshot('10.0.0.2', snapshot(['20.0.0.2'], []))
+        _, data, edges = self.render(routers)
+        self.assertEqual(edges[('10.0.0.1', '10.0.0.2')]['state'], 'one_way')
+        self.assertIn(('10.0.0.1', '30.0.0.9'), edges)
+
+        self.graph.on_snapshot('10.0.0.2', snapshot(['20.0.0.2'], ['20.0.0.1']))
+        _, _, edges = self.render(routers)
+        self.assertEqual(edges[('10.0.0.1', '10.0.0.2')]['state'], 'up')
+
+    def test_render_cached_until_change(self):
+        routers = [{'ip': '10.0.0.1'}]
+        self.graph.on_snapshot('10.0.0.1', snapshot(['20.0.0.1'], ['20.0.0.2']))
+        first = self.graph.render(routers)
+        self.graph.on_snapshot('10.0.0.1', snapshot(['20.0.0.1'], ['20.0.0.2']))
+        self.assertIs(self.graph.render(routers), first)
+        self.graph.on_snapshot('10.0.0.1', snapshot(['20.0.0.1'], []))
+        self.assertGreater(self.graph.render(routers)[0], first[0])
+
+class TestGns3Routers(unittest.TestCase):
+    def test_routers_by_console_endpoint(self):
+        routers = list(gns3.parse_routers(gns3.load_project(PROJECT)))
+        # VPCS hosts are not routers
+        self.assertEqual([(r['name'], r['ip']) for r in routers],
+                         [('IOU1', '127.0.0.1:5008'), ('IOU2', '127.0.0.1:5009'),
+                          ('IOU3', '127.0.0.1:5010'), ('IOU4', '127.0.0.1:5011')])
+        routers = list(gns3.parse_routers(gns3.load_project(PROJECT), host='fe80::1'))
+        self.assertEqual(routers[0]['ip'], '[fe80::1]:5008')
+
+    def test_split_endpoint(self):
+        self.assertEqual(ru.split_endpoint('10.0.0.1'), ('10.0.0.1', ru.TELNET_PORT))
+        self.assertEqual(ru.split_endpoint('127.0.0.1:5008'), ('127.0.0.1', 5008))
+        self.assertEqual(ru.split_endpoint('[fe80::1]:5008'), ('fe80::1', 5008))
+        self.assertEqual(ru.split_endpoint('fe80::1'), ('fe80::1', ru.TELNET_PORT))
+
+if __name__ == '__main__':
+    unittest.main()
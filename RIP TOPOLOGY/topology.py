@@ -0,0 +1,162 @@
+from typing import Dict, List, Optional, Tuple
+import threading
+import json
+import time
+import gns3
+
+# Edges are sent as arrays in this field order with a and b indexing the node list
+EDGE_FIELDS = ["a", "b", "state", "a_port", "b_port", "source"]
+
+
+class TopologyGraph:
+    """Fleet adjacency graph built from the GNS3 project links and live RIP neighbors.
+
+    Polls only touch the reporting router's entries and bump the version when they
+    change anything, the JSON is rebuilt once per version however often it is read."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Starts at the wall clock in ms so an ETag from before a restart never matches
+        self.version = time.time_ns() // 1_000_000
+        self._gns3_nodes: Dict[str, str] = {}
+        self._gns3_links: List[Dict] = []
+        self._addresses: Dict[str, frozenset] = {}
+        self._owners: Dict[str, str] = {}
+        self._neighbors: Dict[str, frozenset] = {}
+        self._polled = set()
+        self._signature: Tuple = ()
+        self._rendered: Optional[Tuple[int, str]] = None
+
+    def _changed(self):
+        self.version += 1
+        self._rendered = None
+
+    def load_gns3(self, project: Dict):
+        """Use the nodes and links of a GNS3 project as the physical topology"""
+        nodes = {node["name"]: node["node_type"] for node in gns3.parse_nodes(project)}
+        links = gns3.parse_links(project)
+        with self._lock:
+            self._gns3_nodes = nodes
+            self._gns3_links = links
+            self._changed()
+
+    def on_snapshot(self, router_ip: str, snapshot: Dict):
+        """SnapshotCache listener, only this router's addresses and neighbors are touched"""
+        addresses = None
+        if "interfaces" in snapshot:
+            addresses = frozenset(
+                interface["ip_address"] for interface in snapshot["interfaces"]
+                if interface.get("ip_address") not in (None, "", "unassigned")
+            )
+        neighbors = None
+        if "neighbors" in snapshot:
+            neighbors = frozenset(neighbor["neighbor"] for neighbor in snapshot["neighbors"])
+        with self._lock:
+            changed = router_ip not in self._polled
+            self._polled.add(router_ip)
+            if addresses is not None and self._addresses.get(router_ip) != addresses:
+                for address in self._addresses.get(router_ip, ()):
+                    if self._owners.get(address) == router_ip:
+                        del self._owners[address]
+                for address in addresses:
+                    self._owners[address] = router_ip
+                self._addresses[router_ip] = addresses
+                changed = True
+            if neighbors is not None and self._neighbors.get(router_ip) != neighbors:
+                self._neighbors[router_ip] = neighbors
+                changed = True
+            if changed:
+                self._changed()
+
+    def remove(self, router_ip: str):
+        with self._lock:
+            for address in self._addresses.pop(router_ip, ()):
+                if self._owners.get(address) == router_ip:
+                    del self._owners[address]
+            self._neighbors.pop(router_ip, None)
+            self._polled.discard(router_ip)
+            self._changed()
+
+    def render(self, routers: List[Dict]) -> Tuple[int, str]:
+        """Version and compact JSON of the graph for the registered routers"""
+        # Inventory entries with a name are matched to GNS3 nodes of that name
+        signature = tuple((router["ip"], router.get("name")) for router in routers)
+        with self._lock:
+            if signature != self._signature:
+                self._signature = signature
+                self._changed()
+            if self._rendered is None:
+                self._rendered = (self.version, json.dumps(self._build(routers), separators=(",", ":")))
+            return self._rendered
+
+    def _build(self, routers: List[Dict]) -> Dict:
+        nodes: Dict[str, Dict] = {}
+        aliases = {}
+        for router in routers:
+            nodes[router["ip"]] = {"id": router["ip"], "name": router.get("name") or router["ip"],
+                                   "kind": "router", "polled": router["ip"] in self._polled}
+            if router.get("name"):
+                aliases[router["name"]] = router["ip"]
+        for name, node_type in self._gns3_nodes.items():
+            node_id = aliases.get(name, name)
+            if node_id not in nodes:
+                nodes[node_id] = {"id": node_id, "name": name, "kind": node_type, "polled": False}
+
+        links: Dict[Tuple[str, str], Dict] = {}
+
+        def link(a: str, b: str) -> Dict:
+            key = (a, b) if a <= b else (b, a)
+            if key not in links:
+                links[key] = {"ports": {}, "gns3": False, "suspended": False, "reports": set()}
+            return links[key]
+
+        for gns3_link in self._gns3_links:
+            a = aliases.get(gns3_link["a"], gns3_link["a"])
+            b = aliases.get(gns3_link["b"], gns3_link["b"])
+            entry = link(a, b)
+            entry["gns3"] = True
+            entry["suspended"] = gns3_link["suspended"]
+            entry["ports"][a] = gns3_link["a_port"]
+            entry["ports"][b] = gns3_link["b_port"]
+
+        for router_ip, neighbors in self._neighbors.items():
+            if router_ip not in nodes:
+                continue
+            for neighbor in neighbors:
+                # A neighbor address owned by a polled router collapses onto that router
+                peer = self._owners.get(neighbor, neighbor)
+                if peer == router_ip:
+                    continue
+                if peer not in nodes:
+                    nodes[peer] = {"id": peer, "name": peer, "kind": "neighbor", "polled": False}
+                link(router_ip, peer)["reports"].add(router_ip)
+
+        index = {node_id: i for i, node_id in enumerate(nodes)}
+        edges = []
+        states: Dict[str, int] = {}
+        for (a, b), entry in links.items():
+            state = self._link_state(a, b, entry, nodes)
+            states[state] = states.get(state, 0) + 1
+            source = "+".join(name for name, present in (("gns3", entry["gns3"]), ("rip", entry["reports"])) if present)
+            edges.append([index[a], index[b], state, entry["ports"].get(a, ""), entry["ports"].get(b, ""), source])
+        return {
+            "version": self.version,
+            "nodes": list(nodes.values()),
+            "edge_fields": EDGE_FIELDS,
+            "edges": edges,
+            "summary": {"nodes": len(nodes), "edges": len(edges), "states": states}
+        }
+
+    def _link_state(self, a: str, b: str, entry: Dict, nodes: Dict[str, Dict]) -> str:
+        reports = entry["reports"]
+        if len(reports) == 2:
+            return "up"
+        if reports:
+            # RIP hears the peer but the peer, though polled, does not hear back
+            other = b if a in reports else a
+            return "one_way" if nodes[other]["polled"] else "up"
+        if entry["suspended"]:
+            return "suspended"
+        if nodes[a]["polled"] and nodes[b]["polled"]:
+            return "down"
+        return "unknown"
@@ -0,0 +1,12 @@
+import os
+import sys
+
+if __name__ == '__main__':
+    # Not imported here, the workers import app after gunicorn.conf.py set RIP_SHARED_STATE
+    from gunicorn.app.wsgiapp import run
+
+    sys.argv = [sys.argv[0], "-c", os.path.join(os.path.dirname(os.path.abspath(__file__)), "gunicorn.conf.py"),
+                "wsgi:app"] + sys.argv[1:]
+    sys.exit(run())
+else:
+    from app import app